@@ -1,13 +1,20 @@
 import streamlit as st
 import os
-import base64
+import hashlib
+import hmac
+from datetime import datetime
 from PIL import Image
 from dotenv import load_dotenv
 
-from utils.gemini_handler import GeminiHandler
-from utils.discord_sender import send_sos_message
-from utils.sheet_handler import save_score, save_wrong_answer, save_mentoring_log, get_wrong_answers
+from utils.quiz_jobs import submit_quiz_job, get_job_status, get_files_label, AdmissionError, MAX_FILES_PER_JOB, JOB_DONE, JOB_FAILED, JOB_RUNNING
+from utils.quiz_checkpoints import save_checkpoint, load_checkpoint, delete_checkpoint
+from utils.discord_sender import start_outbox_sender
+from utils.sos_dispatcher import dispatch_sos, get_sos_status, STATUS_PENDING, STATUS_SENT, STATUS_FAILED
+from utils.sheet_handler import get_wrong_answers_page, WRONG_ANSWER_PAGE_SIZE, new_attempt, add_answer, commit_attempt
 from utils.ranking_handler import get_all_scores, get_unique_doc_names, calculate_ranking
+from utils.analytics_handler import record_attempt, get_doc_stats, get_hardest_questions, get_doc_trend
+from utils.startup import start_warmup
+from utils.metrics import start_metrics_exporter, get_stage_summary, get_recent_spans, export_prometheus
 from utils.logger import logger
 
 # Load environment variables
@@ -18,124 +25,145 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 DISCORD_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_URL")
 GOOGLE_SHEET_CREDENTIALS = os.getenv("GOOGLE_SHEET_CREDENTIALS")
 SPREADSHEET_ID = os.getenv("SPREADSHEET_ID")
-
-# Favicon Setup
-favicon_path = "assets/Logo_SOL-ution_favicon.ico"
-page_icon = "📝" # Default fallback
-
-try:
-    if os.path.exists(favicon_path):
-        page_icon = Image.open(favicon_path)
-except Exception:
-    pass # Keep default
-
-st.set_page_config(page_title="SOL-ution: Learning Helper", page_icon=page_icon, layout="wide")
+# Admin tools (e.g. the metrics debug panel) are shown when the URL has ?admin=<ADMIN_TOKEN>
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+# Save a cProfile dump and collapsed stacks for every page rerun (see utils/profiler.py)
+PROFILE_RERUNS = os.getenv("PROFILE_RERUNS") == "1"
+# Seconds between quiz job status polls while a quiz is being generated
+JOB_POLL_INTERVAL = 1.5
+
+# Deliver (and replay after restarts) queued SOS messages in the background
+start_outbox_sender()
+# Export per-stage latency metrics (Prometheus text format)
+start_metrics_exporter()
 
 # --- Asset Management ---
-def get_base64_of_bin_file(bin_file):
-    with open(bin_file, 'rb') as f:
-        data = f.read()
-    return base64.b64encode(data).decode()
-
-try:
-    img_light = get_base64_of_bin_file("assets/Logo_SOL-ution.png")
-    img_dark = get_base64_of_bin_file("assets/Logo_SOL-ution_transparent.png")
-except FileNotFoundError:
-    logger.error("Logo assets not found. Please ensure 'assets/Logo_SOL-ution.png' and 'assets/Logo_SOL-ution_transparent.png' exist.")
-    img_light = ""
-    img_dark = ""
+# Assets are loaded once per process (st.cache_resource) instead of on every rerun.
+# Logos are served from ./static via Streamlit static file serving
+# (server.enableStaticServing) with content-hashed URLs, so browsers cache them
+# and the per-rerun payload is a short <img src> instead of inlined base64.
+FAVICON_PATH = "assets/Logo_SOL-ution_favicon.ico"
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+@st.cache_resource
+def load_page_icon():
+    try:
+        if os.path.exists(FAVICON_PATH):
+            return Image.open(FAVICON_PATH)
+    except Exception:
+        pass
+    return "📝" # Default fallback
+
+@st.cache_resource
+def get_static_url(filename):
+    """
+    Returns the static-serving URL of a file in ./static, versioned by a hash of its content.
+    """
+    try:
+        with open(os.path.join(STATIC_DIR, filename), 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:12]
+    except FileNotFoundError:
+        logger.error(f"Static asset not found: 'static/{filename}'")
+        return ""
+    return f"app/static/{filename}?v={digest}"
+
+st.set_page_config(page_title="SOL-ution: Learning Helper", page_icon=load_page_icon(), layout="wide")
+
+img_light = get_static_url("Logo_SOL-ution.png")
+img_dark = get_static_url("Logo_SOL-ution_transparent.png")
 
 # --- CSS Styling ---
-# Sidebar CSS
-sidebar_css = """
-    /* Sidebar Button Styling */
-    div[data-testid="stSidebarUserContent"] .stButton button {
-        width: 100%;
-        border-radius: 5px;
-        padding-top: 15px;
-        padding-bottom: 15px;
-        border: 1px solid transparent; /* Tab-like feel */
-        margin-bottom: 5px;
-        transition: all 0.3s ease;
-    }
-
-    /* Force Secondary Buttons to be transparent/white by default to fix Blue-everywhere issue */
-    div[data-testid="stSidebarUserContent"] .stButton button[kind="secondary"] {
-        background-color: transparent !important;
-        border: 1px solid transparent !important;
-        color: inherit !important;
-    }
-
-    /* Inactive Button Hover Effect */
-    div[data-testid="stSidebarUserContent"] .stButton button[kind="secondary"]:hover {
-        background-color: #f0f2f6 !important;
-        border: 1px solid #dcdcdc !important;
-        color: #0046FF !important;
-    }
-"""
-
-st.markdown(
-    f"""
-    <style>
-    /* Logo Classes */
-    .logo-container {{
-        display: flex;
-        justify-content: center;
-        margin-bottom: 20px;
-    }}
-    .logo-img {{
-        max_width: 100%;
-        height: auto;
-    }}
-
-    /* Default (Light Mode) */
-    .logo-light {{
-        display: block;
-    }}
-    .logo-dark {{
-        display: none;
-    }}
-
-    /* Light Mode Background */
-    @media (prefers-color-scheme: light) {{
-        .stApp {{
-            background-color: #fcfcfb;
+@st.cache_resource
+def build_global_css():
+    # Sidebar CSS
+    sidebar_css = """
+        /* Sidebar Button Styling */
+        div[data-testid="stSidebarUserContent"] .stButton button {
+            width: 100%;
+            border-radius: 5px;
+            padding-top: 15px;
+            padding-bottom: 15px;
+            border: 1px solid transparent; /* Tab-like feel */
+            margin-bottom: 5px;
+            transition: all 0.3s ease;
+        }
+
+        /* Force Secondary Buttons to be transparent/white by default to fix Blue-everywhere issue */
+        div[data-testid="stSidebarUserContent"] .stButton button[kind="secondary"] {
+            background-color: transparent !important;
+            border: 1px solid transparent !important;
+            color: inherit !important;
+        }
+
+        /* Inactive Button Hover Effect */
+        div[data-testid="stSidebarUserContent"] .stButton button[kind="secondary"]:hover {
+            background-color: #f0f2f6 !important;
+            border: 1px solid #dcdcdc !important;
+            color: #0046FF !important;
+        }
+    """
+
+    return f"""
+        <style>
+        /* Logo Classes */
+        .logo-container {{
+            display: flex;
+            justify-content: center;
+            margin-bottom: 20px;
+        }}
+        .logo-img {{
+            max_width: 100%;
+            height: auto;
         }}
-    }}
 
-    /* Dark Mode Override */
-    @media (prefers-color-scheme: dark) {{
+        /* Default (Light Mode) */
         .logo-light {{
-            display: none !important;
+            display: block;
         }}
         .logo-dark {{
-            display: block !important;
+            display: none;
         }}
-    }}
-
-    /* Brand Styling for Primary Buttons (Main Content) */
-    .stButton > button[kind="primary"] {{
-        background-color: #0046FF !important;
-        color: white !important;
-        border-radius: 8px;
-        font-weight: bold;
-    }}
-    .stButton > button[kind="primary"]:hover {{
-        background-color: #0033CC !important;
-        color: white !important;
-    }}
-
-    /* Header Emphasis */
-    h1, h2, h3 {{
-        color: #0046FF;
-    }}
-
-    /* Sidebar Custom CSS */
-    {sidebar_css}
-    </style>
-    """,
-    unsafe_allow_html=True
-)
+
+        /* Light Mode Background */
+        @media (prefers-color-scheme: light) {{
+            .stApp {{
+                background-color: #fcfcfb;
+            }}
+        }}
+
+        /* Dark Mode Override */
+        @media (prefers-color-scheme: dark) {{
+            .logo-light {{
+                display: none !important;
+            }}
+            .logo-dark {{
+                display: block !important;
+            }}
+        }}
+
+        /* Brand Styling for Primary Buttons (Main Content) */
+        .stButton > button[kind="primary"] {{
+            background-color: #0046FF !important;
+            color: white !important;
+            border-radius: 8px;
+            font-weight: bold;
+        }}
+        .stButton > button[kind="primary"]:hover {{
+            background-color: #0033CC !important;
+            color: white !important;
+        }}
+
+        /* Header Emphasis */
+        h1, h2, h3 {{
+            color: #0046FF;
+        }}
+
+        /* Sidebar Custom CSS */
+        {sidebar_css}
+        </style>
+        """
+
+st.markdown(build_global_css(), unsafe_allow_html=True)
 
 # --- Session State Initialization ---
 if "page" not in st.session_state:
@@ -160,6 +188,24 @@ if "user_name" not in st.session_state:
     st.session_state.user_name = ""
 if "quiz_active" not in st.session_state:
     st.session_state.quiz_active = False
+if "attempt" not in st.session_state:
+    st.session_state.attempt = None
+if "sos_tickets" not in st.session_state:
+    st.session_state.sos_tickets = []
+if "quiz_job_id" not in st.session_state:
+    st.session_state.quiz_job_id = None
+if "quiz_job_error" not in st.session_state:
+    st.session_state.quiz_job_error = None
+if "doc_hash" not in st.session_state:
+    st.session_state.doc_hash = None
+if "wrong_note_query" not in st.session_state:
+    st.session_state.wrong_note_query = None
+if "wrong_note_cursors" not in st.session_state:
+    st.session_state.wrong_note_cursors = [None]
+if "wrong_note_page_index" not in st.session_state:
+    st.session_state.wrong_note_page_index = 0
+if "wrong_note_page" not in st.session_state:
+    st.session_state.wrong_note_page = None
 
 # --- Helper Functions ---
 
@@ -171,20 +217,58 @@ def reset_quiz():
     st.session_state.score = 0
     st.session_state.answer_checked = False
     st.session_state.quiz_active = False
+    st.session_state.attempt = None
+    st.session_state.doc_hash = None
+
+def checkpoint_quiz():
+    # Persist progress so a refresh or reconnect can resume without regenerating
+    save_checkpoint(st.session_state.user_name, st.session_state.doc_hash, st.session_state)
+
+def finish_quiz():
+    # The attempt is committed: count it in the analytics; its checkpoint is no longer needed
+    record_attempt(st.session_state.attempt)
+    delete_checkpoint(st.session_state.user_name, st.session_state.doc_hash)
+    reset_quiz()
+
+def resume_checkpoint(checkpoint):
+    for field, value in checkpoint['State'].items():
+        st.session_state[field] = value
+    st.session_state.user_name = checkpoint['Employee_ID']
+    st.session_state.doc_hash = checkpoint['Doc_Hash']
+    st.session_state.quiz_active = True
+    logger.info(f"Resumed quiz checkpoint for user {checkpoint['Employee_ID']} (doc: {checkpoint['Doc_Name']})")
+
+def discard_checkpoint(checkpoint):
+    delete_checkpoint(checkpoint['Employee_ID'], checkpoint['Doc_Hash'])
+
+def is_admin():
+    token = st.query_params.get("admin")
+    return bool(ADMIN_TOKEN and token and hmac.compare_digest(token, ADMIN_TOKEN))
+
+def render_metrics_panel():
+    with st.expander("🛠️ 성능 지표 (Admin)"):
+        summary = get_stage_summary()
+        if not summary:
+            st.caption("아직 기록된 지표가 없습니다.")
+            return
+        st.dataframe(summary, hide_index=True, use_container_width=True)
+        st.caption("최근 호출")
+        st.dataframe(get_recent_spans(20), hide_index=True, use_container_width=True)
+        st.download_button("Prometheus 형식 다운로드", export_prometheus(), file_name="metrics.prom", mime="text/plain")
 
 def render_logo(width="300px", fixed_transparent=False, clickable=False):
     logo_html = ""
     if fixed_transparent:
         logo_html = f"""
         <div class="logo-container">
-            <img src="data:image/png;base64,{img_dark}" class="logo-img" style="width: {width};">
+            <img src="{img_dark}" class="logo-img" style="width: {width};">
         </div>
         """
     else:
         logo_html = f"""
         <div class="logo-container">
-            <img src="data:image/png;base64,{img_light}" class="logo-img logo-light" style="width: {width};">
-            <img src="data:image/png;base64,{img_dark}" class="logo-img logo-dark" style="width: {width};">
+            <img src="{img_light}" class="logo-img logo-light" style="width: {width};">
+            <img src="{img_dark}" class="logo-img logo-dark" style="width: {width};">
         </div>
         """
 
@@ -197,6 +281,23 @@ def render_logo(width="300px", fixed_transparent=False, clickable=False):
 
     st.markdown(logo_html, unsafe_allow_html=True)
 
+SOS_STATUS_LABELS = {
+    STATUS_PENDING: "⏳ 전송 중",
+    STATUS_SENT: "✅ 완료",
+    STATUS_FAILED: "❌ 실패",
+}
+
+def render_sos_status(ticket_ids):
+    for ticket_id in ticket_ids:
+        status = get_sos_status(ticket_id)
+        if status is None:
+            continue
+        st.caption(
+            f"[{status['created_at']}] {status['question'][:30]}... "
+            f"| Discord: {SOS_STATUS_LABELS[status['discord']]} "
+            f"| 기록: {SOS_STATUS_LABELS[status['sheet']]}"
+        )
+
 @st.dialog("선배에게 질문하기 (SOS)")
 def show_sos_dialog(question_data, user_selected_option, user_name):
     st.write("문제를 풀다가 막혔나요? 선배에게 도움을 요청해보세요.")
@@ -213,44 +314,29 @@ def show_sos_dialog(question_data, user_selected_option, user_name):
             st.error("질문 내용을 입력해주세요.")
             logger.warning("User attempted to send SOS without question content")
         else:
-            with st.spinner("전송 중..."):
-                # Send to Discord
-                discord_success = send_sos_message(
-                    DISCORD_WEBHOOK_URL,
-                    user_name,
-                    question_data['question'],
-                    user_selected_option,
-                    question_data['answer'],
-                    user_question
-                )
-
-                # Log to Sheet
-                sheet_success = save_mentoring_log(
-                    GOOGLE_SHEET_CREDENTIALS,
-                    SPREADSHEET_ID,
-                    user_name,
-                    question_data['question'],
-                    question_data['answer'],
-                    user_selected_option,
-                    user_question
-                )
-
-                if discord_success:
-                    st.success("선배님께 질문이 전달되었습니다!")
-                    st.balloons()
-                else:
-                    st.error("Discord 전송 실패.")
-
-                if not sheet_success:
-                    st.warning("구글 시트 기록 실패.")
+            # Discord post and sheet log run concurrently in the background;
+            # the dialog returns immediately and the status can be checked later.
+            ticket_id = dispatch_sos(
+                DISCORD_WEBHOOK_URL,
+                GOOGLE_SHEET_CREDENTIALS,
+                SPREADSHEET_ID,
+                user_name,
+                question_data['question'],
+                user_selected_option,
+                question_data['answer'],
+                user_question
+            )
+            st.session_state.sos_tickets.append(ticket_id)
+            st.success("질문이 접수되었습니다! 전송 상태는 문제 화면에서 확인할 수 있습니다.")
+            render_sos_status([ticket_id])
 
-def generate_quiz_logic(user_name, uploaded_file):
+def generate_quiz_logic(user_name, uploaded_files):
     logger.info("Quiz generation triggered")
     if not user_name:
         st.error("행번을 입력해주세요.")
         logger.warning("User attempted to generate quiz without providing name/ID")
         return False
-    elif not uploaded_file:
+    elif not uploaded_files:
         st.error("PDF 파일을 업로드해주세요.")
         logger.warning("User attempted to generate quiz without uploading file")
         return False
@@ -259,43 +345,67 @@ def generate_quiz_logic(user_name, uploaded_file):
         logger.error("GOOGLE_API_KEY is missing from environment variables")
         return False
     else:
-        logger.info(f"Processing quiz generation for user: {user_name}, file: {uploaded_file.name}")
-        with st.spinner("문서를 분석하고 퀴즈를 생성중입니다..."):
-            # Reset quiz state, but keep user_name and filename
-            st.session_state.quiz_data = None
-            st.session_state.current_q_index = 0
-            st.session_state.user_answers = {}
-            st.session_state.quiz_submitted = False
-            st.session_state.score = 0
-            st.session_state.answer_checked = False
-
-            st.session_state.uploaded_file_name = uploaded_file.name
-            st.session_state.user_name = user_name # Store name in session
-
-            try:
-                gemini = GeminiHandler(GOOGLE_API_KEY)
-                text = gemini.extract_text_from_pdf(uploaded_file)
-
-                if text:
-                    quiz_json = gemini.generate_quiz(text)
-                    if quiz_json:
-                        st.session_state.quiz_data = quiz_json
-                        st.session_state.quiz_active = True # Set quiz active
-                        st.success("퀴즈가 생성되었습니다!")
-                        logger.info("Quiz successfully generated and stored in session state")
-                        return True
-                    else:
-                        st.error("퀴즈 생성에 실패했습니다. 다시 시도해주세요.")
-                        logger.error("Quiz generation returned None")
-                        return False
-                else:
-                    st.error("PDF 텍스트 추출에 실패했습니다.")
-                    logger.error("PDF text extraction returned None")
-                    return False
-            except Exception as e:
-                st.error(f"오류가 발생했습니다: {e}")
-                logger.error(f"Unexpected error during quiz generation process: {e}", exc_info=True)
-                return False
+        files = [(f.name, f.getvalue()) for f in uploaded_files]
+        logger.info(f"Processing quiz generation for user: {user_name}, files: {[name for name, _ in files]}")
+        # Reset quiz state, but keep user_name and filename
+        st.session_state.quiz_data = None
+        st.session_state.current_q_index = 0
+        st.session_state.user_answers = {}
+        st.session_state.quiz_submitted = False
+        st.session_state.score = 0
+        st.session_state.answer_checked = False
+        st.session_state.doc_hash = None
+
+        st.session_state.uploaded_file_name = get_files_label(files)
+        st.session_state.user_name = user_name # Store name in session
+
+        # Extraction and generation run on the background job queue;
+        # quiz_job_status() polls the job and starts the quiz when it is done.
+        try:
+            st.session_state.quiz_job_error = None
+            st.session_state.quiz_job_id = submit_quiz_job(user_name, files, GOOGLE_API_KEY)
+            return True
+        except AdmissionError as e:
+            st.error(str(e))
+            logger.warning(f"Quiz job rejected for user {user_name}: {e}")
+            return False
+        except Exception as e:
+            st.error(f"오류가 발생했습니다: {e}")
+            logger.error(f"Unexpected error during quiz generation process: {e}", exc_info=True)
+            return False
+
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def quiz_job_status():
+    # A finished job ends polling with a full rerun, so the home page re-enables
+    # the generate button and shows the outcome outside this fragment.
+    if st.session_state.quiz_job_id is None:
+        return
+
+    job = get_job_status(st.session_state.quiz_job_id)
+    if job is None:
+        st.session_state.quiz_job_id = None
+        st.session_state.quiz_job_error = "퀴즈 생성 작업을 찾을 수 없습니다. 다시 시도해주세요."
+        st.rerun()
+
+    if job['state'] == JOB_DONE:
+        st.session_state.quiz_job_id = None
+        st.session_state.quiz_data = job['result']
+        st.session_state.attempt = new_attempt(st.session_state.user_name, st.session_state.uploaded_file_name)
+        st.session_state.doc_hash = job['doc_hash']
+        st.session_state.quiz_active = True # Set quiz active
+        checkpoint_quiz()
+        logger.info("Quiz successfully generated and stored in session state")
+        st.rerun()
+    elif job['state'] == JOB_FAILED:
+        st.session_state.quiz_job_id = None
+        st.session_state.quiz_job_error = job['error'] or "퀴즈 생성에 실패했습니다. 다시 시도해주세요."
+        logger.error(f"Quiz job {job['job_id']} failed: {job['error']}")
+        st.rerun()
+    elif job['state'] == JOB_RUNNING:
+        st.info("⏳ 문서를 분석하고 퀴즈를 생성중입니다...")
+    else:
+        position = job['queue_position'] or 0
+        st.info(f"⏳ 퀴즈 생성 대기 중입니다. (앞선 요청 {position}건)")
 
 # --- Page Functions ---
 
@@ -327,16 +437,39 @@ def home_page():
                                     value=st.session_state.user_name if st.session_state.user_name else "",
                                     placeholder="예: 24101234")
 
-    uploaded_file_input = st.file_uploader("학습할 PDF 문서를 업로드하세요. (10MB 제한)", type="pdf")
+    # Offer to resume an unfinished quiz for this ID (no new generation needed)
+    if user_name_input and st.session_state.quiz_job_id is None:
+        checkpoint = load_checkpoint(user_name_input)
+        if checkpoint and checkpoint['State'].get('quiz_data'):
+            total_q = len(checkpoint['State']['quiz_data'])
+            q_index = min(checkpoint['State'].get('current_q_index') or 0, total_q)
+            st.info(f"📌 '{checkpoint['Doc_Name']}' 퀴즈를 풀던 기록이 있습니다. ({q_index}/{total_q} 단계)")
+            resume_col, discard_col = st.columns(2)
+            with resume_col:
+                st.button("이어서 풀기", on_click=resume_checkpoint, args=(checkpoint,), use_container_width=True)
+            with discard_col:
+                st.button("기록 삭제", on_click=discard_checkpoint, args=(checkpoint,), use_container_width=True)
+
+    uploaded_files_input = st.file_uploader(
+        f"학습할 PDF 문서를 업로드하세요. (최대 {MAX_FILES_PER_JOB}개, 파일당 10MB 제한)",
+        type="pdf",
+        accept_multiple_files=True
+    )
 
     st.markdown("<br>", unsafe_allow_html=True)
 
-    if st.button("퀴즈 생성 (Start Quiz)", use_container_width=True, type="primary"):
+    generating = st.session_state.quiz_job_id is not None
+    if st.button("퀴즈 생성 (Start Quiz)", use_container_width=True, type="primary", disabled=generating):
         # Store user name immediately
         st.session_state.user_name = user_name_input
-        if generate_quiz_logic(user_name_input, uploaded_file_input):
+        if generate_quiz_logic(user_name_input, uploaded_files_input):
             st.rerun()
 
+    if st.session_state.quiz_job_id:
+        quiz_job_status()
+    elif st.session_state.quiz_job_error:
+        st.error(st.session_state.quiz_job_error)
+
 def ranking_page():
     st.title("🏆 명예의 전당 (Leaderboard)")
 
@@ -347,6 +480,12 @@ def ranking_page():
         st.info("아직 등록된 점수 데이터가 없습니다.")
         return
 
+    ranking_table(df_all)
+
+@st.fragment
+def ranking_table(df_all):
+    # Runs as a fragment: changing the selected document reruns only this table,
+    # without refetching scores or re-rendering the rest of the app.
     # Document Selection
     doc_options = get_unique_doc_names(df_all)
 
@@ -390,9 +529,69 @@ def ranking_page():
             hide_index=True
         )
 
+# --- Wrong Answer Note ---
+# Only the visible page is kept in session state. Searching, filtering and paging
+# fetch a page from the data layer; opening an expander reruns against the stored
+# page, and expander bodies are built only while they are open.
+ALL_DOCS = "전체 문서"
+
+def load_wrong_note_page(page_index):
+    query = st.session_state.wrong_note_query
+    cursors = st.session_state.wrong_note_cursors
+    page = get_wrong_answers_page(
+        GOOGLE_SHEET_CREDENTIALS, SPREADSHEET_ID, query['employee_id'],
+        doc_name=query['doc_name'], since=query['since'], until=query['until'],
+        cursor=cursors[page_index]
+    )
+    st.session_state.wrong_note_page = page
+    st.session_state.wrong_note_page_index = page_index
+    if page and page['Next_Cursor'] and len(cursors) == page_index + 1:
+        cursors.append(page['Next_Cursor'])
+
+def search_wrong_notes(employee_id, doc_name, date_range):
+    # A different employee starts without the previous employee's document filter
+    previous = st.session_state.wrong_note_query
+    if previous is None or previous['employee_id'] != employee_id or doc_name == ALL_DOCS:
+        doc_name = None
+    st.session_state.wrong_note_query = {
+        'employee_id': employee_id,
+        'doc_name': doc_name,
+        'since': datetime.combine(date_range[0], datetime.min.time()) if date_range else None,
+        'until': datetime.combine(date_range[-1], datetime.max.time()) if date_range else None,
+    }
+    st.session_state.wrong_note_cursors = [None]
+    load_wrong_note_page(0)
+
+def refresh_wrong_notes():
+    # Filter widgets re-run the current search from its first page
+    query = st.session_state.wrong_note_query
+    if query is not None:
+        search_wrong_notes(query['employee_id'], st.session_state.wrong_note_doc, st.session_state.wrong_note_dates)
+
+def render_wrong_note_item(item):
+    # Header format: [N회] [Last missed date] [File] Question...
+    header_text = f"[{item['Miss_Count']}회] [{item['Timestamp']}] [{item['Doc_Name']}] {item['Question_Text'][:50]}..."
+    expander = st.expander(header_text, key=f"wrong_note_{item['Question_Key']}", on_change="rerun")
+    if not expander.open:
+        return
+    with expander:
+        st.markdown(f"**문제:** {item['Question_Text']}")
+
+        st.markdown("---")
+        st.markdown(f"**❌ 내가 고른 답:** {item['User_Selected_Answer']}")
+        st.markdown(f"**✅ 정답:** {item['Correct_Answer']}")
+
+        if item.get('Options'):
+            st.markdown("---")
+            st.markdown("**보기:**")
+            for opt in item['Options']:
+                st.text(f"- {opt}")
+
 def wrong_answers_page():
     st.title("📝 오답노트 (Wrong Answer Note)")
 
+    page = st.session_state.wrong_note_page
+
     col1, col2 = st.columns([3, 1])
     with col1:
         # Prefill if available in session state
@@ -403,32 +602,96 @@ def wrong_answers_page():
         st.write("")
         search_btn = st.button("조회하기", use_container_width=True)
 
+    filter_col1, filter_col2 = st.columns(2)
+    with filter_col1:
+        doc_options = [ALL_DOCS] + (page['Doc_Names'] if page else [])
+        doc_filter = st.selectbox("문서", doc_options, key="wrong_note_doc", on_change=refresh_wrong_notes)
+    with filter_col2:
+        date_range = st.date_input("기간 (마지막으로 틀린 날짜)", value=(), key="wrong_note_dates", on_change=refresh_wrong_notes)
+
     if search_btn and search_id:
         st.session_state.user_name = search_id # Sync session state
         with st.spinner("오답 기록을 불러오는 중입니다..."):
-            wrong_answers = get_wrong_answers(GOOGLE_SHEET_CREDENTIALS, SPREADSHEET_ID, search_id)
-
-        if not wrong_answers:
-            st.info("틀린 문제가 없습니다. (혹은 행번을 확인해주세요)")
-        else:
-            for idx, item in enumerate(wrong_answers):
-                # Header format: [Date] [File] Question...
-                header_text = f"[{item['Timestamp']}] [{item['Doc_Name']}] {item['Question_Text'][:50]}..."
-
-                with st.expander(header_text):
-                    st.markdown(f"**문제:** {item['Question_Text']}")
-
-                    st.markdown("---")
-                    st.markdown(f"**❌ 내가 고른 답:** {item['User_Selected_Answer']}")
-                    st.markdown(f"**✅ 정답:** {item['Correct_Answer']}")
-
-                    if item.get('Options'):
-                        st.markdown("---")
-                        st.markdown("**보기:**")
-                        for opt in item['Options']:
-                            st.text(f"- {opt}")
+            search_wrong_notes(search_id, doc_filter, date_range)
+        page = st.session_state.wrong_note_page
     elif search_btn and not search_id:
         st.warning("행번을 입력해주세요.")
+        return
+
+    if st.session_state.wrong_note_query is None:
+        return
+    if page is None:
+        st.error("오답 기록을 불러오지 못했습니다. 잠시 후 다시 시도해주세요.")
+    elif not page['Total']:
+        st.info("틀린 문제가 없습니다. (혹은 행번을 확인해주세요)")
+    else:
+        page_index = st.session_state.wrong_note_page_index
+        first = page_index * WRONG_ANSWER_PAGE_SIZE + 1
+        st.caption(f"총 {page['Total']}개 문제 (많이 틀린 순) · {first}-{first + len(page['Items']) - 1}번째")
+        for item in page['Items']:
+            render_wrong_note_item(item)
+
+        prev_col, next_col = st.columns(2)
+        with prev_col:
+            st.button("◀ 이전", on_click=load_wrong_note_page, args=(page_index - 1,),
+                      disabled=page_index == 0, use_container_width=True)
+        with next_col:
+            st.button("다음 ▶", on_click=load_wrong_note_page, args=(page_index + 1,),
+                      disabled=page_index + 1 >= len(st.session_state.wrong_note_cursors), use_container_width=True)
+
+def analytics_page():
+    st.title("📊 문제 분석 (Question Analytics)")
+
+    doc_stats = get_doc_stats()
+    if not doc_stats:
+        st.info("아직 집계된 풀이 기록이 없습니다.")
+        return
+
+    st.markdown("#### 문서별 오답률")
+    st.dataframe(
+        [
+            {'문서': d['Doc_Name'], '풀이 수': d['Answers'], '오답 수': d['Misses'], '오답률': d['Miss_Rate'] * 100}
+            for d in doc_stats
+        ],
+        column_config={
+            "오답률": st.column_config.NumberColumn("오답률", format="%.1f%%"),
+        },
+        use_container_width=True,
+        hide_index=True
+    )
+
+    doc_options = [d['Doc_Name'] for d in doc_stats]
+    selected_doc = st.selectbox("분석할 문서를 선택하세요:", doc_options)
+
+    if selected_doc:
+        st.markdown("#### 가장 많이 틀린 문제")
+        hardest = get_hardest_questions(selected_doc)
+        st.dataframe(
+            [
+                {
+                    '문제': q['Question_Text'],
+                    '오답 수': q['Misses'],
+                    '오답률': q['Miss_Rate'] * 100,
+                    '가장 많이 고른 오답': q['Top_Wrong_Option'],
+                    '최근 오답': q['Last_Missed'],
+                }
+                for q in hardest
+            ],
+            column_config={
+                "오답률": st.column_config.NumberColumn("오답률", format="%.1f%%"),
+            },
+            use_container_width=True,
+            hide_index=True
+        )
+
+        st.markdown("#### 일별 오답률 추이")
+        trend = get_doc_trend(selected_doc)
+        if trend:
+            st.line_chart(
+                {'날짜': [t['Day'] for t in trend], '오답률': [t['Miss_Rate'] * 100 for t in trend]},
+                x='날짜',
+                y='오답률'
+            )
 
 def quiz_page(user_name):
     # Quiz UI
@@ -439,6 +702,38 @@ def quiz_page(user_name):
     with col2:
         st.markdown(f"<div style='text-align: right; padding-top: 20px; font-size: 1.2em; font-weight: bold; color: #0046FF;'>👤 {user_name}</div>", unsafe_allow_html=True)
 
+    quiz_panel(user_name)
+
+def check_answer(q_index, q_data):
+    choice = st.session_state.get(f"q_{q_index}")
+    if not choice:
+        st.session_state.answer_missing = True
+        return
+
+    st.session_state.user_answers[q_index] = choice
+    st.session_state.answer_checked = True
+
+    question_info = {
+        "question": q_data['question'],
+        "options": q_data['options']
+    }
+    # Accumulated on the attempt; written with the score in one batch
+    add_answer(st.session_state.attempt, question_info, q_data['answer'], choice)
+
+    if choice == q_data['answer']:
+        st.session_state.score += 20
+    checkpoint_quiz()
+
+def next_question():
+    st.session_state.current_q_index += 1
+    st.session_state.answer_checked = False
+    checkpoint_quiz()
+
+@st.fragment
+def quiz_panel(user_name):
+    # Question / answer / feedback panel. Runs as a fragment: "정답 확인" and
+    # "다음 문제" update state in their callbacks and rerun only this panel.
+    # Leaving the quiz (save / ranking / restart) triggers a full app rerun.
     if st.session_state.quiz_data:
         q_index = st.session_state.current_q_index
         total_q = len(st.session_state.quiz_data)
@@ -463,31 +758,9 @@ def quiz_page(user_name):
             )
 
             if not st.session_state.answer_checked:
-                if st.button("정답 확인"):
-                    if not choice:
-                        st.warning("보기를 선택해주세요.")
-                    else:
-                        st.session_state.user_answers[q_index] = choice
-                        st.session_state.answer_checked = True
-
-                        if choice == q_data['answer']:
-                            st.session_state.score += 20
-                        else:
-                            # Log wrong answer
-                            question_info = {
-                                "question": q_data['question'],
-                                "options": q_data['options']
-                            }
-                            save_wrong_answer(
-                                GOOGLE_SHEET_CREDENTIALS,
-                                SPREADSHEET_ID,
-                                user_name,
-                                st.session_state.uploaded_file_name,
-                                question_info,
-                                q_data['answer'],
-                                choice
-                            )
-                        st.rerun()
+                st.button("정답 확인", on_click=check_answer, args=(q_index, q_data))
+                if st.session_state.pop("answer_missing", False):
+                    st.warning("보기를 선택해주세요.")
             else:
                 # Result View
                 user_choice = st.session_state.user_answers.get(q_index)
@@ -502,10 +775,12 @@ def quiz_page(user_name):
                     if st.button("선배에게 물어보기 (SOS)"):
                         show_sos_dialog(q_data, user_choice, user_name)
 
-                if st.button("다음 문제"):
-                    st.session_state.current_q_index += 1
-                    st.session_state.answer_checked = False
-                    st.rerun()
+                if st.session_state.sos_tickets:
+                    with st.expander("📨 SOS 전송 상태"):
+                        render_sos_status(st.session_state.sos_tickets)
+                        st.button("상태 새로고침", key="sos_status_refresh")
+
+                st.button("다음 문제", on_click=next_question)
 
         else:
             # Quiz Completed
@@ -514,37 +789,26 @@ def quiz_page(user_name):
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("결과 저장 및 홈으로"):
-                     save_score(
-                        GOOGLE_SHEET_CREDENTIALS,
-                        SPREADSHEET_ID,
-                        user_name,
-                        st.session_state.uploaded_file_name,
-                        st.session_state.score
-                    )
-                     st.success("기록되었습니다. 수고하셨습니다!")
-                     # Reset quiz and go back to Setup
-                     reset_quiz()
-                     st.rerun()
+                     # Score and wrong answers are committed together; the attempt ID
+                     # guarantees a second click never records the score twice.
+                     if commit_attempt(GOOGLE_SHEET_CREDENTIALS, SPREADSHEET_ID, st.session_state.attempt, st.session_state.score):
+                         st.success("기록되었습니다. 수고하셨습니다!")
+                         # Reset quiz and go back to Setup
+                         finish_quiz()
+                         st.rerun()
+                     else:
+                         st.error("결과 저장에 실패했습니다. 다시 시도해주세요.")
             with col2:
                  if st.button("내 순위 확인하기"):
-                     save_score(
-                        GOOGLE_SHEET_CREDENTIALS,
-                        SPREADSHEET_ID,
-                        user_name,
-                        st.session_state.uploaded_file_name,
-                        st.session_state.score
-                    )
-                     st.success("점수가 저장되었습니다.")
-                     # Go to ranking page
-                     # To switch page, we need to update the sidebar state if possible,
-                     # but st.sidebar.radio controls the state.
-                     # We can change st.session_state.page, but the radio widget needs to match.
-                     # Since we can't easily programmatically change the widget value without 'key' session state trickery.
-                     # We will use st.session_state['sidebar_nav'] = '...' if we key the radio.
-                     st.session_state.ranking_doc_selected = st.session_state.uploaded_file_name
-                     reset_quiz()
-                     st.session_state.page = "ranking" # Will be handled by the radio key sync
-                     st.rerun()
+                     if commit_attempt(GOOGLE_SHEET_CREDENTIALS, SPREADSHEET_ID, st.session_state.attempt, st.session_state.score):
+                         st.success("점수가 저장되었습니다.")
+                         # Go to ranking page
+                         st.session_state.ranking_doc_selected = st.session_state.uploaded_file_name
+                         finish_quiz()
+                         st.session_state.page = "ranking"
+                         st.rerun()
+                     else:
+                         st.error("결과 저장에 실패했습니다. 다시 시도해주세요.")
 
     else:
         st.info("문제가 발생했습니다. 다시 시작해주세요.")
@@ -564,7 +828,8 @@ with st.sidebar:
     menu_items = {
         "학습 시작하기": "home",
         "명예의 전당": "ranking",
-        "오답노트": "wrong_answers"
+        "오답노트": "wrong_answers",
+        "문제 분석": "analytics"
     }
 
     # Render Buttons
@@ -584,10 +849,25 @@ with st.sidebar:
                     reset_quiz()
                 st.rerun()
 
+    if is_admin():
+        st.divider()
+        render_metrics_panel()
+
 # Router
-if st.session_state.page == "home":
-    home_page()
-elif st.session_state.page == "ranking":
-    ranking_page()
-elif st.session_state.page == "wrong_answers":
-    wrong_answers_page()
+pages = {
+    "home": home_page,
+    "ranking": ranking_page,
+    "wrong_answers": wrong_answers_page,
+    "analytics": analytics_page,
+}
+page_func = pages.get(st.session_state.page)
+if page_func is not None:
+    # Opt-in per-rerun profiling (PROFILE_RERUNS=1, or ?admin=<token>&profile=1)
+    if PROFILE_RERUNS or (is_admin() and st.query_params.get("profile") == "1"):
+        from utils.profiler import profile_call
+        profile_call(st.session_state.page, page_func)
+    else:
+        page_func()
+
+# Preload heavy modules and API clients once the first page has rendered
+start_warmup(GOOGLE_API_KEY, GOOGLE_SHEET_CREDENTIALS)
@@ -0,0 +1,142 @@
+"""
+End-to-end throughput of the storage / notification handlers against the
+local service emulator (benchmarks/emulator.py). Each simulated user commits
+an attempt, reads the leaderboard scores and looks up wrong answers; SOS
+posts go straight to the emulated webhook.
+
+    python -m benchmarks.bench_emulated_io --users 8 --rounds 5
+    python -m benchmarks.bench_emulated_io --sheets-latency lognormal:80,0.4 --sheets-write-quota 60
+    python -m benchmarks.bench_emulated_io --async   # each user's calls overlap (utils/async_io.py)
+
+Reports operations per second, latency percentiles and failures per call.
+The handlers report failures by return value ([] / an empty DataFrame for a
+failed read), so failures are taken from the handlers' stage metrics
+(utils/metrics.py) rather than guessed from results.
+"""
+import time
+import asyncio
+import argparse
+import statistics
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from benchmarks.emulator import start_emulator
+from utils import sheet_handler
+from utils.sheet_handler import new_attempt, add_wrong_answer, commit_attempt, get_wrong_answers, commit_attempt_async, get_wrong_answers_async
+from utils.ranking_handler import get_all_scores, get_all_scores_async
+from utils.discord_sender import post_webhook, post_webhook_async
+from utils.async_io import run_concurrently
+from utils.metrics import get_stage_summary
+
+# Instrumented stage behind each benchmarked call
+STAGES = {
+    'commit_attempt': 'sheets.commit_attempt',
+    'get_all_scores': 'ranking.get_all_scores',
+    'get_wrong_answers': 'sheets.get_wrong_answers',
+    'post_webhook': 'discord.post_webhook',
+}
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct * (len(ordered) - 1))))]
+
+def _simulate_user(user_index, rounds, webhook_url, timings):
+    employee_id = f"E{user_index:04d}"
+    for round_index in range(rounds):
+        attempt = new_attempt(employee_id, "Doc.pdf")
+        add_wrong_answer(attempt, {"question": f"Q{round_index % 5}", "options": ["A", "B", "C", "D"]}, "A", "B")
+        calls = [
+            ('commit_attempt', lambda: commit_attempt("emulated", "bench", attempt, 80)),
+            ('get_all_scores', lambda: get_all_scores("emulated", "bench")),
+            ('get_wrong_answers', lambda: get_wrong_answers("emulated", "bench", employee_id)),
+            ('post_webhook', lambda: post_webhook(webhook_url, {"embeds": [{"title": f"SOS {employee_id}"}]})[0]),
+        ]
+        for name, call in calls:
+            start = time.perf_counter()
+            call()
+            timings[name].append(time.perf_counter() - start)
+
+async def _timed(name, coro, timings):
+    start = time.perf_counter()
+    await coro
+    timings[name].append(time.perf_counter() - start)
+
+def _failure_counts():
+    return {row['Stage']: row['Failures'] + row['Errors'] for row in get_stage_summary()}
+
+async def _simulate_user_async(user_index, rounds, webhook_url, timings):
+    # Same calls as _simulate_user, but each round issues them concurrently
+    employee_id = f"E{user_index:04d}"
+    for round_index in range(rounds):
+        attempt = new_attempt(employee_id, "Doc.pdf")
+        add_wrong_answer(attempt, {"question": f"Q{round_index % 5}", "options": ["A", "B", "C", "D"]}, "A", "B")
+        await asyncio.gather(
+            _timed('commit_attempt', commit_attempt_async("emulated", "bench", attempt, 80), timings),
+            _timed('get_all_scores', get_all_scores_async("emulated", "bench"), timings),
+            _timed('get_wrong_answers', get_wrong_answers_async("emulated", "bench", employee_id), timings),
+            _timed('post_webhook', post_webhook_async(webhook_url, {"embeds": [{"title": f"SOS {employee_id}"}]}), timings),
+        )
+
+def run(users, rounds, use_async=False, **emulator_options):
+    server = start_emulator(**emulator_options)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    timings = defaultdict(list)
+    try:
+        with patch.object(sheet_handler, 'SHEETS_API_URL', base_url):
+            sheet_handler._get_gspread_client.cache_clear()
+            failures_before = _failure_counts()
+            start = time.perf_counter()
+            if use_async:
+                run_concurrently(*[
+                    _simulate_user_async(user_index, rounds, f"{base_url}/api/webhooks/1/bench", timings)
+                    for user_index in range(users)
+                ])
+            else:
+                with ThreadPoolExecutor(max_workers=users) as pool:
+                    futures = [
+                        pool.submit(_simulate_user, user_index, rounds, f"{base_url}/api/webhooks/1/bench", timings)
+                        for user_index in range(users)
+                    ]
+                    for future in futures:
+                        future.result()  # re-raises a crashed simulated user
+            elapsed = time.perf_counter() - start
+            failures_after = _failure_counts()
+            sheet_handler._get_gspread_client.cache_clear()
+    finally:
+        server.shutdown()
+
+    failures = {name: failures_after.get(stage, 0) - failures_before.get(stage, 0) for name, stage in STAGES.items()}
+    total = sum(len(samples) for samples in timings.values())
+    print(f"{'async' if use_async else 'sync'}: {users} users x {rounds} rounds: {total} calls in {elapsed:.2f}s ({total / elapsed:.1f} calls/s)")
+    print(f"{'call':<20}{'count':>7}{'failed':>8}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for name, samples in timings.items():
+        durations = [d * 1000 for d in samples]
+        print(f"{name:<20}{len(samples):>7}{failures[name]:>8}{statistics.median(durations):>10.1f}{_percentile(durations, 0.95):>10.1f}{max(durations):>10.1f}")
+    return timings, failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--sheets-latency", default="lognormal:80,0.4")
+    parser.add_argument("--discord-latency", default="normal:120,30")
+    parser.add_argument("--sheets-read-quota", type=int, default=0)
+    parser.add_argument("--sheets-write-quota", type=int, default=0)
+    parser.add_argument("--discord-quota", type=int, default=0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--async", dest="use_async", action="store_true", help="overlap each user's calls on the shared async I/O loop")
+    args = parser.parse_args(argv)
+    run(
+        args.users, args.rounds,
+        use_async=args.use_async,
+        sheets_latency=args.sheets_latency,
+        discord_latency=args.discord_latency,
+        sheets_read_quota=args.sheets_read_quota,
+        sheets_write_quota=args.sheets_write_quota,
+        discord_quota=args.discord_quota,
+        failure_rate=args.failure_rate,
+    )
+
+if __name__ == "__main__":
+    main()
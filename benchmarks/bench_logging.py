@@ -0,0 +1,60 @@
+"""
+Per-message cost of logger.info() on the calling thread: the previous
+synchronous console + RotatingFileHandler setup vs. the queue-based setup in
+utils.logger. Run from the repository root:
+
+    python -m benchmarks.bench_logging [messages]
+"""
+import os
+import sys
+import time
+import queue
+import logging
+import tempfile
+from logging.handlers import RotatingFileHandler, QueueListener
+
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "sol_bench_app.log"))
+from utils.logger import TEXT_FORMAT, _InProcessQueueHandler, _build_file_handler
+
+def _sync_logger(log_file, stream):
+    logger = logging.getLogger("bench-sync")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    formatter = logging.Formatter(TEXT_FORMAT)
+    for handler in (logging.StreamHandler(stream), RotatingFileHandler(log_file, maxBytes=5*1024*1024, backupCount=3, encoding='utf-8')):
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+    return logger, None
+
+def _async_logger(log_file, stream):
+    logger = logging.getLogger("bench-async")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(_InProcessQueueHandler(log_queue))
+    stream_handler = logging.StreamHandler(stream)
+    stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    listener = QueueListener(log_queue, stream_handler, _build_file_handler(log_file))
+    listener.start()
+    return logger, listener
+
+def run(messages=20000):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir, open(os.devnull, "w") as devnull:
+        for name, factory in (("sync", _sync_logger), ("async", _async_logger)):
+            logger, listener = factory(os.path.join(tmp_dir, f"{name}.log"), devnull)
+            start = time.perf_counter()
+            for i in range(messages):
+                logger.info(f"Fetching scores for doc {i}")
+            elapsed = time.perf_counter() - start
+            if listener is not None:
+                listener.stop()
+            for handler in list(logger.handlers):
+                handler.close()
+                logger.removeHandler(handler)
+            results[name] = elapsed / messages * 1e6
+            print(f"{name:>5}: {results[name]:6.2f} us/message (calling thread, {messages} messages)")
+    return results
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,132 @@
+"""
+Scaled benchmarks of the ranking and sheet-read code paths
+(get_all_scores, get_unique_doc_names, calculate_ranking, get_wrong_answers)
+over synthetic monthly-sharded logs served by in-memory gspread fakes.
+
+Reports wall time (best of --repeat runs) and peak traced memory per case,
+and exits non-zero when a case regresses past --threshold against the
+stored baselines. Run from the repository root:
+
+    python -m benchmarks.bench_read_paths                      # 10k, 100k, 1M rows
+    python -m benchmarks.bench_read_paths --sizes 10000 100000
+    python -m benchmarks.bench_read_paths --update-baseline
+
+Baselines are machine-specific: refresh them with --update-baseline when the
+benchmark host changes, and review the diff like any other change.
+"""
+import os
+import gc
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from unittest.mock import patch
+
+from benchmarks.fakes import FakeClient, make_spreadsheet
+from utils.ranking_handler import get_all_scores, get_unique_doc_names, calculate_ranking
+from utils.sheet_handler import get_wrong_answers
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "read_paths.json")
+# Allowed slowdown / memory growth before a case counts as a regression
+DEFAULT_THRESHOLD = 0.5
+# Cases faster than this are too noisy to gate on wall time
+MIN_GATED_SECONDS = 0.005
+
+def _measure(func, repeat):
+    """
+    Returns (best wall seconds, peak traced MiB). Timing runs are untraced;
+    one extra traced run measures peak memory.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / (1024 * 1024)
+
+def run_cases(sizes, repeat):
+    results = {}
+    for size in sizes:
+        client = FakeClient(make_spreadsheet(score_rows=size, wrong_answer_rows=size))
+        with patch('utils.ranking_handler._get_gspread_client', return_value=client), \
+             patch('utils.sheet_handler._get_gspread_client', return_value=client):
+            scores = get_all_scores("bench", "bench")
+            doc_name = get_unique_doc_names(scores)[0]
+            doc_scores = scores[scores['Doc_Name'] == doc_name]
+            cases = {
+                'get_all_scores': lambda: get_all_scores("bench", "bench"),
+                'get_unique_doc_names': lambda: get_unique_doc_names(scores),
+                'calculate_ranking': lambda: calculate_ranking(doc_scores.copy()),
+                'get_wrong_answers': lambda: get_wrong_answers("bench", "bench", "E000001"),
+            }
+            for name, func in cases.items():
+                wall, peak = _measure(func, repeat if size < 1_000_000 else 1)
+                key = f"{name}[{size}]"
+                results[key] = {'wall_s': round(wall, 4), 'peak_mb': round(peak, 1)}
+                print(f"{key:<34} {wall * 1000:10.1f} ms {peak:10.1f} MiB", flush=True)
+        del client, scores, doc_scores
+        gc.collect()
+    return results
+
+def compare(results, baselines, threshold):
+    """
+    Returns a list of human-readable regressions against baselines.
+    """
+    regressions = []
+    for key, current in results.items():
+        baseline = baselines.get(key)
+        if baseline is None:
+            continue
+        if baseline['wall_s'] >= MIN_GATED_SECONDS and current['wall_s'] > baseline['wall_s'] * (1 + threshold):
+            regressions.append(f"{key}: wall {current['wall_s']:.4f}s vs baseline {baseline['wall_s']:.4f}s")
+        if current['peak_mb'] > max(baseline['peak_mb'], 1.0) * (1 + threshold):
+            regressions.append(f"{key}: peak {current['peak_mb']:.1f} MiB vs baseline {baseline['peak_mb']:.1f} MiB")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    results = run_cases(args.sizes, args.repeat)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baselines = json.load(f)
+
+    if args.update_baseline:
+        baselines.update(results)
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(dict(sorted(baselines.items())), f, indent=2)
+            f.write("\n")
+        print(f"Baselines written to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baselines, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nNo regressions beyond {args.threshold:.0%} ({len(baselines)} baselines).")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,582 @@
+"""
+Local stand-in for Google Sheets (the v4 API subset gspread uses here) and
+Discord webhooks, with configurable latency, per-minute quotas and injected
+failures, so sheet_handler / ranking_handler / discord_sender can be
+load-tested offline.
+
+    python -m benchmarks.emulator --port 8765 \\
+        --sheets-latency lognormal:80,0.4 --sheets-read-quota 300 --sheets-write-quota 60 \\
+        --discord-latency normal:120,30 --discord-quota 30 --failure-rate 0.01
+
+Point the app at it:
+
+    SHEETS_API_URL=http://localhost:8765
+    DISCORD_WEBHOOK_URL=http://localhost:8765/api/webhooks/1/emulated
+
+Sheets endpoints: spreadsheet metadata (GET /v4/spreadsheets/{id}),
+:batchUpdate (addSheet, deleteSheet, updateSheetProperties, appendCells,
+updateCells), values get / update / :append and values:batchGet. Spreadsheets
+are created empty on first access. Discord: POST /api/webhooks/{id}/{token}.
+Control endpoints: GET /_emulator/stats, GET /_emulator/discord/messages,
+POST /_emulator/reset.
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from collections import deque, Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+DEFAULT_ROW_COUNT = 1000
+DEFAULT_COLUMN_COUNT = 26
+
+# --- Latency distributions ---
+def parse_latency(spec):
+    """
+    Parses 'fixed:MS', 'uniform:MIN,MAX', 'normal:MEAN,SD' or
+    'lognormal:MEDIAN,SIGMA' (milliseconds) into a sampler returning seconds.
+    """
+    kind, _, params = (spec or "fixed:0").partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    if kind == "fixed":
+        return lambda rng: values[0] / 1000
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1])) / 1000
+    if kind == "lognormal":
+        import math
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1]) / 1000
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+class MinuteQuota:
+    """
+    Sliding one-minute request window. limit=0 disables the quota.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._hits = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, now=None):
+        """
+        Returns (allowed, remaining, seconds until a slot frees up).
+        """
+        if not self.limit:
+            return True, None, 0.0
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            while self._hits and now - self._hits[0] >= 60:
+                self._hits.popleft()
+            if len(self._hits) >= self.limit:
+                return False, 0, 60 - (now - self._hits[0])
+            self._hits.append(now)
+            return True, self.limit - len(self._hits), (60 - (now - self._hits[0])) if self._hits else 0.0
+
+# --- A1 notation ---
+_CELL_RE = re.compile(r"^([A-Z]*)(\d*)$")
+
+def _column_index(letters):
+    index = 0
+    for ch in letters:
+        index = index * 26 + (ord(ch) - ord('A') + 1)
+    return index - 1
+
+def _column_letters(index):
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(ord('A') + rem) + letters
+    return letters
+
+def parse_range(a1):
+    """
+    Splits "'Sheet 1'!A2:C5" into (title, (row0, col0, row1, col1)) with
+    zero-based inclusive bounds; missing bounds are None.
+    """
+    if "!" in a1:
+        title, cells = a1.rsplit("!", 1)
+    else:
+        title, cells = a1, ""
+        # A bare cell reference without a sheet name is not used by gspread here
+    if title.startswith("'") and title.endswith("'"):
+        title = title[1:-1].replace("''", "'")
+    if not cells:
+        return title, (None, None, None, None)
+    start, _, end = cells.upper().partition(":")
+    start_match = _CELL_RE.match(start)
+    end_match = _CELL_RE.match(end or start)
+    col0 = _column_index(start_match.group(1)) if start_match.group(1) else None
+    row0 = int(start_match.group(2)) - 1 if start_match.group(2) else None
+    col1 = _column_index(end_match.group(1)) if end_match.group(1) else None
+    row1 = int(end_match.group(2)) - 1 if end_match.group(2) else None
+    return title, (row0, col0, row1, col1)
+
+def _format_value(value, render_option):
+    if render_option in ("UNFORMATTED_VALUE", "FORMULA"):
+        return value
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def _cell_value(cell):
+    entered = cell.get("userEnteredValue", {})
+    for key in ("stringValue", "numberValue", "boolValue", "formulaValue"):
+        if key in entered:
+            return entered[key]
+    return ""
+
+class SheetsError(Exception):
+    def __init__(self, status, message, reason="INVALID_ARGUMENT"):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+
+# --- Sheets state ---
+class EmulatedSpreadsheet:
+    def __init__(self, spreadsheet_id):
+        self.spreadsheet_id = spreadsheet_id
+        self.sheets = []   # list of {'properties': {...}, 'rows': [[...]]}
+        self._next_sheet_id = 1
+        self.lock = threading.Lock()
+        self._add_sheet({"title": "Sheet1"})
+
+    def _add_sheet(self, properties):
+        title = properties.get("title") or f"Sheet{self._next_sheet_id}"
+        if self._find(title) is not None:
+            raise SheetsError(400, f"A sheet with the name \"{title}\" already exists.")
+        grid = properties.get("gridProperties", {})
+        sheet = {
+            'properties': {
+                "sheetId": properties.get("sheetId", self._next_sheet_id),
+                "title": title,
+                "index": len(self.sheets),
+                "sheetType": "GRID",
+                "gridProperties": {
+                    "rowCount": grid.get("rowCount", DEFAULT_ROW_COUNT),
+                    "columnCount": grid.get("columnCount", DEFAULT_COLUMN_COUNT),
+                },
+            },
+            'rows': [],
+        }
+        self._next_sheet_id = max(self._next_sheet_id, sheet['properties']['sheetId']) + 1
+        self.sheets.append(sheet)
+        return sheet
+
+    def _find(self, title=None, sheet_id=None):
+        for sheet in self.sheets:
+            if title is not None and sheet['properties']['title'] == title:
+                return sheet
+            if sheet_id is not None and sheet['properties']['sheetId'] == sheet_id:
+                return sheet
+        return None
+
+    def _require(self, title=None, sheet_id=None):
+        sheet = self._find(title, sheet_id)
+        if sheet is None:
+            raise SheetsError(400, f"Unable to parse range: {title if title is not None else sheet_id}")
+        return sheet
+
+    def metadata(self):
+        return {
+            "spreadsheetId": self.spreadsheet_id,
+            "properties": {"title": f"Emulated {self.spreadsheet_id}", "locale": "ko_KR", "timeZone": "Asia/Seoul"},
+            "sheets": [{"properties": json.loads(json.dumps(s['properties']))} for s in self.sheets],
+        }
+
+    @staticmethod
+    def _fit_grid(sheet):
+        grid = sheet['properties']['gridProperties']
+        grid['rowCount'] = max(grid['rowCount'], len(sheet['rows']))
+        width = max((len(row) for row in sheet['rows']), default=0)
+        grid['columnCount'] = max(grid['columnCount'], width)
+
+    def _write(self, sheet, row0, col0, values):
+        rows = sheet['rows']
+        for r, row_values in enumerate(values):
+            index = row0 + r
+            while len(rows) <= index:
+                rows.append([])
+            row = rows[index]
+            while len(row) < col0 + len(row_values):
+                row.append("")
+            row[col0:col0 + len(row_values)] = list(row_values)
+        self._fit_grid(sheet)
+
+    def _last_used_row(self, sheet):
+        rows = sheet['rows']
+        for index in range(len(rows) - 1, -1, -1):
+            if any(value != "" for value in rows[index]):
+                return index + 1
+        return 0
+
+    def batch_update(self, body):
+        replies = []
+        for request in body.get("requests", []):
+            (kind, params), = request.items()
+            if kind == "addSheet":
+                sheet = self._add_sheet(params.get("properties", {}))
+                replies.append({"addSheet": {"properties": json.loads(json.dumps(sheet['properties']))}})
+                continue
+            if kind == "deleteSheet":
+                sheet = self._require(sheet_id=params["sheetId"])
+                self.sheets.remove(sheet)
+                for index, remaining in enumerate(self.sheets):
+                    remaining['properties']['index'] = index
+            elif kind == "updateSheetProperties":
+                properties = params["properties"]
+                sheet = self._require(sheet_id=properties["sheetId"])
+                grid = properties.get("gridProperties", {})
+                if "rowCount" in grid:
+                    del sheet['rows'][grid["rowCount"]:]
+                    sheet['properties']['gridProperties']['rowCount'] = grid["rowCount"]
+                if "columnCount" in grid:
+                    sheet['properties']['gridProperties']['columnCount'] = grid["columnCount"]
+                if "title" in properties:
+                    sheet['properties']['title'] = properties["title"]
+            elif kind == "appendCells":
+                sheet = self._require(sheet_id=params["sheetId"])
+                values = [[_cell_value(cell) for cell in row.get("values", [])] for row in params.get("rows", [])]
+                self._write(sheet, self._last_used_row(sheet), 0, values)
+            elif kind == "updateCells":
+                start = params["start"]
+                sheet = self._require(sheet_id=start["sheetId"])
+                values = [[_cell_value(cell) for cell in row.get("values", [])] for row in params.get("rows", [])]
+                self._write(sheet, start.get("rowIndex", 0), start.get("columnIndex", 0), values)
+            else:
+                raise SheetsError(400, f"Request type '{kind}' is not supported by the emulator.")
+            replies.append({})
+        return {"spreadsheetId": self.spreadsheet_id, "replies": replies}
+
+    def values_get(self, a1, render_option=None):
+        title, (row0, col0, row1, col1) = parse_range(a1)
+        sheet = self._require(title=title)
+        rows = sheet['rows'][:self._last_used_row(sheet)]
+        row0, col0 = row0 or 0, col0 or 0
+        selected = rows[row0:(row1 + 1) if row1 is not None else None]
+        values = []
+        for row in selected:
+            cells = row[col0:(col1 + 1) if col1 is not None else None]
+            while cells and cells[-1] == "":
+                cells = cells[:-1]
+            values.append([_format_value(v, render_option) for v in cells])
+        while values and not values[-1]:
+            values.pop()
+        quoted = "'" + title.replace("'", "''") + "'"
+        last_col = _column_letters(max(col1 if col1 is not None else max((len(r) for r in values), default=1) + col0 - 1, col0))
+        result = {"range": f"{quoted}!{_column_letters(col0)}{row0 + 1}:{last_col}{row0 + max(len(values), 1)}", "majorDimension": "ROWS"}
+        if values:
+            result["values"] = values
+        return result
+
+    def values_update(self, a1, values):
+        title, (row0, col0, _, _) = parse_range(a1)
+        sheet = self._require(title=title)
+        self._write(sheet, row0 or 0, col0 or 0, values)
+        return {
+            "spreadsheetId": self.spreadsheet_id,
+            "updatedRange": a1,
+            "updatedRows": len(values),
+            "updatedColumns": max((len(r) for r in values), default=0),
+            "updatedCells": sum(len(r) for r in values),
+        }
+
+    def values_append(self, a1, values):
+        title, (_, col0, _, _) = parse_range(a1)
+        sheet = self._require(title=title)
+        start = self._last_used_row(sheet)
+        self._write(sheet, start, col0 or 0, values)
+        quoted = "'" + title.replace("'", "''") + "'"
+        return {
+            "spreadsheetId": self.spreadsheet_id,
+            "tableRange": f"{quoted}!A1:{_column_letters(max((len(r) for r in sheet['rows']), default=1) - 1)}{max(start, 1)}",
+            "updates": {
+                "spreadsheetId": self.spreadsheet_id,
+                "updatedRange": f"{quoted}!A{start + 1}",
+                "updatedRows": len(values),
+                "updatedColumns": max((len(r) for r in values), default=0),
+                "updatedCells": sum(len(r) for r in values),
+            },
+        }
+
+# --- Server ---
+class EmulatorState:
+    def __init__(self, sheets_latency="fixed:0", discord_latency="fixed:0",
+                 sheets_read_quota=0, sheets_write_quota=0, discord_quota=0,
+                 failure_rate=0.0, seed=None):
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.sheets_latency = parse_latency(sheets_latency)
+        self.discord_latency = parse_latency(discord_latency)
+        self.quotas = {
+            'sheets_read': MinuteQuota(sheets_read_quota),
+            'sheets_write': MinuteQuota(sheets_write_quota),
+            'discord': MinuteQuota(discord_quota),
+        }
+        self.failure_rate = failure_rate
+        self.spreadsheets = {}
+        self.discord_messages = []
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        self.latency_total = Counter()
+
+    def spreadsheet(self, spreadsheet_id):
+        with self.lock:
+            if spreadsheet_id not in self.spreadsheets:
+                self.spreadsheets[spreadsheet_id] = EmulatedSpreadsheet(spreadsheet_id)
+            return self.spreadsheets[spreadsheet_id]
+
+    def sample(self, sampler):
+        with self.rng_lock:
+            return sampler(self.rng)
+
+    def should_fail(self):
+        if not self.failure_rate:
+            return False
+        with self.rng_lock:
+            return self.rng.random() < self.failure_rate
+
+    def record(self, quota_key, status, latency):
+        with self.lock:
+            self.stats[f"{quota_key} {status}"] += 1
+            self.latency_total[quota_key] += latency
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "responses": dict(self.stats),
+                "injected_latency_s": {k: round(v, 3) for k, v in self.latency_total.items()},
+                "spreadsheets": {
+                    sid: {s['properties']['title']: len(s['rows']) for s in sh.sheets}
+                    for sid, sh in self.spreadsheets.items()
+                },
+                "discord_messages": len(self.discord_messages),
+            }
+
+_SHEETS_PREFIX = "/v4/spreadsheets/"
+_WEBHOOK_RE = re.compile(r"^/api/webhooks/([^/]+)/([^/]+)$")
+
+class EmulatorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        if body is not None:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode("utf-8"))
+
+    def _google_error(self, status, message, reason):
+        self._send_json(status, {"error": {"code": status, "message": message, "status": reason}})
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def _dispatch(self, method):
+        parts = urlsplit(self.path)
+        path = parts.path
+        query = parse_qs(parts.query)
+        try:
+            # Always consume the request body first, so error answers (429/5xx)
+            # leave nothing unread on a kept-alive connection
+            self.body = self._read_json() if method in ("POST", "PUT") else {}
+            if path.startswith("/_emulator/"):
+                self._control(method, path)
+            elif path.startswith(_SHEETS_PREFIX):
+                self._sheets(method, path[len(_SHEETS_PREFIX):], query)
+            elif _WEBHOOK_RE.match(path) and method == "POST":
+                self._discord(path, query)
+            else:
+                self._send_json(404, {"message": "404: Not Found", "code": 0})
+        except SheetsError as e:
+            self._google_error(e.status, str(e), e.reason)
+        except Exception as e:
+            # The body may be unread or unparsable here; don't reuse the connection
+            self.close_connection = True
+            self._google_error(500, f"Emulator error: {e}", "INTERNAL")
+
+    def _control(self, method, path):
+        if path == "/_emulator/stats":
+            self._send_json(200, self.state.snapshot())
+        elif path == "/_emulator/discord/messages":
+            with self.state.lock:
+                self._send_json(200, list(self.state.discord_messages))
+        elif path == "/_emulator/reset" and method == "POST":
+            with self.state.lock:
+                self.state.spreadsheets.clear()
+                self.state.discord_messages.clear()
+                self.state.stats.clear()
+                self.state.latency_total.clear()
+            self._send_json(200, {"reset": True})
+        else:
+            self._send_json(404, {"error": "unknown control endpoint"})
+
+    def _sheets(self, method, rest, query):
+        quota_key = 'sheets_read' if method == "GET" else 'sheets_write'
+        latency = self.state.sample(self.state.sheets_latency)
+        time.sleep(latency)
+
+        allowed, _, _ = self.state.quotas[quota_key].acquire()
+        if not allowed:
+            self.state.record(quota_key, 429, latency)
+            kind = "Read" if quota_key == 'sheets_read' else "Write"
+            self._google_error(429, f"Quota exceeded for quota metric '{kind} requests' and limit '{kind} requests per minute per user'.", "RESOURCE_EXHAUSTED")
+            return
+        if self.state.should_fail():
+            self.state.record(quota_key, 503, latency)
+            self._google_error(503, "The service is currently unavailable.", "UNAVAILABLE")
+            return
+
+        spreadsheet_id, _, tail = rest.partition("/")
+        render_option = (query.get("valueRenderOption") or [None])[0]
+        if ":" in spreadsheet_id:
+            spreadsheet_id, _, action = spreadsheet_id.partition(":")
+        else:
+            action = None
+        sheet = self.state.spreadsheet(spreadsheet_id)
+        body = self.body
+
+        with sheet.lock:
+            if action == "batchUpdate" and method == "POST":
+                result = sheet.batch_update(body)
+            elif not tail and not action and method == "GET":
+                result = sheet.metadata()
+            elif tail == "values:batchGet" and method == "GET":
+                result = {
+                    "spreadsheetId": spreadsheet_id,
+                    "valueRanges": [sheet.values_get(r, render_option) for r in query.get("ranges", [])],
+                }
+            elif tail.startswith("values/"):
+                a1 = unquote(tail[len("values/"):])
+                if a1.endswith(":append") and method == "POST":
+                    result = sheet.values_append(a1[:-len(":append")], body.get("values", []))
+                elif method == "PUT":
+                    result = sheet.values_update(a1, body.get("values", []))
+                elif method == "GET":
+                    result = sheet.values_get(a1, render_option)
+                else:
+                    raise SheetsError(400, f"Unsupported values call: {method} {a1}")
+            else:
+                raise SheetsError(404, f"Unsupported Sheets call: {method} /v4/spreadsheets/{rest}", "NOT_FOUND")
+
+        self.state.record(quota_key, 200, latency)
+        self._send_json(200, result)
+
+    def _discord(self, path, query):
+        latency = self.state.sample(self.state.discord_latency)
+        time.sleep(latency)
+        quota = self.state.quotas['discord']
+        allowed, remaining, reset_after = quota.acquire()
+        if not allowed:
+            self.state.record('discord', 429, latency)
+            self._send_json(
+                429,
+                {"message": "You are being rate limited.", "retry_after": round(reset_after, 3), "global": False},
+                {"Retry-After": str(int(reset_after) + 1), "X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": f"{reset_after:.3f}"},
+            )
+            return
+        if self.state.should_fail():
+            self.state.record('discord', 500, latency)
+            self._send_json(500, {"message": "500: Internal Server Error", "code": 0})
+            return
+
+        payload = self.body
+        embeds = payload.get("embeds", [])
+        embed_chars = sum(len(json.dumps(embed, ensure_ascii=False)) for embed in embeds)
+        if len(embeds) > 10 or (not embeds and not payload.get("content")):
+            self.state.record('discord', 400, latency)
+            self._send_json(400, {"message": "Invalid Form Body", "code": 50035})
+            return
+
+        with self.state.lock:
+            self.state.discord_messages.append({"webhook": path, "payload": payload, "received_at": time.time(), "embed_chars": embed_chars})
+            message_id = len(self.state.discord_messages)
+        self.state.record('discord', 200, latency)
+        headers = {}
+        if quota.limit:
+            headers = {"X-RateLimit-Limit": str(quota.limit), "X-RateLimit-Remaining": str(remaining), "X-RateLimit-Reset-After": f"{reset_after:.3f}"}
+        if (query.get("wait") or ["false"])[0] == "true":
+            self._send_json(200, {"id": str(message_id), "embeds": embeds}, headers)
+        else:
+            self._send_json(204, None, headers)
+
+class EmulatorServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, state):
+        super().__init__(address, EmulatorHandler)
+        self.state = state
+
+def start_emulator(port=0, host="127.0.0.1", **options):
+    """
+    Starts the emulator on a daemon thread (port 0 picks a free port) and
+    returns the server; its base URL is f"http://{host}:{server.server_port}".
+    """
+    server = EmulatorServer((host, port), EmulatorState(**options))
+    threading.Thread(target=server.serve_forever, name="service-emulator", daemon=True).start()
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--sheets-latency", default="lognormal:80,0.4")
+    parser.add_argument("--discord-latency", default="normal:120,30")
+    parser.add_argument("--sheets-read-quota", type=int, default=300, help="requests/minute, 0 = unlimited")
+    parser.add_argument("--sheets-write-quota", type=int, default=60, help="requests/minute, 0 = unlimited")
+    parser.add_argument("--discord-quota", type=int, default=30, help="requests/minute, 0 = unlimited")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of requests answered with 5xx")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    server = EmulatorServer((args.host, args.port), EmulatorState(
+        sheets_latency=args.sheets_latency,
+        discord_latency=args.discord_latency,
+        sheets_read_quota=args.sheets_read_quota,
+        sheets_write_quota=args.sheets_write_quota,
+        discord_quota=args.discord_quota,
+        failure_rate=args.failure_rate,
+        seed=args.seed,
+    ))
+    print(f"Emulator listening on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+In-memory stand-ins for the parts of gspread the read paths use
+(Client.open_by_key, Spreadsheet.worksheets / worksheet, Worksheet.get_all_values /
+get_all_records), plus synthetic log generators for the benchmarks.
+"""
+import json
+import random
+from datetime import datetime, timedelta
+from utils.sheet_handler import SCORE_HEADERS, WRONG_ANSWER_HEADERS, TIMESTAMP_FORMAT, _shard_title, _question_key
+
+class FakeWorksheet:
+    def __init__(self, title, values):
+        self.title = title
+        self._values = values
+
+    def get_all_values(self):
+        return [list(row) for row in self._values]
+
+    def get_all_records(self):
+        # Same shape as gspread: header row zipped with every data row
+        if not self._values:
+            return []
+        headers = self._values[0]
+        return [dict(zip(headers, row)) for row in self._values[1:]]
+
+class FakeSpreadsheet:
+    def __init__(self, worksheets):
+        self._worksheets = {ws.title: ws for ws in worksheets}
+
+    def worksheets(self):
+        return list(self._worksheets.values())
+
+    def worksheet(self, title):
+        try:
+            return self._worksheets[title]
+        except KeyError:
+            raise Exception(f"WorksheetNotFound: {title}")
+
+class FakeClient:
+    def __init__(self, spreadsheet):
+        self._spreadsheet = spreadsheet
+
+    def open_by_key(self, spreadsheet_id):
+        return self._spreadsheet
+
+def _monthly_shards(base_title, rows, headers, months, end):
+    """
+    Splits rows (oldest first) evenly across `months` monthly shards ending at `end`.
+    """
+    shards = []
+    per_shard = -(-len(rows) // months)
+    for i in range(months):
+        when = (end.replace(day=1) - timedelta(days=31 * (months - 1 - i))).replace(day=1)
+        chunk = rows[i * per_shard:(i + 1) * per_shard]
+        shards.append(FakeWorksheet(_shard_title(base_title, when), [list(headers)] + chunk))
+    return shards
+
+def make_score_rows(count, employees, docs, end, seed=0):
+    rng = random.Random(seed)
+    start = end - timedelta(days=365)
+    step = (end - start) / max(count, 1)
+    return [
+        [
+            (start + step * i).strftime(TIMESTAMP_FORMAT),
+            f"E{rng.randrange(employees):06d}",
+            f"Doc_{rng.randrange(docs):03d}.pdf",
+            rng.choice((0, 20, 40, 60, 80, 100)),
+            f"{i:032x}",
+        ]
+        for i in range(count)
+    ]
+
+def make_wrong_answer_rows(count, employees, docs, questions, end, seed=0):
+    rng = random.Random(seed)
+    start = end - timedelta(days=365)
+    step = (end - start) / max(count, 1)
+    question_pool = []
+    for q in range(questions):
+        info = {"question": f"Question {q}", "options": ["A", "B", "C", "D"]}
+        question_pool.append((json.dumps(info, ensure_ascii=False), _question_key(info)))
+
+    rows = []
+    for i in range(count):
+        info_json, key = question_pool[rng.randrange(questions)]
+        rows.append([
+            (start + step * i).strftime(TIMESTAMP_FORMAT),
+            f"E{rng.randrange(employees):06d}",
+            f"Doc_{rng.randrange(docs):03d}.pdf",
+            info_json,
+            "A",
+            rng.choice(("B", "C", "D")),
+            key,
+            1,
+        ])
+    return rows
+
+def make_spreadsheet(score_rows=0, wrong_answer_rows=0, months=12, end=None, seed=0):
+    """
+    Builds a fake spreadsheet with monthly 'log_scores' / 'log_wrong_answers'
+    shards holding the requested number of synthetic rows.
+    """
+    end = end or datetime.now()
+    employees = max(score_rows, wrong_answer_rows) // 20 or 1
+    worksheets = []
+    if score_rows:
+        rows = make_score_rows(score_rows, employees, 50, end, seed)
+        worksheets += _monthly_shards('log_scores', rows, SCORE_HEADERS, months, end)
+    if wrong_answer_rows:
+        rows = make_wrong_answer_rows(wrong_answer_rows, employees, 50, 2000, end, seed)
+        worksheets += _monthly_shards('log_wrong_answers', rows, WRONG_ANSWER_HEADERS, months, end)
+    return FakeSpreadsheet(worksheets)
@@ -0,0 +1,235 @@
+"""
+Concurrent-session load test of app.py on Streamlit's app-testing API.
+
+Every simulated new hire runs the full flow in its own AppTest session:
+open the app, generate a quiz, answer every question (wrong answers are
+committed with the attempt), save the result (score), open the leaderboard
+and look up their wrong answers. Quiz generation is stubbed (fixed quiz after
+--llm-latency seconds) and storage goes to the local service emulator
+(benchmarks/emulator.py), so nothing leaves the machine.
+
+AppTest cannot drive st.file_uploader, so "generate" submits the job to
+utils.quiz_jobs the way the upload button does and then reruns the app until
+the polling fragment has started the quiz.
+
+AppTest swaps process-wide state (the Runtime singleton, config options) on
+every run, so two sessions cannot overlap inside one interpreter. Each
+simulated user therefore runs in its own spawned process; all of them share
+the emulator, and a barrier releases them together once imports and the app's
+background warmup (utils.startup) are done, so start-up cost stays out of the
+numbers. User processes are not daemonic: the warmup starts the PDF extraction
+pool, and daemonic processes cannot have children. Job queueing is per process here, so
+the quiz_jobs concurrency limits are not exercised across users.
+
+    python -m benchmarks.load_test --concurrency 1 2 4 8 --sessions-per-user 2
+
+Reports p50 / p95 / p99 per interaction and throughput for each concurrency level.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+from collections import defaultdict
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+INTERACTIONS = ["load", "generate", "answer", "save_result", "leaderboard", "wrong_answers"]
+
+STUB_QUIZ = [
+    {
+        "question": f"Load test question {i + 1}",
+        "options": ["보기1", "보기2", "보기3", "보기4"],
+        "answer": "보기1",
+        "explanation": "Stubbed explanation.",
+    }
+    for i in range(5)
+]
+
+def _stub_generate(latency):
+    def generate(api_key, files):
+        time.sleep(latency)
+        return [dict(q) for q in STUB_QUIZ], None
+    return generate
+
+def _button(at, label):
+    for button in at.button:
+        if button.label == label:
+            return button
+    raise AssertionError(f"Button '{label}' not found")
+
+class _Timer:
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.timings[self.name].append(time.perf_counter() - self.start)
+
+def run_session(user_id, timings, poll_interval=0.05, timeout=60):
+    """
+    Drives one user through the full flow; returns True when it completed.
+    """
+    from streamlit.testing.v1 import AppTest
+    from utils.quiz_jobs import submit_quiz_job
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    with _Timer(timings, "load"):
+        at.run()
+
+    with _Timer(timings, "generate"):
+        doc_bytes = f"%PDF stub document {user_id}".encode("utf-8")
+        at.session_state.user_name = user_id
+        at.session_state.uploaded_file_name = "LoadTest.pdf"
+        at.session_state.quiz_job_id = submit_quiz_job(user_id, [("LoadTest.pdf", doc_bytes)], os.environ["GOOGLE_API_KEY"])
+        deadline = time.time() + timeout
+        while not at.session_state.quiz_active:
+            if time.time() > deadline:
+                raise TimeoutError(f"Quiz for {user_id} was not generated in time")
+            time.sleep(poll_interval)
+            at.run()
+
+    for index, question in enumerate(STUB_QUIZ):
+        with _Timer(timings, "answer"):
+            # Alternate right / wrong answers so wrong answers get recorded
+            choice = question["answer"] if index % 2 == 0 else question["options"][1]
+            at.radio(key=f"q_{index}").set_value(choice)
+            _button(at, "정답 확인").click().run()
+            _button(at, "다음 문제").click().run()
+
+    with _Timer(timings, "save_result"):
+        _button(at, "결과 저장 및 홈으로").click().run()
+    if at.session_state.quiz_active:
+        raise AssertionError(f"Result of {user_id} was not saved")
+
+    with _Timer(timings, "leaderboard"):
+        at.button(key="nav_ranking").click().run()
+
+    with _Timer(timings, "wrong_answers"):
+        at.button(key="nav_wrong_answers").click().run()
+        at.text_input[0].input(user_id)
+        _button(at, "조회하기").click().run()
+    if at.exception:
+        raise AssertionError(f"Session {user_id} raised: {at.exception}")
+    if not any(caption.value.startswith("총 2개") for caption in at.caption):
+        raise AssertionError(f"Wrong answers of {user_id} were not found")
+    return True
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct * (len(ordered) - 1))))]
+
+def _user_process(user_prefix, sessions, env, sheets_api_url, llm_latency, barrier, results):
+    """
+    Entry point of one simulated user: points the app at the emulator, waits
+    for the other users, runs its sessions and reports (timings, errors).
+    """
+    os.environ.update(env)
+    sys.path.insert(0, os.path.dirname(APP_PATH))
+    from streamlit.testing.v1 import AppTest  # noqa: F401  (import before the clock starts)
+    from utils import sheet_handler, quiz_jobs, pdf_extractor
+    from utils.startup import start_warmup
+
+    sheet_handler.SHEETS_API_URL = sheets_api_url
+    sheet_handler._get_gspread_client.cache_clear()
+    quiz_jobs._generate = _stub_generate(llm_latency)
+
+    # The app starts the warmup once per process; finish it here so its heavy
+    # imports don't run alongside the timed interactions of the first session
+    start_warmup(os.environ["GOOGLE_API_KEY"], os.getenv("GOOGLE_SHEET_CREDENTIALS")).join()
+
+    timings = defaultdict(list)
+    errors = []
+    barrier.wait()
+    for session_index in range(sessions):
+        user_id = f"{user_prefix}S{session_index}"
+        try:
+            run_session(user_id, timings)
+        except Exception as e:
+            errors.append(f"{user_id}: {e}")
+    results.put((dict(timings), errors))
+
+    # multiprocessing joins this process' children before the interpreter shuts
+    # the pool down, so the warmed extraction workers would block the exit
+    if pdf_extractor._pool is not None:
+        pdf_extractor._pool.shutdown()
+
+def run_level(concurrency, sessions_per_user, level_index, env, sheets_api_url, llm_latency):
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(concurrency + 1)
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(
+            target=_user_process,
+            args=(f"L{level_index}U{i:03d}", sessions_per_user, env, sheets_api_url, llm_latency, barrier, results),
+        )
+        for i in range(concurrency)
+    ]
+    for process in processes:
+        process.start()
+    barrier.wait()
+    start = time.perf_counter()
+
+    timings = defaultdict(list)
+    errors = []
+    for _ in processes:
+        user_timings, user_errors = results.get()
+        for name, samples in user_timings.items():
+            timings[name].extend(samples)
+        errors.extend(user_errors)
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+
+    flows = concurrency * sessions_per_user - len(errors)
+    interactions = sum(len(v) for v in timings.values())
+    print(f"\nconcurrency={concurrency}: {flows} flows / {elapsed:.2f}s = {flows / elapsed:.2f} flows/s, "
+          f"{interactions / elapsed:.1f} interactions/s, {len(errors)} failed")
+    print(f"  {'interaction':<15}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name in INTERACTIONS:
+        samples = [s * 1000 for s in timings.get(name, [])]
+        if samples:
+            print(f"  {name:<15}{len(samples):>7}{_percentile(samples, 0.50):>10.1f}{_percentile(samples, 0.95):>10.1f}{_percentile(samples, 0.99):>10.1f}")
+    for error in errors[:5]:
+        print(f"  ! {error}")
+    return timings, errors
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--sessions-per-user", type=int, default=2)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per stubbed quiz generation")
+    parser.add_argument("--sheets-latency", default="lognormal:80,0.4")
+    parser.add_argument("--discord-latency", default="normal:120,30")
+    args = parser.parse_args(argv)
+
+    data_dir = tempfile.mkdtemp(prefix="sol_load_")
+    from benchmarks.emulator import start_emulator
+
+    server = start_emulator(sheets_latency=args.sheets_latency, discord_latency=args.discord_latency)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    env = {
+        "GOOGLE_API_KEY": "load-test",
+        "SPREADSHEET_ID": "load-test",
+        "DISCORD_WEBHOOK_URL": f"{base_url}/api/webhooks/1/load-test",
+        "ANALYTICS_DB_PATH": os.path.join(data_dir, "analytics.db"),
+        "SOS_OUTBOX_PATH": os.path.join(data_dir, "sos_outbox.db"),
+        "QUIZ_CHECKPOINT_PATH": os.path.join(data_dir, "quiz_checkpoints.db"),
+        "METRICS_FILE": os.path.join(data_dir, "metrics.prom"),
+        "LOG_FILE": os.path.join(data_dir, "app.log"),
+    }
+    failed = 0
+    try:
+        for level_index, concurrency in enumerate(args.concurrency):
+            _, errors = run_level(concurrency, args.sessions_per_user, level_index, env, base_url, args.llm_latency)
+            failed += len(errors)
+    finally:
+        server.shutdown()
+    print(f"\nData written to {data_dir}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
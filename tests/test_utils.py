@@ -1,18 +1,62 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import tempfile
+import threading
 import unittest
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, patch
-import json
-import os
-from utils.discord_sender import send_sos_message
+
+import requests
+
+from utils import async_io, discord_sender, pdf_extractor, quiz_jobs, sos_dispatcher
+from utils import logger as logger_module
+from utils.analytics_handler import record_attempt, rebuild_from_sheets, get_question_stats, get_doc_stats, get_hardest_questions, get_doc_trend
+from utils.discord_sender import (
+    send_sos_message, post_webhook, build_sos_embed, enqueue_sos, flush_outbox,
+    get_outbox_message, get_outbox_stats, OUTBOX_PENDING, OUTBOX_SENT,
+)
 from utils.gemini_handler import GeminiHandler
-from utils.sheet_handler import save_score
+from utils.log_compactor import compact_log
+from utils.logger import logger, JsonFormatter, _InProcessQueueHandler
+from utils.metrics import instrument, mark_failed, get_stage_summary, export_prometheus, write_prometheus
+from utils.profiler import profile_call
+from utils.quiz_checkpoints import save_checkpoint, load_checkpoint, delete_checkpoint
+from utils.ranking_handler import get_all_scores
+from utils.sheet_handler import (
+    _get_gspread_client, _employee_locks, _shard_title, _month_start, _get_read_worksheets, _read_log_records, _question_key,
+    save_score, save_wrong_answer, get_wrong_answers, get_wrong_answers_page, get_wrong_answers_async,
+    new_attempt, add_answer, add_wrong_answer, commit_attempt, WRONG_ANSWER_HEADERS, SCORE_HEADERS,
+)
+from utils.sos_dispatcher import dispatch_sos, get_sos_status, STATUS_PENDING, STATUS_SENT, STATUS_FAILED
+from utils.startup import lazy_import, get_startup_report
+from benchmarks.bench_read_paths import compare
+from benchmarks.emulator import start_emulator
+from benchmarks.fakes import FakeClient, make_spreadsheet
 
 class TestUtils(unittest.TestCase):
 
-    @patch('utils.discord_sender.requests.post')
-    def test_send_sos_message(self, mock_post):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        outbox_patch = patch('utils.discord_sender.OUTBOX_DB_PATH', os.path.join(self.tmp_dir.name, "outbox.db"))
+        outbox_patch.start()
+        self.addCleanup(outbox_patch.stop)
+        self.addCleanup(self.tmp_dir.cleanup)
+        # The gspread client is cached per credentials; start each test unauthenticated
+        _get_gspread_client.cache_clear()
+
+    @patch('utils.discord_sender._get_session')
+    def test_send_sos_message(self, mock_get_session):
         # Setup mock
         mock_response = MagicMock()
+        mock_response.status_code = 204
+        mock_response.headers = {}
         mock_response.raise_for_status.return_value = None
+        mock_post = mock_get_session.return_value.post
         mock_post.return_value = mock_response
 
         # Test data
@@ -33,9 +77,123 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(args[0], webhook_url)
         self.assertIn("embeds", kwargs['json'])
         self.assertEqual(kwargs['json']['embeds'][0]['title'], "[SOS] TestUser 사원의 질문입니다.")
+        self.assertIn("timeout", kwargs)
+
+    @patch('utils.discord_sender._get_session')
+    def test_send_sos_message_posts_only_its_own_message(self, mock_get_session):
+        mock_post = mock_get_session.return_value.post
+        mock_post.return_value = MagicMock(status_code=204, headers={})
+        other_id = enqueue_sos("http://fake.webhook", build_sos_embed("Other", "Q", "B", "A", "Why?"))
+
+        self.assertTrue(send_sos_message("http://fake.webhook", "TestUser", "Q", "B", "A", "Why?"))
+
+        mock_post.assert_called_once()
+        embeds = mock_post.call_args.kwargs['json']['embeds']
+        self.assertEqual([e['title'] for e in embeds], ["[SOS] TestUser 사원의 질문입니다."])
+        # Left for the background sender
+        self.assertEqual(get_outbox_message(other_id)['status'], OUTBOX_PENDING)
+
+    @patch('utils.discord_sender.time.sleep')
+    @patch('utils.discord_sender._get_session')
+    def test_post_webhook_retries_after_rate_limit(self, mock_get_session, mock_sleep):
+        limited = MagicMock(status_code=429, headers={})
+        limited.json.return_value = {"retry_after": 0.5}
+        ok = MagicMock(status_code=204, headers={})
+        mock_get_session.return_value.post.side_effect = [limited, ok]
+
+        success, error = post_webhook("http://fake.webhook/rate", {"embeds": []})
+
+        self.assertTrue(success)
+        self.assertIsNone(error)
+        self.assertEqual(mock_get_session.return_value.post.call_count, 2)
+        self.assertAlmostEqual(mock_sleep.call_args[0][0], 0.5, places=1)
+
+    @patch('utils.discord_sender.time.sleep')
+    @patch('utils.discord_sender._get_session')
+    def test_post_webhook_fits_claim_lease(self, mock_get_session, mock_sleep):
+        self.assertGreater(discord_sender.CLAIM_LEASE, discord_sender.POST_WEBHOOK_BUDGET)
+
+        # A bucket reset beyond MAX_RETRY_WAIT fails fast instead of outlasting the lease
+        webhook_url = "http://fake.webhook/long"
+        with patch.dict(discord_sender._bucket_reset_at, {webhook_url: time.monotonic() + discord_sender.MAX_RETRY_WAIT + 60}):
+            success, error = post_webhook(webhook_url, {"embeds": []})
+
+        self.assertFalse(success)
+        self.assertEqual(error, "Discord rate limit")
+        mock_get_session.return_value.post.assert_not_called()
+        mock_sleep.assert_not_called()
+
+    @patch('utils.sos_dispatcher.save_mentoring_log_async', return_value=True)
+    @patch('utils.sos_dispatcher.start_outbox_sender')
+    @patch('utils.discord_sender._get_session')
+    def test_dispatch_sos_reports_status(self, mock_get_session, mock_start_sender, mock_save):
+        mock_get_session.return_value.post.side_effect = requests.exceptions.ConnectionError("boom")
+        ticket_id = dispatch_sos("http://fake.webhook", "creds", "sheet", "User", "Q", "B", "A", "Why?")
+        self.assertEqual(get_sos_status(ticket_id)['discord'], STATUS_PENDING)
+
+        # A failed post stays queued in the outbox for a retry
+        flush_outbox()
+
+        status = get_sos_status(ticket_id)
+        for _ in range(100):
+            if status['sheet'] != STATUS_PENDING:
+                break
+            time.sleep(0.01)
+            status = get_sos_status(ticket_id)
+
+        self.assertEqual(status['discord'], STATUS_PENDING)
+        self.assertEqual(status['sheet'], STATUS_SENT)
+        self.assertEqual(status['errors']['discord'], "boom")
+
+    @patch('utils.sos_dispatcher.MAX_TICKETS', 2)
+    @patch('utils.sos_dispatcher.save_mentoring_log_async', return_value=True)
+    @patch('utils.sos_dispatcher.start_outbox_sender')
+    @patch('utils.discord_sender._get_session')
+    def test_delivered_tickets_are_pruned(self, mock_get_session, mock_start_sender, mock_save):
+        mock_get_session.return_value.post.return_value = MagicMock(status_code=204, headers={})
+        with patch.dict('utils.sos_dispatcher._tickets', clear=True):
+            first = dispatch_sos("http://fake.webhook", "creds", "sheet", "User", "Q1", "B", "A", "Why?")
+            for i in range(2):
+                dispatch_sos("http://fake.webhook", "creds", "sheet", "User", f"Q{i + 2}", "B", "A", "Why?")
+            flush_outbox()
+            for _ in range(100):
+                if all(t['sheet'] != STATUS_PENDING for t in sos_dispatcher._tickets.values()):
+                    break
+                time.sleep(0.01)
+
+            # Delivered through the outbox, so the oldest ticket counts as finished
+            dispatch_sos("http://fake.webhook", "creds", "sheet", "User", "Q4", "B", "A", "Why?")
+            self.assertNotIn(first, sos_dispatcher._tickets)
+            self.assertEqual(len(sos_dispatcher._tickets), 3)
+
+    @patch('utils.discord_sender._get_session')
+    def test_outbox_coalesces_and_replays(self, mock_get_session):
+        ok = MagicMock(status_code=204, headers={})
+        mock_post = mock_get_session.return_value.post
+        mock_post.side_effect = requests.exceptions.ConnectionError("down")
+
+        embeds = [build_sos_embed(f"User{i}", "Q", "B", "A", "Why?") for i in range(12)]
+        ids = [enqueue_sos("http://fake.webhook", embed) for embed in embeds]
+
+        # Outage: nothing delivered, everything stays in the outbox
+        self.assertEqual(flush_outbox(), 0)
+        self.assertEqual(get_outbox_message(ids[0])['status'], OUTBOX_PENDING)
+
+        # Recovery: replayed as digests of at most 10 embeds
+        mock_post.side_effect = None
+        mock_post.return_value = ok
+        with patch('utils.discord_sender.time.time', return_value=time.time() + 10):
+            self.assertEqual(flush_outbox(), 12)
+
+        sizes = [len(call.kwargs['json']['embeds']) for call in mock_post.call_args_list[1:]]
+        self.assertEqual(sizes, [10, 2])
+        message = get_outbox_message(ids[-1])
+        self.assertEqual(message['status'], OUTBOX_SENT)
+        self.assertGreater(message['latency'], 0)
+        self.assertEqual(get_outbox_stats()['counts'], {OUTBOX_SENT: 12})
 
     @patch('utils.gemini_handler.genai.GenerativeModel')
-    @patch('utils.gemini_handler.PyPDFLoader')
+    @patch('langchain_community.document_loaders.PyPDFLoader')
     def test_gemini_handler(self, mock_loader, mock_model_cls):
         # Setup Mocks
         mock_model_instance = MagicMock()
@@ -61,6 +219,14 @@ class TestUtils(unittest.TestCase):
         mock_loader_instance.load.return_value = [mock_page]
         mock_loader.return_value = mock_loader_instance
 
+        # Extraction runs on the shared pool; use threads so the loader mock applies
+        pool = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(pool.shutdown)
+        for p in (patch('utils.pdf_extractor._get_pool', return_value=pool),
+                  patch('utils.pdf_extractor.TEXT_CACHE_PATH', os.path.join(self.tmp_dir.name, "pdf_text_cache.db"))):
+            p.start()
+            self.addCleanup(p.stop)
+
         # Execute
         handler = GeminiHandler("fake_key")
 
@@ -87,6 +253,7 @@ class TestUtils(unittest.TestCase):
         mock_gc.open_by_key.return_value = mock_sh
         # save_score looks for 'log_scores' worksheet
         mock_sh.worksheet.return_value = mock_ws
+        mock_ws.get_all_values.return_value = [list(SCORE_HEADERS)]
 
         # Execute
         result = save_score("fake_creds.json", "fake_id", "User", "File", 100)
@@ -100,5 +267,790 @@ class TestUtils(unittest.TestCase):
         # index 3 is Score (0=Time, 1=ID, 2=Doc, 3=Score)
         self.assertEqual(row[3], 100)
 
+def _fake_worksheet(title, records=None, sheet_id=0):
+    ws = MagicMock()
+    ws.title = title
+    ws.id = sheet_id
+    ws.row_count = 1000
+    ws.col_count = 20
+    ws.get_all_records.return_value = records or []
+    ws.get_all_values.return_value = [["header"]]
+    return ws
+
+def _mock_spreadsheet(mock_service_account, worksheets, value_ranges=None):
+    # Wires the patched gspread.service_account to a spreadsheet holding worksheets;
+    # value_ranges (one list of rows per range) feed values_batch_get
+    mock_gc = MagicMock()
+    mock_sh = MagicMock()
+    mock_service_account.return_value = mock_gc
+    mock_gc.open_by_key.return_value = mock_sh
+    mock_sh.worksheets.return_value = worksheets
+    if worksheets:
+        mock_sh.worksheet.return_value = worksheets[-1]
+    if value_ranges is not None:
+        mock_sh.values_batch_get.return_value = {'valueRanges': [{'values': values} for values in value_ranges]}
+    return mock_sh
+
+class TestLogSharding(unittest.TestCase):
+
+    def test_shard_title(self):
+        self.assertEqual(_shard_title('log_scores', datetime(2026, 10, 5)), 'log_scores_2026_10')
+
+    def test_read_worksheets_only_touch_needed_shards(self):
+        sh = MagicMock()
+        sh.worksheets.return_value = [
+            _fake_worksheet('log_scores_2026_10'),
+            _fake_worksheet('log_scores_2026_08'),
+            _fake_worksheet('log_scores_summary'),
+            _fake_worksheet('log_scores_2026_09'),
+            _fake_worksheet('log_wrong_answers_2026_10'),
+        ]
+
+        titles = [ws.title for ws in _get_read_worksheets(sh, 'log_scores', since=datetime(2026, 9, 15))]
+        self.assertEqual(titles, ['log_scores_summary', 'log_scores_2026_09', 'log_scores_2026_10'])
+
+    def test_read_log_records_filters_by_timestamp(self):
+        sh = MagicMock()
+        sh.worksheets.return_value = [
+            _fake_worksheet('log_scores_2026_09', [
+                {'Timestamp': '2026-09-01 10:00:00', 'Score': 40},
+                {'Timestamp': '2026-09-20 10:00:00', 'Score': 60},
+            ]),
+        ]
+
+        records = _read_log_records(sh, 'log_scores', since=datetime(2026, 9, 15))
+        self.assertEqual([r['Score'] for r in records], [60])
+
+    def test_compact_log_folds_closed_shards(self):
+        summary = _fake_worksheet('log_scores_summary', [
+            {'Timestamp': '2026-07-01 09:00:00', 'Employee_ID': 'A', 'Doc_Name': 'Doc', 'Score': 60},
+        ], sheet_id=1)
+        closed = _fake_worksheet('log_scores_2026_08', [
+            {'Timestamp': '2026-08-02 09:00:00', 'Employee_ID': 'A', 'Doc_Name': 'Doc', 'Score': 80},
+            {'Timestamp': '2026-08-03 09:00:00', 'Employee_ID': 'B', 'Doc_Name': 'Doc', 'Score': 40},
+        ], sheet_id=2)
+        current = _fake_worksheet('log_scores_2026_10', sheet_id=3)
+
+        sh = MagicMock()
+        sh.worksheets.return_value = [summary, closed, current]
+        sh.worksheet.return_value = summary
+
+        compacted = compact_log(sh, 'log_scores', now=datetime(2026, 10, 19))
+        self.assertEqual(compacted, 1)
+
+        body = sh.batch_update.call_args[0][0]
+        deleted = [r['deleteSheet']['sheetId'] for r in body['requests'] if 'deleteSheet' in r]
+        self.assertEqual(deleted, [2])
+
+        update = next(r['updateCells'] for r in body['requests'] if 'updateCells' in r)
+        scores = [row['values'][3]['userEnteredValue']['numberValue'] for row in update['rows'][1:]]
+        self.assertEqual(sorted(scores), [40, 80])
+
+        # Attempts and correct answers of every folded row are kept for analytics
+        totals = sorted(
+            tuple(cell['userEnteredValue']['numberValue'] for cell in row['values'][3:6])
+            for row in update['rows'][1:]
+        )
+        self.assertEqual(totals, [(40, 1, 2), (80, 2, 7)])
+
+class TestWrongAnswerDedup(unittest.TestCase):
+
+    def setUp(self):
+        _get_gspread_client.cache_clear()
+
+    QUESTION = {"question": "Q1", "options": ["A", "B"]}
+
+    def test_question_key_is_stable(self):
+        same = {"options": ["A ", "B"], "question": " Q1"}
+        self.assertEqual(_question_key(self.QUESTION), _question_key(same))
+        self.assertNotEqual(_question_key(self.QUESTION), _question_key({"question": "Q1", "options": ["B", "A"]}))
+
+    @patch('utils.sheet_handler.os.path.exists', return_value=True)
+    @patch('utils.sheet_handler.gspread.service_account')
+    def test_repeat_miss_updates_count(self, mock_service_account, _):
+        key = _question_key(self.QUESTION)
+        ws = _fake_worksheet('log_wrong_answers_2026_10')
+        ws.get_all_values.return_value = [
+            WRONG_ANSWER_HEADERS,
+            ['2026-10-01 10:00:00', 'User', 'Doc', json.dumps(self.QUESTION), 'A', 'B', key, '2'],
+        ]
+        _mock_spreadsheet(mock_service_account, [ws])
+
+        result = save_wrong_answer("fake_creds.json", "fake_id", "User", "Doc", self.QUESTION, "A", "B")
+
+        self.assertTrue(result)
+        ws.append_row.assert_not_called()
+        values, range_name = ws.update.call_args[0]
+        self.assertEqual(range_name, "A2:H2")
+        self.assertEqual(values[0][7], 3)
+
+    @patch('utils.sheet_handler.os.path.exists', return_value=True)
+    @patch('utils.sheet_handler.gspread.service_account')
+    def test_concurrent_misses_are_all_counted(self, mock_service_account, _):
+        key = _question_key(self.QUESTION)
+        rows = [
+            list(WRONG_ANSWER_HEADERS),
+            ['2026-10-01 10:00:00', 'User', 'Doc', json.dumps(self.QUESTION), 'A', 'B', key, '1'],
+        ]
+
+        def read_values():
+            snapshot = [list(row) for row in rows]
+            time.sleep(0.05)  # widen the read-modify-write window
+            return snapshot
+
+        def write_row(values, range_name):
+            rows[1] = [str(v) for v in values[0]]
+
+        ws = _fake_worksheet('log_wrong_answers_2026_10')
+        ws.get_all_values.side_effect = read_values
+        ws.update.side_effect = write_row
+        _mock_spreadsheet(mock_service_account, [ws])
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(
+                lambda _: save_wrong_answer("fake_creds.json", "fake_id", "User", "Doc", self.QUESTION, "A", "B"),
+                range(4),
+            ))
+
+        self.assertEqual(results, [True] * 4)
+        self.assertEqual(rows[1][7], '5')
+        # Locks are dropped once nobody holds or waits for them
+        self.assertEqual(_employee_locks, {})
+
+    @patch('utils.sheet_handler.os.path.exists', return_value=True)
+    @patch('utils.sheet_handler.gspread.service_account')
+    def test_get_wrong_answers_merges_and_ranks(self, mock_service_account, _):
+        other = {"question": "Q2", "options": ["C", "D"]}
+        summary = _fake_worksheet('log_wrong_answers_summary', [
+            {'Timestamp': '2026-08-01 10:00:00', 'Employee_ID': 'User', 'Doc_Name': 'Doc',
+             'Question_Info': json.dumps(self.QUESTION), 'Correct_Answer': 'A', 'User_Selected_Answer': 'B', 'Miss_Count': 2},
+        ])
+        shard = _fake_worksheet('log_wrong_answers_2026_10', [
+            {'Timestamp': '2026-10-02 10:00:00', 'Employee_ID': 'User', 'Doc_Name': 'Doc',
+             'Question_Info': json.dumps(other), 'Correct_Answer': 'C', 'User_Selected_Answer': 'D',
+             'Question_Key': _question_key(other), 'Miss_Count': 1},
+            {'Timestamp': '2026-10-03 10:00:00', 'Employee_ID': 'User', 'Doc_Name': 'Doc',
+             'Question_Info': json.dumps(self.QUESTION), 'Correct_Answer': 'A', 'User_Selected_Answer': 'A2',
+             'Question_Key': _question_key(self.QUESTION), 'Miss_Count': 1},
+        ])
+        _mock_spreadsheet(mock_service_account, [summary, shard])
+
+        results = get_wrong_answers("fake_creds.json", "fake_id", "User")
+
+        self.assertEqual([r['Question_Text'] for r in results], ['Q1', 'Q2'])
+        self.assertEqual(results[0]['Miss_Count'], 3)
+        self.assertEqual(results[0]['User_Selected_Answer'], 'A2')
+
+    @patch('utils.sheet_handler.os.path.exists', return_value=True)
+    @patch('utils.sheet_handler.gspread.service_account')
+    def test_get_wrong_answers_page_filters_and_paginates(self, mock_service_account, _):
+        rows = []
+        for i in range(5):
+            info = {"question": f"Q{i}", "options": ["A", "B"]}
+            rows.append({'Timestamp': f'2026-10-0{i + 1} 10:00:00', 'Employee_ID': 'User', 'Doc_Name': 'Doc' if i < 4 else 'Other',
+                         'Question_Info': json.dumps(info), 'Correct_Answer': 'A', 'User_Selected_Answer': 'B',
+                         'Question_Key': _question_key(info), 'Miss_Count': 1})
+        rows.append(dict(rows[0], Employee_ID='Someone'))
+        _mock_spreadsheet(mock_service_account, [_fake_worksheet('log_wrong_answers_2026_10', rows)])
+
+        first = get_wrong_answers_page("fake_creds.json", "fake_id", "User", doc_name="Doc", page_size=3)
+        second = get_wrong_answers_page("fake_creds.json", "fake_id", "User", doc_name="Doc", page_size=3, cursor=first['Next_Cursor'])
+
+        self.assertEqual(first['Total'], 4)
+        self.assertEqual(first['Doc_Names'], ['Doc', 'Other'])
+        self.assertEqual([r['Question_Text'] for r in first['Items']], ['Q3', 'Q2', 'Q1'])
+        self.assertEqual([r['Question_Text'] for r in second['Items']], ['Q0'])
+        self.assertIsNone(second['Next_Cursor'])
+        self.assertEqual(first['Items'][0]['Options'], ["A", "B"])
+
+class TestCommitAttempt(unittest.TestCase):
+
+    def setUp(self):
+        _get_gspread_client.cache_clear()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        store_patch = patch('utils.quiz_checkpoints.DB_PATH', os.path.join(self.tmp_dir.name, "quiz_checkpoints.db"))
+        store_patch.start()
+        self.addCleanup(store_patch.stop)
+
+    QUESTION = {"question": "Q1", "options": ["A", "B"]}
+
+    def _mock_sheet(self, mock_service_account, score_values, wrong_values):
+        shards = [
+            _fake_worksheet(_shard_title('log_scores'), sheet_id=1),
+            _fake_worksheet(_shard_title('log_wrong_answers'), sheet_id=2),
+        ]
+        return _mock_spreadsheet(mock_service_account, shards, value_ranges=[score_values, wrong_values])
+
+    @patch('utils.sheet_handler.os.path.exists', return_value=True)
+    @patch('utils.sheet_handler.gspread.service_account')
+    def test_single_batch_and_idempotent(self, mock_service_account, _):
+        key = _question_key(self.QUESTION)
+        mock_sh = self._mock_sheet(
+            mock_service_account,
+            [SCORE_HEADERS],
+            [WRONG_ANSWER_HEADERS, ['2026-10-01 10:00:00', 'User', 'Doc', '{}', 'A', 'B', key, '1']],
+        )
+
+        attempt = new_attempt("User", "Doc")
+        add_wrong_answer(attempt, self.QUESTION, "A", "B")
+        add_wrong_answer(attempt, {"question": "Q2", "options": ["C", "D"]}, "C", "D")
+
+        self.assertTrue(commit_attempt("fake_creds.json", "fake_id", attempt, 60))
+        self.assertTrue(commit_attempt("fake_creds.json", "fake_id", attempt, 60))
+
+        mock_sh.batch_update.assert_called_once()
+        mock_sh.add_worksheet.assert_not_called()
+        requests = mock_sh.batch_update.call_args[0][0]['requests']
+
+        update = next(r['updateCells'] for r in requests if 'updateCells' in r)
+        self.assertEqual(update['start']['rowIndex'], 1)
+        self.assertEqual(update['rows'][0]['values'][7]['userEnteredValue']['numberValue'], 2)
+
+        appends = {r['appendCells']['sheetId']: r['appendCells']['rows'] for r in requests if 'appendCells' in r}
+        self.assertEqual(len(appends[2]), 1)
+        score_row = appends[1][0]['values']
+        self.assertEqual(score_row[3]['userEnteredValue']['numberValue'], 60)
+        self.assertEqual(score_row[4]['userEnteredValue']['stringValue'], attempt['Attempt_ID'])
+
+    @patch('utils.sheet_handler.os.path.exists', return_value=True)
+    @patch('utils.sheet_handler.gspread.service_account')
+    def test_repeated_question_is_aggregated(self, mock_service_account, _):
+        key = _question_key(self.QUESTION)
+        mock_sh = self._mock_sheet(
+            mock_service_account,
+            [SCORE_HEADERS],
+            [WRONG_ANSWER_HEADERS, ['2026-10-01 10:00:00', 'User', 'Doc', '{}', 'A', 'B', key, '1']],
+        )
+
+        attempt = new_attempt("User", "Doc")
+        for _ in range(2):
+            add_wrong_answer(attempt, self.QUESTION, "A", "B")
+            add_wrong_answer(attempt, {"question": "Q2", "options": ["C", "D"]}, "C", "D")
+
+        self.assertTrue(commit_attempt("fake_creds.json", "fake_id", attempt, 0))
+        requests = mock_sh.batch_update.call_args[0][0]['requests']
+
+        # One write per question, carrying every miss of the attempt
+        updates = [r['updateCells'] for r in requests if 'updateCells' in r]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(updates[0]['rows'][0]['values'][7]['userEnteredValue']['numberValue'], 3)
+        appends = {r['appendCells']['sheetId']: r['appendCells']['rows'] for r in requests if 'appendCells' in r}
+        self.assertEqual(len(appends[2]), 1)
+        self.assertEqual(appends[2][0]['values'][7]['userEnteredValue']['numberValue'], 2)
+
+    @patch('utils.sheet_handler.os.path.exists', return_value=True)
+    @patch('utils.sheet_handler.gspread.service_account')
+    def test_skips_attempt_already_in_sheet(self, mock_service_account, _):
+        attempt = new_attempt("User", "Doc")
+        mock_sh = self._mock_sheet(
+            mock_service_account,
+            [SCORE_HEADERS, ['2026-10-01 10:00:00', 'User', 'Doc', '60', attempt['Attempt_ID']]],
+            [],
+        )
+
+        self.assertTrue(commit_attempt("fake_creds.json", "fake_id", attempt, 60))
+        mock_sh.batch_update.assert_not_called()
+        self.assertTrue(attempt['Committed'])
+
+    @patch('utils.sheet_handler.os.path.exists', return_value=True)
+    @patch('utils.sheet_handler.gspread.service_account')
+    def test_skips_attempt_from_last_month_or_compacted(self, mock_service_account, _):
+        attempt = new_attempt("User", "Doc")
+        previous_title = _shard_title('log_scores', _month_start(datetime.now()) - timedelta(days=1))
+        shards = [
+            _fake_worksheet(previous_title, sheet_id=3),
+            _fake_worksheet(_shard_title('log_scores'), sheet_id=1),
+            _fake_worksheet(_shard_title('log_wrong_answers'), sheet_id=2),
+        ]
+        # Committed before midnight on the 1st, retried after it
+        mock_sh = _mock_spreadsheet(mock_service_account, shards, value_ranges=[
+            [SCORE_HEADERS], [], [SCORE_HEADERS, ['2026-09-30 23:59:59', 'User', 'Doc', '60', attempt['Attempt_ID']]],
+        ])
+
+        self.assertTrue(commit_attempt("fake_creds.json", "fake_id", dict(attempt), 60))
+        mock_sh.batch_update.assert_not_called()
+        self.assertEqual(len(mock_sh.values_batch_get.call_args[0][0]), 3)
+
+        # Once last month's shard is compacted away, the local record still knows the attempt
+        mock_sh = self._mock_sheet(mock_service_account, [SCORE_HEADERS], [])
+        self.assertTrue(commit_attempt("fake_creds.json", "fake_id", dict(attempt), 60))
+        mock_sh.values_batch_get.assert_not_called()
+        mock_sh.batch_update.assert_not_called()
+
+class TestStartup(unittest.TestCase):
+
+    def test_lazy_import_defers_until_first_use(self):
+        import sys
+        sys.modules.pop('tabnanny', None)
+
+        module = lazy_import('tabnanny')
+        self.assertNotIn('tabnanny', sys.modules)
+
+        self.assertTrue(callable(module.check))
+        self.assertIn('tabnanny', sys.modules)
+        self.assertIn('import tabnanny', dict(get_startup_report()))
+
+        # Patching through the proxy patches (and restores) the real module
+        original = sys.modules['tabnanny'].check
+        with patch.object(module, 'check', return_value='patched'):
+            self.assertEqual(sys.modules['tabnanny'].check(), 'patched')
+        self.assertIs(sys.modules['tabnanny'].check, original)
+
+class TestAnalyticsHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "analytics.db")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _committed_attempt(self, doc_name, answers):
+        attempt = new_attempt("User", doc_name)
+        for question, correct, selected in answers:
+            add_answer(attempt, question, correct, selected)
+        attempt['Committed'] = True
+        return attempt
+
+    def test_incremental_question_and_doc_stats(self):
+        q1 = {"question": "Q1", "options": ["A", "B", "C"]}
+        q2 = {"question": "Q2", "options": ["A", "B"]}
+        when = datetime(2026, 10, 19, 9, 0, 0)
+
+        first = self._committed_attempt("Doc", [(q1, "A", "B"), (q2, "A", "A")])
+        self.assertTrue(record_attempt(first, when=when, db_path=self.db_path))
+        second = self._committed_attempt("Doc", [(q1, "A", "C"), (q1, "A", "C"), (q1, "A", "A")])
+        self.assertTrue(record_attempt(second, when=when, db_path=self.db_path))
+
+        # Counted once per attempt; abandoned (uncommitted) attempts never count
+        self.assertTrue(record_attempt(second, when=when, db_path=self.db_path))
+        abandoned = self._committed_attempt("Doc", [(q1, "A", "B")])
+        abandoned['Committed'] = False
+        self.assertFalse(record_attempt(abandoned, when=when, db_path=self.db_path))
+
+        stats = get_question_stats("Doc", _question_key(q1), db_path=self.db_path)
+        self.assertEqual((stats['Answers'], stats['Misses']), (4, 3))
+        self.assertAlmostEqual(stats['Miss_Rate'], 0.75)
+        self.assertEqual((stats['Top_Wrong_Option'], stats['Top_Wrong_Count']), ("C", 2))
+
+        # The same question in another document is tracked separately
+        record_attempt(self._committed_attempt("Other", [(q1, "A", "B")]), when=when, db_path=self.db_path)
+        self.assertEqual(get_question_stats("Other", _question_key(q1), db_path=self.db_path)['Answers'], 1)
+        self.assertEqual(get_question_stats("Doc", _question_key(q1), db_path=self.db_path)['Answers'], 4)
+
+        doc = [d for d in get_doc_stats(db_path=self.db_path) if d['Doc_Name'] == "Doc"][0]
+        self.assertEqual((doc['Answers'], doc['Misses']), (5, 3))
+
+        hardest = get_hardest_questions("Doc", limit=1, db_path=self.db_path)
+        self.assertEqual(hardest[0]['Question_Text'], "Q1")
+
+        trend = get_doc_trend("Doc", db_path=self.db_path)
+        self.assertEqual(trend, [{'Day': '2026-10-19', 'Answers': 5, 'Misses': 3, 'Miss_Rate': 0.6}])
+
+    @patch('utils.sheet_handler.os.path.exists', return_value=True)
+    @patch('utils.sheet_handler.gspread.service_account')
+    def test_rebuild_credits_only_the_latest_wrong_option(self, mock_service_account, _):
+        _get_gspread_client.cache_clear()
+        self.addCleanup(_get_gspread_client.cache_clear)
+        q1 = {"question": "Q1", "options": ["A", "B", "C"]}
+        wrong = _fake_worksheet('log_wrong_answers_2026_10', [
+            {'Timestamp': '2026-10-01 10:00:00', 'Employee_ID': 'User', 'Doc_Name': 'Doc',
+             'Question_Info': json.dumps(q1), 'Correct_Answer': 'A', 'User_Selected_Answer': 'C',
+             'Question_Key': _question_key(q1), 'Miss_Count': 3},
+        ])
+        _mock_spreadsheet(mock_service_account, [wrong])
+
+        self.assertTrue(rebuild_from_sheets("fake_creds.json", "fake_id", db_path=self.db_path))
+
+        stats = get_question_stats("Doc", _question_key(q1), db_path=self.db_path)
+        self.assertEqual(stats['Misses'], 3)
+        self.assertEqual((stats['Top_Wrong_Option'], stats['Top_Wrong_Count']), ("C", 1))
+
+class TestQuizJobs(unittest.TestCase):
+
+    def setUp(self):
+        for name, value in (('_jobs', quiz_jobs.OrderedDict()), ('_user_queues', {}),
+                            ('_user_order', quiz_jobs.deque()), ('_inflight_by_key', {})):
+            state_patch = patch.object(quiz_jobs, name, value)
+            state_patch.start()
+            self.addCleanup(state_patch.stop)
+
+    @patch('utils.quiz_jobs._ensure_workers')
+    def test_round_robin_dedup_and_admission(self, _):
+        a1 = quiz_jobs.submit_quiz_job("A", [("a1.pdf", b"doc-a1")], "key")
+        a2 = quiz_jobs.submit_quiz_job("A", [("a2.pdf", b"doc-a2")], "key")
+        b1 = quiz_jobs.submit_quiz_job("B", [("b1.pdf", b"doc-b1")], "key")
+
+        # Same document from another user collapses into the in-flight job
+        self.assertEqual(quiz_jobs.submit_quiz_job("C", [("copy.pdf", b"doc-a1")], "key"), a1)
+        with self.assertRaises(quiz_jobs.AdmissionError):
+            quiz_jobs.submit_quiz_job("A", [("a3.pdf", b"doc-a3")], "key")
+
+        # B's job is served before A's second one
+        self.assertEqual(quiz_jobs.get_job_status(b1)['queue_position'], 1)
+        self.assertEqual(quiz_jobs.get_job_status(a2)['queue_position'], 2)
+        with quiz_jobs._lock:
+            order = [quiz_jobs._next_job()['job_id'] for _ in range(3)]
+        self.assertEqual(order, [a1, b1, a2])
+
+    @patch('utils.quiz_jobs._ensure_workers')
+    def test_multi_file_track(self, _):
+        track = [("a.pdf", b"doc-a"), ("b.pdf", b"doc-b")]
+        job_id = quiz_jobs.submit_quiz_job("A", track, "key")
+
+        # Same documents in another order are the same track
+        self.assertEqual(quiz_jobs.submit_quiz_job("B", track[::-1], "key"), job_id)
+        self.assertEqual(quiz_jobs.get_job_status(job_id)['file_name'], "a.pdf + b.pdf")
+        self.assertEqual(quiz_jobs.get_files_hash(track[:1]), quiz_jobs.get_doc_hash(b"doc-a"))
+        with self.assertRaises(quiz_jobs.AdmissionError):
+            quiz_jobs.submit_quiz_job("C", [(f"{i}.pdf", bytes([i])) for i in range(quiz_jobs.MAX_FILES_PER_JOB + 1)], "key")
+
+    @patch('utils.quiz_jobs._generate', return_value=([{"question": "Q"}], None))
+    def test_worker_completes_job(self, mock_generate):
+        job_id = quiz_jobs.submit_quiz_job("A", [("doc.pdf", b"doc")], "key")
+        deadline = time.time() + 2
+        while quiz_jobs.get_job_status(job_id)['state'] != quiz_jobs.JOB_DONE and time.time() < deadline:
+            time.sleep(0.01)
+
+        status = quiz_jobs.get_job_status(job_id)
+        self.assertEqual(status['state'], quiz_jobs.JOB_DONE)
+        self.assertEqual(status['result'], [{"question": "Q"}])
+        self.assertEqual(status['doc_hash'], quiz_jobs.get_doc_hash(b"doc"))
+        mock_generate.assert_called_once_with("key", [("doc.pdf", b"doc")])
+
+def _make_pdf(text):
+    """
+    Builds a minimal one-page PDF showing text in Helvetica.
+    """
+    content = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return pdf
+
+class TestPdfExtractor(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.db_path = os.path.join(self.tmp_dir.name, "pdf_text_cache.db")
+
+    def _thread_pool(self):
+        pool = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(pool.shutdown)
+        return patch('utils.pdf_extractor._get_pool', return_value=pool)
+
+    def test_budget_is_fair_across_documents(self):
+        self.assertEqual(pdf_extractor.budget_chars([10, 500, 1000], 300), [10, 145, 145])
+        self.assertEqual(pdf_extractor.budget_chars([10, 20], 300), [10, 20])
+
+        combined = pdf_extractor.combine_texts([("a.pdf", "a" * 1000), ("b.pdf", "b" * 50)], 400)
+        self.assertLessEqual(len(combined), 400)
+        self.assertIn("b" * 50, combined)
+        self.assertIn("### 문서 1: a.pdf", combined)
+
+    @patch('utils.pdf_extractor._extract_text', side_effect=lambda file_bytes: f"text of {file_bytes.decode()}" if file_bytes != b"bad" else "")
+    def test_extracts_in_parallel_and_caches_by_content(self, mock_extract):
+        files = [("a.pdf", b"doc-a"), ("b.pdf", b"doc-b"), ("copy.pdf", b"doc-a"), ("bad.pdf", b"bad")]
+
+        with self._thread_pool():
+            texts = pdf_extractor.extract_texts(files, db_path=self.db_path)
+            self.assertEqual(texts, ["text of doc-a", "text of doc-b", "text of doc-a", None])
+            self.assertEqual(mock_extract.call_count, 3)
+
+            # Cached by content hash, whatever the file name
+            self.assertEqual(pdf_extractor.extract_texts([("renamed.pdf", b"doc-b")], db_path=self.db_path), ["text of doc-b"])
+            self.assertEqual(mock_extract.call_count, 3)
+
+    @patch('utils.pdf_extractor.EXTRACTION_WORKERS', 2)
+    def test_real_process_pool_parses_pdfs(self):
+        self.addCleanup(lambda: pdf_extractor._pool and pdf_extractor._reset_pool(pdf_extractor._pool))
+        files = [(f"doc{i}.pdf", _make_pdf(f"Hello document {i}")) for i in range(3)] + [("broken.pdf", b"not a pdf")]
+
+        texts = pdf_extractor.extract_texts(files, db_path=self.db_path)
+
+        # Parsed in spawned worker processes; a broken file doesn't fail the others
+        for i in range(3):
+            self.assertIn(f"Hello document {i}", texts[i])
+        self.assertIsNone(texts[3])
+
+class TestAsyncIO(unittest.TestCase):
+
+    @patch.dict(async_io.SERVICE_LIMITS, {"test": 2})
+    def test_service_limit_bounds_concurrency(self):
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+
+        def call(i):
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            time.sleep(0.05)
+            with lock:
+                state['running'] -= 1
+            return i
+
+        results = async_io.run_concurrently(*[async_io.run_io("test", call, i) for i in range(6)])
+        self.assertEqual(results, list(range(6)))
+        self.assertEqual(state['peak'], 2)
+
+        # Awaitable from another event loop; the call still runs on the shared one
+        self.assertEqual(asyncio.run(async_io.run_io("test", call, 7)), 7)
+
+    @patch('utils.async_io.LIVENESS_INTERVAL', 0.05)
+    def test_run_sync_does_not_hang(self):
+        with self.assertRaises(TimeoutError):
+            async_io.run_sync(asyncio.sleep(5), timeout=0.2)
+
+        # A loop thread that stops is detected, and the next call gets a fresh loop
+        async def stop_loop():
+            asyncio.get_running_loop().stop()
+            await asyncio.sleep(5)
+
+        with self.assertRaises(RuntimeError):
+            async_io.run_sync(stop_loop())
+        self.assertEqual(async_io.run_sync(asyncio.sleep(0, result=1)), 1)
+
+    def test_run_sync_refuses_the_loop_thread(self):
+        async def nested():
+            return async_io.run_sync(asyncio.sleep(0, result=1))
+
+        with self.assertRaises(RuntimeError):
+            async_io.submit(nested()).result(timeout=5)
+
+    def test_async_handler_matches_sync_wrapper(self):
+        client = FakeClient(make_spreadsheet(wrong_answer_rows=2000))
+        with patch('utils.sheet_handler._get_gspread_client', return_value=client):
+            expected = get_wrong_answers("bench", "bench", "E000001")
+            result = asyncio.run(get_wrong_answers_async("bench", "bench", "E000001"))
+        self.assertTrue(expected)
+        self.assertEqual(result, expected)
+
+class TestQuizCheckpoints(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.db_path = os.path.join(self.tmp_dir.name, "checkpoints.db")
+
+    def _state(self, doc_name, q_index):
+        return {
+            'quiz_data': [{"question": "Q1"}, {"question": "Q2"}],
+            'current_q_index': q_index,
+            'user_answers': {0: "A"},
+            'score': 20,
+            'answer_checked': False,
+            'quiz_submitted': False,
+            'attempt': new_attempt("E1", doc_name),
+            'uploaded_file_name': doc_name,
+        }
+
+    def test_resume_latest_and_expire(self):
+        save_checkpoint("E1", "hash-a", self._state("a.pdf", 1), db_path=self.db_path)
+        with patch('utils.quiz_checkpoints.time.time', return_value=time.time() + 5):
+            save_checkpoint("E1", "hash-b", self._state("b.pdf", 0), db_path=self.db_path)
+
+        latest = load_checkpoint("E1", db_path=self.db_path)
+        self.assertEqual((latest['Doc_Hash'], latest['Doc_Name']), ("hash-b", "b.pdf"))
+        resumed = load_checkpoint("E1", "hash-a", db_path=self.db_path)['State']
+        self.assertEqual(resumed['user_answers'], {0: "A"})
+        self.assertEqual(resumed['current_q_index'], 1)
+        self.assertIsNone(load_checkpoint("E2", db_path=self.db_path))
+
+        delete_checkpoint("E1", "hash-b", db_path=self.db_path)
+        self.assertEqual(load_checkpoint("E1", db_path=self.db_path)['Doc_Hash'], "hash-a")
+
+        with patch('utils.quiz_checkpoints.time.time', return_value=time.time() + 2 * 24 * 60 * 60):
+            self.assertIsNone(load_checkpoint("E1", db_path=self.db_path))
+
+class TestLogger(unittest.TestCase):
+
+    def test_logger_only_enqueues(self):
+        self.assertEqual([type(h) for h in logger.handlers], [_InProcessQueueHandler])
+
+    def test_json_formatter(self):
+        try:
+            raise ValueError("bad")
+        except ValueError:
+            record = logging.getLogger("test").makeRecord(
+                "test", logging.ERROR, "sheet_handler.py", 1, "Saved %s", ("score",), sys.exc_info(), func="save_score")
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual((entry['level'], entry['function'], entry['message']), ("ERROR", "save_score", "Saved score"))
+        self.assertIn("ValueError: bad", entry['exc_info'])
+
+    def test_child_processes_never_share_the_log_file(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        log_file = os.path.join(tmp_dir.name, "app.log")
+
+        with patch('utils.logger.LOG_MODE', "file"), patch('utils.logger.LOG_FILE', log_file):
+            self.assertEqual(logger_module._log_mode(), "file")
+            with patch('utils.logger.multiprocessing.parent_process', return_value=MagicMock()):
+                mode = logger_module._log_mode()
+                handlers = logger_module._build_output_handlers(mode)
+        for handler in handlers:
+            handler.close()
+
+        self.assertEqual(mode, "process")
+        self.assertEqual(handlers[-1].baseFilename, os.path.join(tmp_dir.name, f"app.{os.getpid()}.log"))
+
+class TestMetrics(unittest.TestCase):
+
+    def test_instrument_records_outcomes_and_exports(self):
+        @instrument("test.stage", size_of=lambda result, text: len(text))
+        def stage(text):
+            if text == "boom":
+                raise RuntimeError(text)
+            return None if text == "fail" else text
+
+        stage("hello")
+        stage("fail")
+        with self.assertRaises(RuntimeError):
+            stage("boom")
+
+        summary = {row['Stage']: row for row in get_stage_summary()}['test.stage']
+        self.assertEqual((summary['Calls'], summary['Failures'], summary['Errors']), (3, 1, 1))
+
+        text = export_prometheus()
+        pid = os.getpid()
+        self.assertIn(f'solution_stage_calls_total{{stage="test.stage",outcome="success",pid="{pid}"}} 1', text)
+        self.assertIn(f'solution_stage_duration_seconds_bucket{{stage="test.stage",outcome="error",pid="{pid}",le="+Inf"}} 1', text)
+        self.assertIn(f'solution_stage_payload_size_count{{stage="test.stage",pid="{pid}"}} 2', text)
+
+        # Each process writes its own file, so processes never overwrite each other
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with patch('utils.metrics.METRICS_FILE', os.path.join(tmp_dir, "metrics.prom")):
+                self.assertTrue(write_prometheus())
+            path = os.path.join(tmp_dir, f"metrics-{pid}.prom")
+            with open(path, encoding="utf-8") as f:
+                self.assertIn("# TYPE solution_stage_duration_seconds histogram", f.read())
+
+    def test_failed_reads_count_as_failures(self):
+        @instrument("test.read")
+        def read(fail):
+            if fail:
+                mark_failed()
+            return []
+
+        read(False)
+        read(True)
+        summary = {row['Stage']: row for row in get_stage_summary()}['test.read']
+        self.assertEqual((summary['Calls'], summary['Failures']), (2, 1))
+
+        # A handler whose read fails is counted as failed, not as an empty success
+        with patch('utils.ranking_handler._get_gspread_client', side_effect=RuntimeError("auth")):
+            self.assertTrue(get_all_scores("creds", "sheet").empty)
+        summary = {row['Stage']: row for row in get_stage_summary()}['ranking.get_all_scores']
+        self.assertGreaterEqual(summary['Failures'], 1)
+
+class TestProfiler(unittest.TestCase):
+
+    def test_profile_call_saves_captures_on_early_exit(self):
+        def slow_page():
+            time.sleep(0.05)
+            raise KeyboardInterrupt  # stands in for st.rerun()'s control-flow exception
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self.assertRaises(KeyboardInterrupt):
+                profile_call("home", slow_page, profile_dir=tmp_dir)
+            files = sorted(os.listdir(tmp_dir))
+            self.assertEqual([os.path.splitext(f)[1] for f in files], [".collapsed", ".prof"])
+            with open(os.path.join(tmp_dir, files[0]), encoding="utf-8") as f:
+                content = f.read()
+            self.assertIn("slow_page", content)
+            self.assertIn("script;", content)
+
+    def test_profile_call_samples_async_io_threads(self):
+        def slow_io():
+            time.sleep(0.1)
+
+        def page():
+            async_io.run_sync(async_io.run_io("sheets", slow_io))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            profile_call("home", page, profile_dir=tmp_dir)
+            collapsed = next(f for f in os.listdir(tmp_dir) if f.endswith(".collapsed"))
+            with open(os.path.join(tmp_dir, collapsed), encoding="utf-8") as f:
+                stacks = [line.rsplit(" ", 1)[0] for line in f]
+
+        # The I/O itself is attributed to the executor thread that ran it
+        self.assertTrue(any(s.startswith("async-io_") and "slow_io" in s for s in stacks))
+        self.assertTrue(any(s.startswith("script;") for s in stacks))
+
+class TestBenchmarks(unittest.TestCase):
+
+    def test_fakes_feed_read_paths(self):
+        client = FakeClient(make_spreadsheet(score_rows=200, wrong_answer_rows=200, months=3))
+        with patch('utils.ranking_handler._get_gspread_client', return_value=client), \
+             patch('utils.sheet_handler._get_gspread_client', return_value=client):
+            scores = get_all_scores("bench", "bench")
+            wrong = get_wrong_answers("bench", "bench", "E000001")
+        self.assertFalse(scores.empty)
+        self.assertTrue(all(entry['Miss_Count'] >= 1 for entry in wrong))
+
+    def test_compare_flags_regressions(self):
+        baselines = {'a[10]': {'wall_s': 0.1, 'peak_mb': 10.0}, 'b[10]': {'wall_s': 0.001, 'peak_mb': 0.0}}
+        results = {'a[10]': {'wall_s': 0.2, 'peak_mb': 11.0}, 'b[10]': {'wall_s': 0.004, 'peak_mb': 0.5}}
+        regressions = compare(results, baselines, 0.5)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("a[10]: wall"))
+
+class TestServiceEmulator(unittest.TestCase):
+
+    def setUp(self):
+        self.server = start_emulator(sheets_write_quota=4, discord_quota=1)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        url_patch = patch('utils.sheet_handler.SHEETS_API_URL', self.url)
+        url_patch.start()
+        self.addCleanup(url_patch.stop)
+        _get_gspread_client.cache_clear()
+        self.addCleanup(_get_gspread_client.cache_clear)
+
+    def test_gspread_round_trip_and_write_quota(self):
+        # add shard + header + row = 3 writes, within the quota of 4 per minute
+        self.assertTrue(save_score("emulated", "S1", "E1", "Doc", 80, "a1"))
+        scores = get_all_scores("emulated", "S1")
+        self.assertEqual(scores.iloc[0]['Employee_ID'], "E1")
+        self.assertEqual(int(scores.iloc[0]['Score']), 80)
+
+        # The 5th write of the minute is answered with 429, which the handler reports as a failure
+        self.assertTrue(save_score("emulated", "S1", "E2", "Doc", 60, "a2"))
+        self.assertFalse(save_score("emulated", "S1", "E3", "Doc", 40, "a3"))
+        stats = requests.get(f"{self.url}/_emulator/stats").json()
+        self.assertEqual(stats['responses']['sheets_write 429'], 1)
+
+    def test_discord_webhook_quota(self):
+        webhook = f"{self.url}/api/webhooks/1/token"
+        self.assertEqual(requests.post(webhook, json={"embeds": [{"title": "SOS"}]}).status_code, 204)
+        limited = requests.post(webhook, json={"embeds": [{"title": "SOS"}]})
+        self.assertEqual(limited.status_code, 429)
+        self.assertGreater(limited.json()['retry_after'], 0)
+        self.assertEqual(len(requests.get(f"{self.url}/_emulator/discord/messages").json()), 1)
+
+    def test_rejected_requests_keep_the_connection_usable(self):
+        webhook = f"{self.url}/api/webhooks/1/token"
+        with requests.Session() as session:
+            self.assertEqual(session.post(webhook, json={"embeds": [{"title": "SOS"}]}).status_code, 204)
+            # The 429 must not leave its body unread on the kept-alive connection
+            self.assertEqual(session.post(webhook, json={"embeds": [{"title": "x" * 2000}]}).status_code, 429)
+            stats = session.get(f"{self.url}/_emulator/stats")
+        self.assertEqual(stats.status_code, 200)
+        self.assertEqual(stats.json()['responses']['discord 429'], 1)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,356 @@
+import os
+import json
+import time
+from datetime import datetime
+from utils.sheet_handler import (
+    _get_gspread_client,
+    _read_log_records,
+    _question_key,
+    _question_key_from_record,
+    _miss_count,
+    _correct_answers,
+)
+from utils.local_store import connect
+from utils.logger import logger
+
+# Question difficulty aggregates, maintained incrementally as attempts are
+# committed. Every update is a handful of UPSERTs keyed by (document, question),
+# and every per-question query is a primary-key lookup, so the analytics page
+# never has to scan 'log_wrong_answers'. Only committed attempts are counted,
+# each once (by Attempt_ID); abandoned quizzes never reach the aggregates.
+# Each process aggregates the attempts committed through it: instances that
+# must report the same numbers share ANALYTICS_DB_PATH (SQLite locks the file),
+# and `python -m utils.analytics_handler` re-bases a store on the sheets.
+DB_PATH = os.getenv("ANALYTICS_DB_PATH", os.path.join(os.getcwd(), "data", "analytics.db"))
+# Recorded attempt IDs are kept this long to ignore repeated records of an attempt
+RECORDED_ATTEMPT_TTL = int(os.getenv("ANALYTICS_RECORDED_ATTEMPT_TTL", str(7 * 24 * 3600)))
+
+# Bumped when the layout changes; older stores are emptied on first use
+SCHEMA_VERSION = 2
+TABLES = ("question_stats", "wrong_options", "doc_stats", "doc_trends", "recorded_attempts")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS question_stats (
+    doc_name TEXT NOT NULL,
+    question_key TEXT NOT NULL,
+    question_text TEXT NOT NULL,
+    answers INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    top_wrong_option TEXT,
+    top_wrong_count INTEGER NOT NULL DEFAULT 0,
+    last_missed TEXT,
+    PRIMARY KEY (doc_name, question_key)
+);
+CREATE INDEX IF NOT EXISTS idx_question_stats_doc ON question_stats (doc_name, misses);
+CREATE TABLE IF NOT EXISTS wrong_options (
+    doc_name TEXT NOT NULL,
+    question_key TEXT NOT NULL,
+    option TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (doc_name, question_key, option)
+);
+CREATE TABLE IF NOT EXISTS doc_stats (
+    doc_name TEXT PRIMARY KEY,
+    answers INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS doc_trends (
+    doc_name TEXT NOT NULL,
+    day TEXT NOT NULL,
+    answers INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (doc_name, day)
+);
+CREATE TABLE IF NOT EXISTS recorded_attempts (
+    attempt_id TEXT PRIMARY KEY,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_recorded_attempts_time ON recorded_attempts (recorded_at);
+"""
+
+_migrated = set()
+
+def _connect(db_path=None):
+    db_path = db_path or DB_PATH
+    conn = connect(db_path, SCHEMA)
+    if db_path not in _migrated:
+        _migrate(conn)
+        _migrated.add(db_path)
+    return conn
+
+def _migrate(conn):
+    """
+    Empties a store written with an older layout. Aggregates keyed by question
+    alone can't be split per document; rebuild_from_sheets() re-bases them.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+    if conn.execute("SELECT 1 FROM doc_stats LIMIT 1").fetchone():
+        logger.warning("Analytics store has an old layout. Starting it empty; run `python -m utils.analytics_handler` to rebuild")
+    for table in TABLES:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.executescript(SCHEMA)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.commit()
+
+def _apply(conn, doc_name, question_key, question_text, answers, misses, wrong_options, day, last_missed):
+    """
+    Applies one increment to every aggregate inside the caller's transaction.
+    wrong_options maps each chosen wrong option to its number of misses.
+    """
+    conn.execute(
+        """
+        INSERT INTO question_stats (doc_name, question_key, question_text, answers, misses, last_missed)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (doc_name, question_key) DO UPDATE SET
+            answers = answers + excluded.answers,
+            misses = misses + excluded.misses,
+            last_missed = MAX(COALESCE(last_missed, ''), COALESCE(excluded.last_missed, ''))
+        """,
+        (doc_name, question_key, question_text, answers, misses, last_missed),
+    )
+    conn.execute(
+        """
+        INSERT INTO doc_stats (doc_name, answers, misses) VALUES (?, ?, ?)
+        ON CONFLICT (doc_name) DO UPDATE SET answers = answers + excluded.answers, misses = misses + excluded.misses
+        """,
+        (doc_name, answers, misses),
+    )
+    conn.execute(
+        """
+        INSERT INTO doc_trends (doc_name, day, answers, misses) VALUES (?, ?, ?, ?)
+        ON CONFLICT (doc_name, day) DO UPDATE SET answers = answers + excluded.answers, misses = misses + excluded.misses
+        """,
+        (doc_name, day, answers, misses),
+    )
+
+    for wrong_option, option_misses in wrong_options.items():
+        conn.execute(
+            """
+            INSERT INTO wrong_options (doc_name, question_key, option, count) VALUES (?, ?, ?, ?)
+            ON CONFLICT (doc_name, question_key, option) DO UPDATE SET count = count + excluded.count
+            """,
+            (doc_name, question_key, wrong_option, option_misses),
+        )
+        count = conn.execute(
+            "SELECT count FROM wrong_options WHERE doc_name = ? AND question_key = ? AND option = ?",
+            (doc_name, question_key, wrong_option),
+        ).fetchone()[0]
+        # Keep the most common wrong option denormalized for O(1) lookups
+        conn.execute(
+            """
+            UPDATE question_stats SET top_wrong_option = ?, top_wrong_count = ?
+            WHERE doc_name = ? AND question_key = ? AND top_wrong_count < ?
+            """,
+            (wrong_option, count, doc_name, question_key, count),
+        )
+
+def record_attempt(attempt, when=None, db_path=None):
+    """
+    Folds a committed attempt (see sheet_handler.commit_attempt) into the
+    aggregates: every answered question counts as an answer, and its misses
+    are the attempt's wrong answers, exactly as written to the sheets.
+    Uncommitted attempts are ignored and an attempt is only counted once.
+    Returns True on success. Failures are logged and never break the quiz flow.
+    """
+    if not attempt or not attempt.get('Committed'):
+        logger.warning("Skipping analytics for an uncommitted attempt")
+        return False
+
+    when = when or datetime.now()
+    doc_name = str(attempt['Doc_Name'])
+    questions = {}  # question_key -> [question_text, answers, misses, {wrong_option: misses}]
+    for question_info in attempt.get('Answered', []):
+        entry = questions.setdefault(_question_key(question_info), [str(question_info.get('question', '')), 0, 0, {}])
+        entry[1] += 1
+    for item in attempt['Wrong_Answers']:
+        question_info = item['Question_Info']
+        entry = questions.setdefault(_question_key(question_info), [str(question_info.get('question', '')), 0, 0, {}])
+        entry[2] += 1
+        entry[3][item['User_Selected_Answer']] = entry[3].get(item['User_Selected_Answer'], 0) + 1
+    day = when.strftime("%Y-%m-%d")
+    timestamp = when.strftime("%Y-%m-%d %H:%M:%S")
+
+    try:
+        conn = _connect(db_path)
+        try:
+            now = time.time()
+            with conn:
+                conn.execute("DELETE FROM recorded_attempts WHERE recorded_at < ?", (now - RECORDED_ATTEMPT_TTL,))
+                inserted = conn.execute(
+                    "INSERT OR IGNORE INTO recorded_attempts (attempt_id, recorded_at) VALUES (?, ?)",
+                    (attempt['Attempt_ID'], now),
+                ).rowcount
+                if not inserted:
+                    logger.info(f"Attempt {attempt['Attempt_ID']} already in analytics. Skipping.")
+                    return True
+                for question_key, (question_text, answers, misses, wrong_options) in questions.items():
+                    # Attempts saved before 'Answered' existed only list their misses
+                    answers = max(answers, misses)
+                    _apply(conn, doc_name, question_key, question_text, answers, misses, wrong_options,
+                           day, timestamp if misses else None)
+        finally:
+            conn.close()
+        return True
+    except Exception:
+        logger.error("Error recording attempt analytics", exc_info=True)
+        return False
+
+def get_question_stats(doc_name, question_key, db_path=None):
+    """
+    Returns the aggregates of one question of a document as a dict, or None if unknown.
+    Keys: ['Question_Key', 'Doc_Name', 'Question_Text', 'Answers', 'Misses',
+           'Miss_Rate', 'Top_Wrong_Option', 'Top_Wrong_Count', 'Last_Missed']
+    """
+    conn = _connect(db_path)
+    row = conn.execute(
+        "SELECT * FROM question_stats WHERE doc_name = ? AND question_key = ?",
+        (doc_name, question_key),
+    ).fetchone()
+    conn.close()
+    return _question_row_to_dict(row) if row else None
+
+def _question_row_to_dict(row):
+    return {
+        'Question_Key': row['question_key'],
+        'Doc_Name': row['doc_name'],
+        'Question_Text': row['question_text'],
+        'Answers': row['answers'],
+        'Misses': row['misses'],
+        'Miss_Rate': row['misses'] / row['answers'] if row['answers'] else 0.0,
+        'Top_Wrong_Option': row['top_wrong_option'],
+        'Top_Wrong_Count': row['top_wrong_count'],
+        'Last_Missed': row['last_missed'],
+    }
+
+def get_doc_stats(db_path=None):
+    """
+    Returns per-document aggregates sorted by miss rate (descending).
+    Keys: ['Doc_Name', 'Answers', 'Misses', 'Miss_Rate']
+    """
+    conn = _connect(db_path)
+    rows = conn.execute("SELECT * FROM doc_stats").fetchall()
+    conn.close()
+
+    results = [
+        {
+            'Doc_Name': row['doc_name'],
+            'Answers': row['answers'],
+            'Misses': row['misses'],
+            'Miss_Rate': row['misses'] / row['answers'] if row['answers'] else 0.0,
+        }
+        for row in rows
+    ]
+    results.sort(key=lambda x: (x['Miss_Rate'], x['Misses']), reverse=True)
+    return results
+
+def get_hardest_questions(doc_name=None, limit=10, db_path=None):
+    """
+    Returns the most-missed questions (optionally for one document), served
+    from the (doc_name, misses) index.
+    """
+    conn = _connect(db_path)
+    if doc_name:
+        rows = conn.execute(
+            "SELECT * FROM question_stats WHERE doc_name = ? ORDER BY misses DESC LIMIT ?",
+            (doc_name, limit),
+        ).fetchall()
+    else:
+        rows = conn.execute("SELECT * FROM question_stats ORDER BY misses DESC LIMIT ?", (limit,)).fetchall()
+    conn.close()
+    return [_question_row_to_dict(row) for row in rows]
+
+def get_doc_trend(doc_name, db_path=None):
+    """
+    Returns daily answers/misses for a document, oldest first.
+    Keys: ['Day', 'Answers', 'Misses', 'Miss_Rate']
+    """
+    conn = _connect(db_path)
+    rows = conn.execute(
+        "SELECT day, answers, misses FROM doc_trends WHERE doc_name = ? ORDER BY day",
+        (doc_name,),
+    ).fetchall()
+    conn.close()
+    return [
+        {
+            'Day': row['day'],
+            'Answers': row['answers'],
+            'Misses': row['misses'],
+            'Miss_Rate': row['misses'] / row['answers'] if row['answers'] else 0.0,
+        }
+        for row in rows
+    ]
+
+def rebuild_from_sheets(credentials_path, spreadsheet_id, db_path=None):
+    """
+    One-off bootstrap of the aggregates from existing sheet history.
+    Misses come from 'log_wrong_answers'; document answer counts are derived
+    from 'log_scores' (5 questions per attempt, 20 points each). Per-question
+    answer counts are unknown for history, so they start equal to misses.
+    Compacted score summaries carry the attempts' total Correct_Answers, so
+    counts survive compaction, but their trend points land on the day of the
+    kept best score. Summaries compacted before that column existed only
+    count their best attempt. A wrong-answer row keeps only the latest wrong
+    option of its Miss_Count misses, so each row credits that option once.
+    """
+    logger.info("Rebuilding question analytics from sheets")
+    gc = _get_gspread_client(credentials_path)
+    sh = gc.open_by_key(spreadsheet_id)
+
+    db_path = db_path or DB_PATH
+    conn = _connect(db_path)
+    with conn:
+        # recorded_attempts is kept: attempts already in the sheets must not be counted again
+        for table in ("question_stats", "wrong_options", "doc_stats", "doc_trends"):
+            conn.execute(f"DELETE FROM {table}")
+
+        for row in _read_log_records(sh, 'log_wrong_answers'):
+            try:
+                question_text = json.loads(row.get('Question_Info', '{}')).get('question', '')
+            except (json.JSONDecodeError, AttributeError):
+                question_text = ''
+            misses = _miss_count(row)
+            latest_option = str(row.get('User_Selected_Answer', ''))
+            timestamp = str(row.get('Timestamp', ''))
+            _apply(
+                conn,
+                str(row.get('Doc_Name', '')),
+                _question_key_from_record(row),
+                question_text,
+                misses,
+                misses,
+                {latest_option: 1} if latest_option else {},
+                timestamp[:10],
+                timestamp,
+            )
+
+        # Wrong-answer rows already counted their misses as answers;
+        # add the correct answers implied by each recorded score.
+        for row in _read_log_records(sh, 'log_scores'):
+            correct = _correct_answers(row)
+            doc_name = str(row.get('Doc_Name', ''))
+            day = str(row.get('Timestamp', ''))[:10]
+            conn.execute(
+                """
+                INSERT INTO doc_stats (doc_name, answers, misses) VALUES (?, ?, 0)
+                ON CONFLICT (doc_name) DO UPDATE SET answers = answers + excluded.answers
+                """,
+                (doc_name, correct),
+            )
+            conn.execute(
+                """
+                INSERT INTO doc_trends (doc_name, day, answers, misses) VALUES (?, ?, ?, 0)
+                ON CONFLICT (doc_name, day) DO UPDATE SET answers = answers + excluded.answers
+                """,
+                (doc_name, day, correct),
+            )
+    conn.close()
+    logger.info("Question analytics rebuilt")
+    return True
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    rebuild_from_sheets(os.getenv("GOOGLE_SHEET_CREDENTIALS"), os.getenv("SPREADSHEET_ID"))
@@ -0,0 +1,123 @@
+import os
+import time
+import asyncio
+import functools
+import threading
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+from utils.logger import logger
+
+# Shared asyncio runtime for the I/O handlers. One event loop runs in a daemon
+# thread per process. The *_async handlers (save_score_async, get_all_scores_async,
+# post_webhook_async, ...) are scheduled on it, and the blocking functions the app
+# calls are thin wrappers that submit the coroutine and wait (run_sync).
+# gspread, requests and google.generativeai are blocking clients, so each call
+# runs on a bounded executor thread and reuses the pooled sessions those modules
+# already keep; a per-service semaphore caps in-flight requests, so a fan-out of
+# hundreds of calls queues on the loop instead of exhausting quotas or sockets.
+IO_THREADS = int(os.getenv("ASYNC_IO_THREADS", "32"))
+SERVICE_LIMITS = {
+    "sheets": int(os.getenv("ASYNC_SHEETS_CONCURRENCY", "8")),
+    "discord": int(os.getenv("ASYNC_DISCORD_CONCURRENCY", "4")),
+    "gemini": int(os.getenv("ASYNC_GEMINI_CONCURRENCY", "4")),
+}
+# Upper bound for a blocking wrapper; above the slowest single call (a Gemini
+# generation or a webhook post through all of its retries)
+RUN_SYNC_TIMEOUT = float(os.getenv("ASYNC_RUN_SYNC_TIMEOUT", "300"))
+# How often a blocked run_sync() checks that the loop thread is still running
+LIVENESS_INTERVAL = 1.0
+
+_loop = None
+_loop_thread = None
+_loop_lock = threading.Lock()
+_semaphores = {}  # service -> asyncio.Semaphore, only touched on the loop thread
+
+def _run_loop(loop, ready):
+    asyncio.set_event_loop(loop)
+    loop.call_soon(ready.set)
+    loop.run_forever()
+
+def get_loop():
+    """
+    Returns the shared event loop, starting its thread on first use (and
+    again if the loop thread has died).
+    """
+    global _loop, _loop_thread
+    if _loop is None or not _loop_thread.is_alive():
+        with _loop_lock:
+            if _loop is None or not _loop_thread.is_alive():
+                if _loop is not None:
+                    logger.error("Async I/O loop thread died. Starting a new loop")
+                    _semaphores.clear()
+                loop = asyncio.new_event_loop()
+                loop.set_default_executor(ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix="async-io"))
+                ready = threading.Event()
+                _loop_thread = threading.Thread(target=_run_loop, args=(loop, ready), name="async-io-loop", daemon=True)
+                _loop_thread.start()
+                ready.wait()
+                _loop = loop
+                logger.info(f"Async I/O loop started (threads: {IO_THREADS}, limits: {SERVICE_LIMITS})")
+    return _loop
+
+def _semaphore(service):
+    semaphore = _semaphores.get(service)
+    if semaphore is None:
+        semaphore = _semaphores[service] = asyncio.Semaphore(SERVICE_LIMITS[service])
+    return semaphore
+
+async def run_io(service, func, *args, **kwargs):
+    """
+    Runs the blocking func(*args, **kwargs) on the I/O executor under the
+    service's concurrency limit. Can be awaited from any event loop; the call
+    itself is always scheduled on the shared loop.
+    """
+    loop = get_loop()
+    if asyncio.get_running_loop() is not loop:
+        future = asyncio.run_coroutine_threadsafe(run_io(service, func, *args, **kwargs), loop)
+        return await asyncio.wrap_future(future)
+    async with _semaphore(service):
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+def submit(coro):
+    """
+    Schedules a coroutine on the shared loop without waiting.
+    Returns a concurrent.futures.Future.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+def run_sync(coro, timeout=None):
+    """
+    Runs a coroutine on the shared loop and blocks until it finishes.
+    Used by the blocking wrappers; must not be called from the loop thread itself.
+    Raises TimeoutError after timeout (default RUN_SYNC_TIMEOUT) seconds, and
+    RuntimeError if the loop thread dies while waiting, instead of hanging.
+    """
+    loop = get_loop()
+    loop_thread = _loop_thread
+    if threading.current_thread() is loop_thread:
+        coro.close()
+        raise RuntimeError("run_sync() called on the async I/O loop; await the coroutine instead")
+    timeout = RUN_SYNC_TIMEOUT if timeout is None else timeout
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        done, _ = concurrent.futures.wait([future], timeout=max(0, min(LIVENESS_INTERVAL, remaining)))
+        if done:
+            return future.result()
+        if not loop_thread.is_alive():
+            future.cancel()
+            raise RuntimeError("Async I/O loop thread died before the call finished")
+        if remaining <= LIVENESS_INTERVAL:
+            future.cancel()
+            logger.error(f"run_sync() timed out after {timeout}s")
+            raise TimeoutError(f"Async I/O call did not finish within {timeout}s")
+
+def run_concurrently(*coros):
+    """
+    Runs several coroutines concurrently on the shared loop and blocks until
+    all of them finish. Returns their results in order.
+    """
+    async def gather():
+        return await asyncio.gather(*coros)
+    return run_sync(gather())
@@ -1,40 +1,136 @@
+import os
 import requests
 import json
+import time
+import threading
 import streamlit as st
+from requests.adapters import HTTPAdapter
+from utils.local_store import connect
+from utils.metrics import instrument
+from utils.async_io import run_io, run_sync
 from utils.logger import logger
 
-def send_sos_message(webhook_url, user_name, question_title, user_answer, correct_answer, user_question):
+# (connect, read) timeout for webhook posts
+REQUEST_TIMEOUT = (3.05, 10)
+# Give up instead of sleeping when Discord asks us to wait longer than this
+MAX_RETRY_WAIT = 30
+MAX_RETRIES = 3
+# Upper bound of one _post_webhook call: every attempt waits at most
+# MAX_RETRY_WAIT for its bucket and then at most the connect + read timeout
+POST_WEBHOOK_BUDGET = MAX_RETRIES * (MAX_RETRY_WAIT + sum(REQUEST_TIMEOUT))
+MISSING_WEBHOOK_ERROR = "Discord Webhook URL이 설정되지 않았습니다."
+
+_session = None
+_session_lock = threading.Lock()
+
+# Per-webhook rate-limit buckets: webhook_url -> time.monotonic() when it frees up
+_bucket_reset_at = {}
+_bucket_lock = threading.Lock()
+
+def _get_session():
     """
-    Sends a formatted Embed message to Discord via Webhook.
+    Returns the process-wide pooled HTTP session used for webhook posts.
     """
-    logger.info(f"Preparing SOS message for user: {user_name}")
-    if not webhook_url:
-        logger.warning("Discord Webhook URL is missing")
-        st.error("Discord Webhook URL이 설정되지 않았습니다.")
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+def _wait_for_bucket(webhook_url):
+    """
+    Sleeps until the webhook's rate-limit bucket has capacity again.
+    Returns False without sleeping if that is longer than MAX_RETRY_WAIT.
+    """
+    with _bucket_lock:
+        reset_at = _bucket_reset_at.get(webhook_url, 0)
+    delay = reset_at - time.monotonic()
+    if delay > MAX_RETRY_WAIT:
+        logger.warning(f"Webhook bucket exhausted for {delay:.2f}s. Not waiting")
         return False
+    if delay > 0:
+        logger.info(f"Webhook bucket exhausted. Waiting {delay:.2f}s")
+        time.sleep(delay)
+    return True
+
+def _update_bucket(webhook_url, response, retry_after=None):
+    """
+    Records when the webhook's bucket frees up, from a 429 retry_after or
+    Discord's X-RateLimit-* headers.
+    """
+    reset_after = retry_after
+    if reset_after is None and response.headers.get("X-RateLimit-Remaining") == "0":
+        try:
+            reset_after = float(response.headers.get("X-RateLimit-Reset-After", 0))
+        except ValueError:
+            reset_after = None
+
+    if reset_after:
+        with _bucket_lock:
+            _bucket_reset_at[webhook_url] = max(_bucket_reset_at.get(webhook_url, 0), time.monotonic() + reset_after)
+
+def _get_retry_after(response):
+    """
+    Extracts retry_after (seconds) from a 429 response body or Retry-After header.
+    """
+    try:
+        return float(response.json().get("retry_after"))
+    except (ValueError, TypeError, AttributeError):
+        pass
+    try:
+        return float(response.headers.get("Retry-After", 1))
+    except (TypeError, ValueError):
+        return 1.0
+
+# Discord Embed limits
+MAX_FIELD_VALUE_CHARS = 1024
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+def _truncate(value, limit=MAX_FIELD_VALUE_CHARS):
+    value = str(value)
+    return value if len(value) <= limit else value[:limit - 1] + "…"
+
+def _embed_size(embed):
+    """
+    Counts the characters Discord charges against the per-message embed limit.
+    """
+    size = len(embed.get("title", "")) + len(embed.get("footer", {}).get("text", ""))
+    for field in embed.get("fields", []):
+        size += len(field.get("name", "")) + len(field.get("value", ""))
+    return size
 
-    embed = {
+def build_sos_embed(user_name, question_title, user_answer, correct_answer, user_question):
+    """
+    Builds the Discord Embed for an SOS request.
+    """
+    return {
         "title": f"[SOS] {user_name} 사원의 질문입니다.",
         "color": 16711680,  # Red color
         "fields": [
             {
                 "name": "❓ 문제",
-                "value": question_title,
+                "value": _truncate(question_title),
                 "inline": False
             },
             {
                 "name": "❌ 사용자의 답",
-                "value": user_answer,
+                "value": _truncate(user_answer),
                 "inline": True
             },
             {
                 "name": "✅ 정답",
-                "value": correct_answer,
+                "value": _truncate(correct_answer),
                 "inline": True
             },
             {
                 "name": "💬 질문 내용",
-                "value": user_question,
+                "value": _truncate(user_question),
                 "inline": False
             }
         ],
@@ -43,18 +139,364 @@ def send_sos_message(webhook_url, user_name, question_title, user_answer, correc
         }
     }
 
-    payload = {
-        "embeds": [embed]
-    }
+@instrument("discord.post_webhook", size_of=lambda result, webhook_url, payload: len(json.dumps(payload)), succeeded=lambda result: result[0])
+def _post_webhook(webhook_url, payload):
+    """
+    Posts a payload to a Discord Webhook over the pooled session.
+    Honors per-webhook rate-limit buckets and retries 429 responses after retry_after.
+    Safe to call from background threads (no Streamlit calls).
+    Returns (success, error_message).
+    """
+    if not webhook_url:
+        logger.warning("Discord Webhook URL is missing")
+        return False, MISSING_WEBHOOK_ERROR
+
+    session = _get_session()
+    for attempt in range(1, MAX_RETRIES + 1):
+        if not _wait_for_bucket(webhook_url):
+            return False, "Discord rate limit"
+        try:
+            logger.debug(f"Sending payload to Discord Webhook: {webhook_url} (attempt {attempt})")
+            response = session.post(webhook_url, json=payload, timeout=REQUEST_TIMEOUT)
+
+            if response.status_code == 429:
+                retry_after = _get_retry_after(response)
+                _update_bucket(webhook_url, response, retry_after)
+                logger.warning(f"Discord rate limited. retry_after={retry_after}s (attempt {attempt})")
+                if retry_after > MAX_RETRY_WAIT:
+                    return False, f"Discord rate limit (retry_after={retry_after}s)"
+                continue
+
+            _update_bucket(webhook_url, response)
+            response.raise_for_status()
+            logger.info(f"Webhook message sent successfully. Status Code: {response.status_code}")
+            return True, None
+        except requests.exceptions.RequestException as e:
+            status_code = e.response.status_code if e.response is not None else "Unknown"
+            logger.error(f"Discord Webhook failed. Status: {status_code}, Error: {e}", exc_info=True)
+            return False, str(e)
+
+    logger.error(f"Discord Webhook still rate limited after {MAX_RETRIES} attempts")
+    return False, "Discord rate limit"
+
+async def post_webhook_async(webhook_url, payload):
+    """
+    Async counterpart of post_webhook().
+    """
+    return await run_io("discord", _post_webhook, webhook_url, payload)
+
+def post_webhook(webhook_url, payload):
+    """
+    Blocking wrapper of post_webhook_async(); see _post_webhook().
+    Returns (success, error_message).
+    """
+    return run_sync(post_webhook_async(webhook_url, payload))
+
+# --- SOS Outbox ---
+# Every SOS is first written to a durable local outbox (SQLite). A background
+# sender coalesces pending messages for the same webhook into multi-embed posts
+# (up to Discord's per-message embed limits), retries failures with backoff, and
+# replays whatever is left after a crash or outage when it starts again.
+OUTBOX_DB_PATH = os.getenv("SOS_OUTBOX_PATH", os.path.join(os.getcwd(), "data", "sos_outbox.db"))
+# Seconds to wait after a new SOS so others arriving meanwhile share one post
+DIGEST_WINDOW = 2.0
+POLL_INTERVAL = 5.0
+# Claimed messages not marked within this many seconds are considered orphaned.
+# Derived from the retry budget so a slow but live post is never re-claimed
+# and delivered twice.
+CLAIM_LEASE = POST_WEBHOOK_BUDGET + 30
+MAX_DELIVERY_ATTEMPTS = 20
+MAX_BACKOFF = 300
+
+OUTBOX_PENDING = "pending"
+OUTBOX_SENDING = "sending"
+OUTBOX_SENT = "sent"
+OUTBOX_FAILED = "failed"
+
+OUTBOX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    webhook_url TEXT NOT NULL,
+    embed TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    created_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    claimed_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    sent_at REAL,
+    latency REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox (status, next_attempt_at);
+"""
+
+_outbox_event = threading.Event()
+_sender_thread = None
+_sender_lock = threading.Lock()
+
+def _outbox_connect():
+    return connect(OUTBOX_DB_PATH, OUTBOX_SCHEMA)
+
+def enqueue_sos(webhook_url, embed):
+    """
+    Durably stores an SOS embed in the outbox and wakes the sender.
+    Returns the outbox message ID, or None if the webhook URL is missing.
+    """
+    if not webhook_url:
+        logger.warning("Discord Webhook URL is missing. SOS not queued.")
+        return None
+
+    now = time.time()
+    conn = _outbox_connect()
+    with conn:
+        cursor = conn.execute(
+            "INSERT INTO outbox (webhook_url, embed, created_at, next_attempt_at) VALUES (?, ?, ?, ?)",
+            (webhook_url, json.dumps(embed, ensure_ascii=False), now, now),
+        )
+    conn.close()
+    logger.info(f"SOS queued in outbox (id={cursor.lastrowid})")
+    _outbox_event.set()
+    return cursor.lastrowid
 
+def _claim_batch(conn, now, message_id=None):
+    """
+    Atomically claims the next digest: the oldest due messages of one webhook,
+    up to the per-message embed count and size limits. With message_id, claims
+    only that message if it is still pending.
+    Returns (webhook_url, [(id, embed, created_at), ...]) or (None, []).
+    """
+    conn.execute("BEGIN IMMEDIATE")
     try:
-        logger.debug(f"Sending SOS to Discord Webhook: {webhook_url}")
-        response = requests.post(webhook_url, json=payload)
-        response.raise_for_status()
-        logger.info(f"SOS message sent successfully. Status Code: {response.status_code}")
+        # Requeue messages claimed by a sender that died before marking them
+        conn.execute(
+            "UPDATE outbox SET status = ? WHERE status = ? AND claimed_at < ?",
+            (OUTBOX_PENDING, OUTBOX_SENDING, now - CLAIM_LEASE),
+        )
+        if message_id is not None:
+            rows = conn.execute(
+                "SELECT id, webhook_url, embed, created_at FROM outbox WHERE id = ? AND status = ?",
+                (message_id, OUTBOX_PENDING),
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT id, webhook_url, embed, created_at FROM outbox WHERE status = ? AND next_attempt_at <= ? "
+                "AND webhook_url = (SELECT webhook_url FROM outbox WHERE status = ? AND next_attempt_at <= ? ORDER BY id LIMIT 1) "
+                "ORDER BY id LIMIT ?",
+                (OUTBOX_PENDING, now, OUTBOX_PENDING, now, MAX_EMBEDS_PER_MESSAGE),
+            ).fetchall()
+        if not rows:
+            conn.execute("COMMIT")
+            return None, []
+
+        webhook_url = rows[0]['webhook_url']
+
+        batch = []
+        total_size = 0
+        for row in rows:
+            embed = json.loads(row['embed'])
+            size = _embed_size(embed)
+            if batch and total_size + size > MAX_EMBED_CHARS_PER_MESSAGE:
+                break
+            batch.append((row['id'], embed, row['created_at']))
+            total_size += size
+
+        conn.executemany(
+            "UPDATE outbox SET status = ?, claimed_at = ? WHERE id = ?",
+            [(OUTBOX_SENDING, now, message_id) for message_id, _, _ in batch],
+        )
+        conn.execute("COMMIT")
+        return webhook_url, batch
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def _mark_batch(conn, batch, success, error):
+    """
+    Records the outcome of a digest post: sent (with per-message latency) or
+    back to pending with exponential backoff.
+    """
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for message_id, _, created_at in batch:
+            if success:
+                conn.execute(
+                    "UPDATE outbox SET status = ?, sent_at = ?, latency = ?, attempts = attempts + 1, last_error = NULL WHERE id = ?",
+                    (OUTBOX_SENT, now, now - created_at, message_id),
+                )
+            else:
+                attempts = conn.execute("SELECT attempts FROM outbox WHERE id = ?", (message_id,)).fetchone()[0] + 1
+                status = OUTBOX_FAILED if attempts >= MAX_DELIVERY_ATTEMPTS else OUTBOX_PENDING
+                backoff = min(2 ** attempts, MAX_BACKOFF)
+                conn.execute(
+                    "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                    (status, attempts, now + backoff, error, message_id),
+                )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    if success:
+        latencies = ", ".join(f"{now - created_at:.2f}s" for _, _, created_at in batch)
+        logger.info(f"Delivered SOS digest of {len(batch)} embed(s). Latency: {latencies}")
+    else:
+        logger.warning(f"SOS digest of {len(batch)} embed(s) failed; will retry. Error: {error}")
+
+def flush_outbox(max_batches=None):
+    """
+    Posts every due outbox message as multi-embed digests.
+    Returns the number of messages delivered.
+    """
+    delivered = 0
+    batches = 0
+    conn = _outbox_connect()
+    conn.isolation_level = None  # explicit transactions in _claim_batch / _mark_batch
+    try:
+        while max_batches is None or batches < max_batches:
+            webhook_url, batch = _claim_batch(conn, time.time())
+            if not batch:
+                break
+            batches += 1
+            # Posts directly (not via the async wrapper): flush may already run on the I/O executor
+            success, error = _post_webhook(webhook_url, {"embeds": [embed for _, embed, _ in batch]})
+            _mark_batch(conn, batch, success, error)
+            if success:
+                delivered += len(batch)
+            else:
+                # Webhook is failing; leave the rest for the next round
+                break
+    finally:
+        conn.close()
+    return delivered
+
+def send_outbox_message(message_id):
+    """
+    Posts one outbox message right away if it is still pending; other queued
+    messages are left to the background sender. A failed post is backed off
+    and retried by the sender like any other.
+    Returns the message's delivery state (see get_outbox_message()).
+    """
+    conn = _outbox_connect()
+    conn.isolation_level = None  # explicit transactions in _claim_batch / _mark_batch
+    try:
+        webhook_url, batch = _claim_batch(conn, time.time(), message_id=message_id)
+        if batch:
+            success, error = _post_webhook(webhook_url, {"embeds": [embed for _, embed, _ in batch]})
+            _mark_batch(conn, batch, success, error)
+    finally:
+        conn.close()
+    return get_outbox_message(message_id)
+
+def _sender_loop():
+    logger.info("SOS outbox sender started")
+    while True:
+        woken = _outbox_event.wait(POLL_INTERVAL)
+        _outbox_event.clear()
+        if woken:
+            # Give concurrent SOS requests a moment to join the same digest
+            time.sleep(DIGEST_WINDOW)
+        try:
+            flush_outbox()
+        except Exception:
+            logger.error("Error flushing SOS outbox", exc_info=True)
+
+def start_outbox_sender():
+    """
+    Starts the background outbox sender once per process. Anything left in
+    the outbox from a previous run is replayed on its first pass.
+    """
+    global _sender_thread
+    with _sender_lock:
+        if _sender_thread is None or not _sender_thread.is_alive():
+            _sender_thread = threading.Thread(target=_sender_loop, name="sos-outbox-sender", daemon=True)
+            _sender_thread.start()
+            _outbox_event.set()
+    return _sender_thread
+
+def get_outbox_message(message_id):
+    """
+    Returns the delivery state of one outbox message, or None if unknown.
+    Keys: ['status', 'attempts', 'latency', 'last_error']
+    """
+    conn = _outbox_connect()
+    row = conn.execute(
+        "SELECT status, attempts, latency, last_error FROM outbox WHERE id = ?",
+        (message_id,),
+    ).fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+def get_outbox_stats(recent=200):
+    """
+    Returns outbox counts per status plus delivery latency percentiles (seconds)
+    over the most recent sent messages.
+    """
+    conn = _outbox_connect()
+    counts = {row['status']: row['n'] for row in conn.execute("SELECT status, COUNT(*) AS n FROM outbox GROUP BY status")}
+    latencies = sorted(
+        row['latency'] for row in conn.execute(
+            "SELECT latency FROM outbox WHERE status = ? ORDER BY sent_at DESC LIMIT ?",
+            (OUTBOX_SENT, recent),
+        )
+    )
+    conn.close()
+
+    def percentile(p):
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+    return {
+        'counts': counts,
+        'latency_p50': percentile(0.50),
+        'latency_p95': percentile(0.95),
+    }
+
+def queue_sos_message(webhook_url, user_name, question_title, user_answer, correct_answer, user_question):
+    """
+    Queues an SOS Embed in the outbox for background delivery (no Streamlit calls).
+    Returns the outbox message ID, or None if it could not be queued.
+    """
+    logger.info(f"Preparing SOS message for user: {user_name}")
+    embed = build_sos_embed(user_name, question_title, user_answer, correct_answer, user_question)
+    return enqueue_sos(webhook_url, embed)
+
+@instrument("discord.send_sos_message", succeeded=lambda result: result[0])
+def _deliver_sos_message(webhook_url, user_name, question_title, user_answer, correct_answer, user_question):
+    """
+    Queues an SOS Embed in the outbox and posts just that message right away
+    (no Streamlit calls); other users' queued messages stay with the sender.
+    A failed post stays in the outbox and is retried later instead of being lost.
+    Returns (success, error_message).
+    """
+    message_id = queue_sos_message(webhook_url, user_name, question_title, user_answer, correct_answer, user_question)
+    if message_id is None:
+        return False, MISSING_WEBHOOK_ERROR
+
+    message = send_outbox_message(message_id)
+    if message and message['status'] == OUTBOX_SENT:
+        return True, None
+    return False, message['last_error'] if message else None
+
+async def send_sos_message_async(webhook_url, user_name, question_title, user_answer, correct_answer, user_question):
+    """
+    Async counterpart of send_sos_message(). Returns (success, error_message)
+    instead of reporting errors in the UI.
+    """
+    return await run_io("discord", _deliver_sos_message, webhook_url, user_name, question_title, user_answer, correct_answer, user_question)
+
+def send_sos_message(webhook_url, user_name, question_title, user_answer, correct_answer, user_question):
+    """
+    Sends a formatted Embed message to Discord via Webhook.
+    The message goes through the outbox, so a failed post is retried later
+    instead of being lost.
+    """
+    success, error = run_sync(send_sos_message_async(webhook_url, user_name, question_title, user_answer, correct_answer, user_question))
+    if success:
         return True
-    except requests.exceptions.RequestException as e:
-        status_code = e.response.status_code if e.response else "Unknown"
-        logger.error(f"Discord Webhook failed. Status: {status_code}, Error: {e}", exc_info=True)
-        st.error(f"Discord 전송 실패: {e}")
-        return False
+    if error == MISSING_WEBHOOK_ERROR:
+        st.error(error)
+    else:
+        st.error(f"Discord 전송 실패: {error} (자동 재전송 예정)")
+    return False
@@ -1,10 +1,17 @@
-import os
 import json
-import tempfile
-import google.generativeai as genai
-from langchain_community.document_loaders import PyPDFLoader
+import functools
+from utils.startup import lazy_import
+from utils.metrics import instrument
+from utils.async_io import run_io, run_sync
+from utils.pdf_extractor import extract_texts
 from utils.logger import logger
 
+# Imported on first use (see utils/startup.py) to keep app cold start fast
+genai = lazy_import("google.generativeai")
+
+# Document characters included in the quiz prompt
+MAX_PROMPT_CHARS = 300000
+
 class GeminiHandler:
     def __init__(self, api_key):
         self.api_key = api_key
@@ -19,30 +26,30 @@ class GeminiHandler:
             logger.error("Failed to initialize GeminiHandler", exc_info=True)
             raise e
 
+    @instrument("gemini.extract_text_from_pdf", size_of=lambda result, self, uploaded_file: len(uploaded_file.getvalue()))
     def extract_text_from_pdf(self, uploaded_file):
         """
-        Saves the uploaded Streamlit file temporarily and extracts text using PyPDFLoader.
+        Extracts the text of one uploaded Streamlit file. Parsing runs on the
+        shared extraction pool and is cached (see utils/pdf_extractor.py).
+        Returns None if the file could not be parsed.
         """
-        logger.info(f"Starting PDF extraction for file: {uploaded_file.name if hasattr(uploaded_file, 'name') else 'Unknown'}")
-        try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                tmp_file.write(uploaded_file.getvalue())
-                tmp_path = tmp_file.name
-
-            logger.debug(f"Temporary file created at: {tmp_path}")
+        file_name = uploaded_file.name if hasattr(uploaded_file, 'name') else 'Unknown'
+        return extract_texts([(file_name, uploaded_file.getvalue())])[0]
 
-            loader = PyPDFLoader(tmp_path)
-            pages = loader.load()
-            text = "".join([p.page_content for p in pages])
-
-            os.remove(tmp_path)
-            logger.info(f"PDF extraction successful. Extracted {len(text)} characters.")
-            return text
-        except Exception as e:
-            logger.error("Error extracting PDF", exc_info=True)
-            return None
+    async def generate_quiz_async(self, text):
+        """
+        Runs quiz generation on the shared async I/O loop under the Gemini concurrency limit.
+        """
+        return await run_io("gemini", self._generate_quiz, text)
 
     def generate_quiz(self, text):
+        """
+        Blocking wrapper of generate_quiz_async(). Returns the quiz list, or None on failure.
+        """
+        return run_sync(self.generate_quiz_async(text))
+
+    @instrument("gemini.generate_quiz", size_of=lambda result, self, text: min(len(text), MAX_PROMPT_CHARS))
+    def _generate_quiz(self, text):
         """
         Sends the text to Gemini and requests a quiz in JSON format.
         """
@@ -52,8 +59,9 @@ class GeminiHandler:
         다음 제공되는 문서 내용을 바탕으로 신입 사원 교육용 객관식 퀴즈 5개를 만들어주세요.
 
         문서 내용:
-        {text[:300000]}
-        (내용이 너무 길 경우 앞부분 300000자만 참조합니다)
+        {text[:MAX_PROMPT_CHARS]}
+        (내용이 너무 길 경우 앞부분 {MAX_PROMPT_CHARS}자만 참조합니다)
+        (여러 문서가 '### 문서 N' 제목으로 구분되어 있으면 각 문서에서 고르게 출제해주세요)
 
         다음 JSON 형식으로 출력해주세요:
         [
@@ -81,3 +89,10 @@ class GeminiHandler:
         except Exception as e:
             logger.error("Error generating quiz", exc_info=True)
             return None
+
+@functools.lru_cache(maxsize=4)
+def get_gemini_handler(api_key):
+    """
+    Returns a GeminiHandler shared by all sessions of this process for api_key.
+    """
+    return GeminiHandler(api_key)
@@ -0,0 +1,32 @@
+import os
+import sqlite3
+import threading
+from utils.logger import logger
+
+# Shared helper for the local SQLite stores (analytics, SOS outbox, ...).
+# SQLite handles file locking, so several Streamlit processes on the same host
+# can share one store file.
+
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+def connect(db_path, schema):
+    """
+    Opens a connection to a local SQLite store, creating its directory and
+    schema on first use in this process. Rows are returned as sqlite3.Row.
+    """
+    if db_path not in _schema_ready:
+        with _schema_lock:
+            if db_path not in _schema_ready:
+                if os.path.dirname(db_path):
+                    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+                conn = sqlite3.connect(db_path, timeout=30)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(schema)
+                conn.close()
+                _schema_ready.add(db_path)
+                logger.info(f"Local store ready at {db_path}")
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
@@ -0,0 +1,205 @@
+import os
+import json
+from datetime import datetime
+from utils.sheet_handler import (
+    _get_gspread_client,
+    _get_or_create_worksheet,
+    _parse_shard_period,
+    _summary_title,
+    _month_start,
+    _to_row_data,
+    _question_key_from_record,
+    _miss_count,
+    _correct_answers,
+    WRONG_ANSWER_HEADERS,
+)
+from utils.logger import logger
+
+# --- Fold Functions ---
+# Each fold merges the records of closed shards into the existing summary
+# records and returns (headers, rows) for the rewritten '<base>_summary' sheet.
+
+SCORE_SUMMARY_HEADERS = ['Timestamp', 'Employee_ID', 'Doc_Name', 'Score', 'Attempts', 'Correct_Answers']
+MENTORING_SUMMARY_HEADERS = ['Employee_ID', 'Request_Count', 'Last_Timestamp']
+
+def _as_int(value, default=0):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+def _fold_scores(summary_records, shard_records):
+    """
+    Keeps the best score (newest on ties) per (Employee_ID, Doc_Name),
+    which is exactly what the leaderboard reads, plus the number of attempts
+    and correct answers folded into it so analytics can still be rebuilt.
+    """
+    best = {}
+    totals = {}
+    for row in summary_records + shard_records:
+        score = _as_int(row.get('Score'), None)
+        if score is None:
+            continue
+        key = (str(row.get('Employee_ID', '')), str(row.get('Doc_Name', '')))
+        candidate = (score, str(row.get('Timestamp', '')))
+        if key not in best or candidate > best[key]:
+            best[key] = candidate
+        total = totals.setdefault(key, [0, 0])
+        # Summaries written before these columns existed count as one attempt
+        total[0] += max(_as_int(row.get('Attempts'), 1), 1)
+        total[1] += _correct_answers(row)
+
+    rows = [
+        [timestamp, emp_id, doc_name, score] + totals[(emp_id, doc_name)]
+        for (emp_id, doc_name), (score, timestamp) in best.items()
+    ]
+    rows.sort(key=lambda r: r[0])
+    return SCORE_SUMMARY_HEADERS, rows
+
+def _fold_wrong_answers(summary_records, shard_records):
+    """
+    Collapses repeated misses of the same question into one row per
+    (Employee_ID, Question_Key), summing Miss_Count.
+    """
+    folded = {}
+    for row in summary_records + shard_records:
+        question_key = _question_key_from_record(row)
+        key = (str(row.get('Employee_ID', '')), question_key)
+        count = _miss_count(row)
+        timestamp = str(row.get('Timestamp', ''))
+        latest = [
+            timestamp,
+            key[0],
+            str(row.get('Doc_Name', '')),
+            str(row.get('Question_Info', '')),
+            str(row.get('Correct_Answer', '')),
+            str(row.get('User_Selected_Answer', '')),
+            question_key,
+        ]
+        entry = folded.get(key)
+        if entry is None:
+            folded[key] = latest + [count]
+            continue
+        entry[7] += count
+        if timestamp >= entry[0]:
+            entry[:7] = latest
+
+    rows = sorted(folded.values(), key=lambda r: r[0])
+    return WRONG_ANSWER_HEADERS, rows
+
+def _fold_mentoring(summary_records, shard_records):
+    """
+    Reduces SOS requests to a per-employee request count.
+    """
+    folded = {}
+    for row in summary_records:
+        emp_id = str(row.get('Employee_ID', ''))
+        folded[emp_id] = [emp_id, _as_int(row.get('Request_Count')), str(row.get('Last_Timestamp', ''))]
+    for row in shard_records:
+        emp_id = str(row.get('Employee_ID', ''))
+        entry = folded.setdefault(emp_id, [emp_id, 0, ''])
+        entry[1] += 1
+        entry[2] = max(entry[2], str(row.get('Timestamp', '')))
+
+    rows = sorted(folded.values(), key=lambda r: r[0])
+    return MENTORING_SUMMARY_HEADERS, rows
+
+FOLDERS = {
+    'log_scores': (SCORE_SUMMARY_HEADERS, _fold_scores),
+    'log_wrong_answers': (WRONG_ANSWER_HEADERS, _fold_wrong_answers),
+    'log_mentoring': (MENTORING_SUMMARY_HEADERS, _fold_mentoring),
+}
+
+def _find_closed_shards(worksheets, base_title, now):
+    """
+    Returns the legacy unsharded sheet plus every monthly shard older than the current month.
+    """
+    current_month = _month_start(now)
+    closed = []
+    for ws in worksheets:
+        if ws.title == base_title:
+            closed.append(ws)
+            continue
+        period = _parse_shard_period(base_title, ws.title)
+        if period is not None and period < current_month:
+            closed.append(ws)
+    return closed
+
+def compact_log(sh, base_title, now=None):
+    """
+    Folds the closed shards of one log into its summary sheet and deletes them.
+    The summary rewrite and the shard deletions are sent as a single
+    Spreadsheet.batch_update, so a failure never leaves rows counted twice.
+    Returns the number of shards compacted.
+    """
+    now = now or datetime.now()
+    headers, fold = FOLDERS[base_title]
+
+    closed = _find_closed_shards(sh.worksheets(), base_title, now)
+    if not closed:
+        logger.info(f"No closed shards to compact for '{base_title}'.")
+        return 0
+
+    summary_ws = _get_or_create_worksheet(sh, _summary_title(base_title), headers)
+    summary_records = summary_ws.get_all_records()
+
+    shard_records = []
+    for ws in closed:
+        records = ws.get_all_records()
+        logger.info(f"Folding {len(records)} rows from '{ws.title}' into '{summary_ws.title}'")
+        shard_records.extend(records)
+
+    headers, rows = fold(summary_records, shard_records)
+    values = [headers] + rows
+
+    requests = [
+        {
+            "updateSheetProperties": {
+                "properties": {
+                    "sheetId": summary_ws.id,
+                    "gridProperties": {
+                        "rowCount": max(len(values), summary_ws.row_count),
+                        "columnCount": max(len(headers), summary_ws.col_count),
+                    },
+                },
+                "fields": "gridProperties(rowCount,columnCount)",
+            }
+        },
+        {
+            "updateCells": {
+                "start": {"sheetId": summary_ws.id, "rowIndex": 0, "columnIndex": 0},
+                "rows": _to_row_data(values),
+                "fields": "userEnteredValue",
+            }
+        },
+    ]
+    requests.extend({"deleteSheet": {"sheetId": ws.id}} for ws in closed)
+
+    sh.batch_update({"requests": requests})
+    logger.info(f"Compacted {len(closed)} shard(s) of '{base_title}' into {len(rows)} summary rows")
+    return len(closed)
+
+def compact_log_shards(credentials_path, spreadsheet_id, now=None):
+    """
+    Archival job: compacts every sharded log ('log_scores', 'log_wrong_answers', 'log_mentoring').
+    Returns a dict of {base_title: compacted shard count}, with -1 for logs that failed.
+    """
+    logger.info("Starting log shard compaction")
+    gc = _get_gspread_client(credentials_path)
+    sh = gc.open_by_key(spreadsheet_id)
+
+    results = {}
+    for base_title in FOLDERS:
+        try:
+            results[base_title] = compact_log(sh, base_title, now)
+        except Exception:
+            logger.error(f"Error compacting '{base_title}'", exc_info=True)
+            results[base_title] = -1
+    return results
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    summary = compact_log_shards(os.getenv("GOOGLE_SHEET_CREDENTIALS"), os.getenv("SPREADSHEET_ID"))
+    print(json.dumps(summary, ensure_ascii=False))
@@ -1,40 +1,181 @@
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener, SocketHandler, DEFAULT_TCP_LOGGING_PORT
 import os
+import json
+import queue
+import pickle
+import struct
+import atexit
+import socketserver
+import multiprocessing
+
+# Logging is asynchronous: the application logger only has a QueueHandler, so
+# a logger.info() call in the request path just enqueues the record. A
+# background QueueListener thread does the console / file / socket I/O.
+#
+# LOG_MODE selects where records end up, so rotation stays safe when several
+# processes (Streamlit servers, spawned PDF extraction workers) run on one host:
+#   process - one rotating app.<pid>.log per process (default)
+#   file    - single rotating app.log, for a single process only; spawned
+#             worker processes still get their own app.<pid>.log
+#   socket  - records are sent to an aggregator (python -m utils.logger),
+#             which is the only writer of app.log
+# LOG_FORMAT=json switches the file / aggregator output to one JSON object per line.
+LOG_MODE = os.getenv("LOG_MODE", "process")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_FILE = os.getenv("LOG_FILE", os.path.join(os.getcwd(), 'app.log'))
+LOG_SOCKET_HOST = os.getenv("LOG_SOCKET_HOST", "localhost")
+LOG_SOCKET_PORT = int(os.getenv("LOG_SOCKET_PORT", str(DEFAULT_TCP_LOGGING_PORT)))
+LOG_MAX_BYTES = 5*1024*1024
+LOG_BACKUP_COUNT = 3
+
+TEXT_FORMAT = '[%(asctime)s] [%(levelname)s] [%(filename)s:%(funcName)s] %(message)s'
+
+_listener = None
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as single-line JSON objects.
+    """
+
+    def format(self, record):
+        entry = {
+            'timestamp': self.formatTime(record),
+            'level': record.levelname,
+            'file': record.filename,
+            'function': record.funcName,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+class _InProcessQueueHandler(QueueHandler):
+    """
+    QueueHandler for a same-process listener. The default prepare() formats
+    the whole line (and traceback) on the calling thread; here only the message
+    is merged, and formatting is left to the listener's handlers.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+def _build_formatter(log_format=None):
+    if (log_format or LOG_FORMAT) == "json":
+        return JsonFormatter()
+    return logging.Formatter(TEXT_FORMAT)
+
+def _build_file_handler(log_file, log_format=None):
+    file_handler = RotatingFileHandler(
+        log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+    )
+    file_handler.setFormatter(_build_formatter(log_format))
+    return file_handler
+
+def _log_mode():
+    # A child process never rotates the file its parent writes
+    if LOG_MODE == "file" and multiprocessing.parent_process() is not None:
+        return "process"
+    return LOG_MODE
+
+def _build_output_handlers(mode):
+    """
+    Handlers run by the background listener, according to the log mode.
+    """
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    handlers = [stream_handler]
+
+    if mode == "socket":
+        handlers.append(SocketHandler(LOG_SOCKET_HOST, LOG_SOCKET_PORT))
+    elif mode == "process":
+        root, ext = os.path.splitext(LOG_FILE)
+        handlers.append(_build_file_handler(f"{root}.{os.getpid()}{ext}"))
+    else:
+        handlers.append(_build_file_handler(LOG_FILE))
+    return handlers
+
+def stop_logging():
+    """
+    Stops the background listener after flushing queued records.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
 
 def setup_logger():
     """
     Configures and returns a singleton logger for the application.
     Prevents duplicate handlers on Streamlit reruns.
     """
+    global _listener
     logger = logging.getLogger("SOL-ution")
     logger.setLevel(logging.INFO)
 
     # Check if handlers are already added to avoid duplication
     if not logger.handlers:
-        # Formatter
-        formatter = logging.Formatter(
-            '[%(asctime)s] [%(levelname)s] [%(filename)s:%(funcName)s] %(message)s'
-        )
-
-        # 1. StreamHandler (Console)
-        stream_handler = logging.StreamHandler()
-        stream_handler.setFormatter(formatter)
-        logger.addHandler(stream_handler)
-
-        # 2. RotatingFileHandler (File)
-        # Ensure the log file is created in the root directory or specific path
-        # Using 'app.log' in the current working directory
-        log_file_path = os.path.join(os.getcwd(), 'app.log')
-        file_handler = RotatingFileHandler(
-            log_file_path, maxBytes=5*1024*1024, backupCount=3, encoding='utf-8'
-        )
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-
-        logger.info("Logger initialized successfully.")
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(_InProcessQueueHandler(log_queue))
+
+        mode = _log_mode()
+        _listener = QueueListener(log_queue, *_build_output_handlers(mode), respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+
+        logger.info(f"Logger initialized successfully (mode: {mode}, format: {LOG_FORMAT}).")
 
     return logger
 
-# Initialize logger instance to be imported by other modules
-logger = setup_logger()
+# --- Socket Aggregator ---
+class _LogRecordStreamHandler(socketserver.StreamRequestHandler):
+    """
+    Reads length-prefixed pickled LogRecords sent by SocketHandler.
+    """
+
+    def handle(self):
+        while True:
+            header = self.connection.recv(4)
+            if len(header) < 4:
+                break
+            length = struct.unpack(">L", header)[0]
+            data = self.connection.recv(length)
+            while len(data) < length:
+                chunk = self.connection.recv(length - len(data))
+                if not chunk:
+                    return
+                data += chunk
+            record = logging.makeLogRecord(pickle.loads(data))
+            self.server.output_handler.handle(record)
+
+class _LogRecordServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+def serve_logs(host=None, port=None, log_file=None, log_format=None):
+    """
+    Runs the log aggregator: the single writer of the rotating log file for
+    every process started with LOG_MODE=socket. Only bind it to a trusted
+    interface; records arrive pickled.
+    """
+    output_handler = _build_file_handler(log_file or LOG_FILE, log_format)
+    server = _LogRecordServer((host or LOG_SOCKET_HOST, port or LOG_SOCKET_PORT), _LogRecordStreamHandler)
+    server.output_handler = output_handler
+    print(f"Log aggregator listening on {server.server_address[0]}:{server.server_address[1]}, writing to {log_file or LOG_FILE}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        output_handler.close()
+
+if __name__ == "__main__":
+    serve_logs()
+else:
+    # Initialize logger instance to be imported by other modules
+    logger = setup_logger()
@@ -0,0 +1,293 @@
+import os
+import atexit
+import time
+import bisect
+import functools
+import threading
+from collections import deque
+from utils.logger import logger
+
+# Per-stage latency metrics for the quiz pipeline (PDF parsing, Gemini, Sheets,
+# Discord). Instrumented calls record their duration, payload size and outcome
+# into in-process histograms / counters, plus a short ring buffer of recent
+# spans for the admin debug panel. Metrics are exported in the Prometheus text
+# format to a per-process file next to METRICS_FILE (node_exporter textfile
+# collector) and, if METRICS_PORT is set, served on
+# http://<METRICS_HOST>:<port>/metrics. Every series carries a pid label, so the
+# files of several Streamlit processes on one host never collide.
+METRICS_FILE = os.getenv("METRICS_FILE", os.path.join(os.getcwd(), "data", "metrics.prom"))
+# The endpoint is local-only by default; set 0.0.0.0 to expose it to a remote scraper
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_EXPORT_INTERVAL = 15
+RECENT_SPANS = 200
+
+# Histogram buckets: seconds for durations, bytes / characters for payloads
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+OUTCOME_SUCCESS = "success"
+OUTCOME_FAILURE = "failure"
+OUTCOME_ERROR = "error"
+
+_lock = threading.Lock()
+_durations = {}      # (stage, outcome) -> histogram
+_sizes = {}          # stage -> histogram
+_calls = {}          # (stage, outcome) -> count
+_recent = deque(maxlen=RECENT_SPANS)
+_exporter = None
+
+def _new_histogram(buckets):
+    return {'buckets': buckets, 'counts': [0] * (len(buckets) + 1), 'sum': 0.0, 'count': 0}
+
+def _observe(histogram, value):
+    histogram['counts'][bisect.bisect_left(histogram['buckets'], value)] += 1
+    histogram['sum'] += value
+    histogram['count'] += 1
+
+def record_stage(stage, duration, outcome=OUTCOME_SUCCESS, size=None):
+    """
+    Records one completed call of a pipeline stage.
+    """
+    with _lock:
+        key = (stage, outcome)
+        if key not in _durations:
+            _durations[key] = _new_histogram(DURATION_BUCKETS)
+        _observe(_durations[key], duration)
+        _calls[key] = _calls.get(key, 0) + 1
+        if size is not None:
+            if stage not in _sizes:
+                _sizes[stage] = _new_histogram(SIZE_BUCKETS)
+            _observe(_sizes[stage], size)
+        _recent.append({
+            'Timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'Stage': stage,
+            'Outcome': outcome,
+            'Duration_ms': round(duration * 1000, 1),
+            'Size': size,
+            'Thread': threading.current_thread().name,
+        })
+
+# Per-thread failure flag of the innermost instrumented call (see mark_failed)
+_call_state = threading.local()
+
+def mark_failed():
+    """
+    Marks the instrumented call running on this thread as failed. For handlers
+    whose failure result ([] / empty DataFrame) looks like a valid empty read.
+    """
+    _call_state.failed = True
+
+def _default_outcome(result):
+    # The handlers report failure by returning False / None instead of raising
+    return OUTCOME_FAILURE if result is None or result is False else OUTCOME_SUCCESS
+
+def instrument(stage, size_of=None, succeeded=None):
+    """
+    Decorator recording duration, outcome and (optionally) payload size of each call.
+    size_of(result, *args, **kwargs) returns the payload size to record, or None.
+    succeeded(result) overrides the default rule (None / False means failure);
+    a call that ran mark_failed() is always a failure.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            outer_failed = getattr(_call_state, 'failed', False)
+            _call_state.failed = False
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                record_stage(stage, time.perf_counter() - start, OUTCOME_ERROR)
+                raise
+            finally:
+                failed = _call_state.failed
+                _call_state.failed = outer_failed
+            duration = time.perf_counter() - start
+            size = None
+            if size_of is not None:
+                try:
+                    size = size_of(result, *args, **kwargs)
+                except Exception:
+                    logger.warning(f"Could not measure payload size for stage {stage}", exc_info=True)
+            if failed:
+                outcome = OUTCOME_FAILURE
+            elif succeeded is not None:
+                outcome = OUTCOME_SUCCESS if succeeded(result) else OUTCOME_FAILURE
+            else:
+                outcome = _default_outcome(result)
+            record_stage(stage, duration, outcome, size)
+            return result
+        return wrapper
+    return decorator
+
+def get_stage_summary():
+    """
+    Returns per-stage aggregates sorted by total time spent (descending).
+    Keys: ['Stage', 'Calls', 'Failures', 'Errors', 'Avg_ms', 'P95_ms', 'Total_s']
+    P95 is the upper bound of the histogram bucket containing the 95th percentile.
+    """
+    with _lock:
+        stages = {}
+        for (stage, outcome), histogram in _durations.items():
+            merged = stages.setdefault(stage, {'counts': [0] * (len(DURATION_BUCKETS) + 1), 'sum': 0.0, 'count': 0, 'outcomes': {}})
+            merged['counts'] = [a + b for a, b in zip(merged['counts'], histogram['counts'])]
+            merged['sum'] += histogram['sum']
+            merged['count'] += histogram['count']
+            merged['outcomes'][outcome] = _calls.get((stage, outcome), 0)
+
+    summary = []
+    for stage, merged in stages.items():
+        target = merged['count'] * 0.95
+        running = 0
+        p95 = float('inf')
+        for upper, count in zip(DURATION_BUCKETS + (float('inf'),), merged['counts']):
+            running += count
+            if running >= target:
+                p95 = upper
+                break
+        summary.append({
+            'Stage': stage,
+            'Calls': merged['count'],
+            'Failures': merged['outcomes'].get(OUTCOME_FAILURE, 0),
+            'Errors': merged['outcomes'].get(OUTCOME_ERROR, 0),
+            'Avg_ms': round(merged['sum'] / merged['count'] * 1000, 1) if merged['count'] else 0.0,
+            'P95_ms': p95 * 1000,
+            'Total_s': round(merged['sum'], 3),
+        })
+    summary.sort(key=lambda x: x['Total_s'], reverse=True)
+    return summary
+
+def get_recent_spans(limit=50):
+    """
+    Returns the most recent instrumented calls, newest first.
+    """
+    with _lock:
+        return list(_recent)[-limit:][::-1]
+
+def _format_labels(labels):
+    parts = []
+    for name, value in labels:
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+def _format_bound(value):
+    return "+Inf" if value == float('inf') else repr(float(value))
+
+def _histogram_lines(name, labels, histogram):
+    lines = []
+    running = 0
+    for upper, count in zip(histogram['buckets'] + (float('inf'),), histogram['counts']):
+        running += count
+        lines.append(f"{name}_bucket{_format_labels(labels + [('le', _format_bound(upper))])} {running}")
+    lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+    lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+    return lines
+
+def export_prometheus():
+    """
+    Renders all metrics of this process in the Prometheus text exposition format.
+    """
+    pid = [('pid', os.getpid())]
+    with _lock:
+        lines = [
+            "# HELP solution_stage_duration_seconds Duration of quiz pipeline stages.",
+            "# TYPE solution_stage_duration_seconds histogram",
+        ]
+        for (stage, outcome), histogram in sorted(_durations.items()):
+            lines.extend(_histogram_lines("solution_stage_duration_seconds", [('stage', stage), ('outcome', outcome)] + pid, histogram))
+
+        lines.append("# HELP solution_stage_calls_total Calls of quiz pipeline stages by outcome.")
+        lines.append("# TYPE solution_stage_calls_total counter")
+        for (stage, outcome), count in sorted(_calls.items()):
+            lines.append(f"solution_stage_calls_total{_format_labels([('stage', stage), ('outcome', outcome)] + pid)} {count}")
+
+        lines.append("# HELP solution_stage_payload_size Payload size (bytes or characters) handled by a stage.")
+        lines.append("# TYPE solution_stage_payload_size histogram")
+        for stage, histogram in sorted(_sizes.items()):
+            lines.extend(_histogram_lines("solution_stage_payload_size", [('stage', stage)] + pid, histogram))
+    return "\n".join(lines) + "\n"
+
+def metrics_file_path():
+    """
+    Returns this process's export file: METRICS_FILE with the pid before the
+    extension (data/metrics.prom -> data/metrics-<pid>.prom).
+    """
+    root, ext = os.path.splitext(METRICS_FILE)
+    return f"{root}-{os.getpid()}{ext}"
+
+def write_prometheus(path=None):
+    """
+    Writes the exposition atomically (temp file + rename) so a collector
+    never reads a partial file. Returns True on success.
+    """
+    path = path or metrics_file_path()
+    try:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(export_prometheus())
+        os.replace(tmp_path, path)
+        return True
+    except Exception:
+        logger.error("Error writing metrics file", exc_info=True)
+        return False
+
+def _serve_http(port):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = export_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((METRICS_HOST, port), MetricsHandler)
+    except OSError:
+        # Another Streamlit process on this host already serves the port
+        logger.error(f"Could not start metrics endpoint on {METRICS_HOST}:{port}", exc_info=True)
+        return
+    logger.info(f"Metrics endpoint listening on {METRICS_HOST}:{port}/metrics")
+    server.serve_forever()
+
+def _export_loop():
+    while True:
+        time.sleep(METRICS_EXPORT_INTERVAL)
+        write_prometheus()
+
+def _remove_metrics_file():
+    # A stopped process's series would otherwise be scraped forever
+    try:
+        os.remove(metrics_file_path())
+    except FileNotFoundError:
+        pass
+    except Exception:
+        logger.error("Error removing metrics file", exc_info=True)
+
+def start_metrics_exporter():
+    """
+    Starts the periodic file export (and the HTTP endpoint when METRICS_PORT
+    is set) in daemon threads, once per process.
+    """
+    global _exporter
+    with _lock:
+        if _exporter is not None:
+            return _exporter
+        _exporter = threading.Thread(target=_export_loop, name="metrics-export", daemon=True)
+        _exporter.start()
+        atexit.register(_remove_metrics_file)
+    if METRICS_PORT:
+        threading.Thread(target=_serve_http, args=(METRICS_PORT,), name="metrics-http", daemon=True).start()
+    return _exporter
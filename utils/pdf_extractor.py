@@ -0,0 +1,208 @@
+import os
+import time
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from utils.local_store import connect
+from utils.metrics import instrument
+from utils.logger import logger
+
+# Multi-document text extraction. PDF parsing is CPU-bound, so the files of a
+# quiz are parsed concurrently on a shared process pool; a track of several
+# documents then takes about as long as its largest one. Extracted text is
+# cached in a local store by content hash, so a document re-uploaded alone or
+# as part of another track is parsed only once. The combined text is budgeted
+# across documents (combine_texts) before the single generation call.
+EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+TEXT_CACHE_PATH = os.getenv("PDF_TEXT_CACHE_PATH", os.path.join(os.getcwd(), "data", "pdf_text_cache.db"))
+# Least recently used texts beyond this many documents are evicted
+TEXT_CACHE_MAX_ENTRIES = int(os.getenv("PDF_TEXT_CACHE_MAX_ENTRIES", "200"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pdf_text_cache (
+    doc_hash TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pdf_text_cache_used ON pdf_text_cache (used_at);
+"""
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _extract_text(file_bytes):
+    """
+    Worker-process body: parses one PDF with PyPDFLoader and returns its text.
+    """
+    from langchain_community.document_loaders import PyPDFLoader
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+        tmp_file.write(file_bytes)
+        tmp_path = tmp_file.name
+    try:
+        pages = PyPDFLoader(tmp_path).load()
+        return "".join([p.page_content for p in pages])
+    finally:
+        os.remove(tmp_path)
+
+def _get_pool():
+    """
+    Returns the process pool shared by all quiz jobs, starting it on first use.
+    Workers are spawned (not forked) because the Streamlit server is multi-threaded.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            logger.info(f"PDF extraction pool started with {EXTRACTION_WORKERS} worker processes")
+        return _pool
+
+def _warm_worker():
+    from langchain_community.document_loaders import PyPDFLoader  # noqa: F401
+
+def warm_pool():
+    """
+    Starts the extraction workers and preloads the PDF loader in them.
+    """
+    pool = _get_pool()
+    for future in [pool.submit(_warm_worker) for _ in range(EXTRACTION_WORKERS)]:
+        future.result()
+
+def _reset_pool(pool):
+    # A crashed worker breaks the whole executor; the next extraction starts a fresh one
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _connect(db_path=None):
+    return connect(db_path or TEXT_CACHE_PATH, SCHEMA)
+
+def _load_cached(doc_hashes, db_path=None):
+    """
+    Returns {doc_hash: text} for the cached documents and marks them as used.
+    """
+    if not doc_hashes:
+        return {}
+    try:
+        conn = _connect(db_path)
+        try:
+            placeholders = ",".join("?" for _ in doc_hashes)
+            with conn:
+                rows = conn.execute(f"SELECT doc_hash, text FROM pdf_text_cache WHERE doc_hash IN ({placeholders})", list(doc_hashes)).fetchall()
+                conn.execute(f"UPDATE pdf_text_cache SET used_at = ? WHERE doc_hash IN ({placeholders})", [time.time()] + list(doc_hashes))
+            return {row['doc_hash']: row['text'] for row in rows}
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.error("Error reading the PDF text cache", exc_info=True)
+        return {}
+
+def _store_cached(texts, db_path=None):
+    """
+    Caches {doc_hash: text} and evicts the least recently used entries.
+    """
+    if not texts:
+        return
+    try:
+        conn = _connect(db_path)
+        try:
+            now = time.time()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO pdf_text_cache (doc_hash, text, used_at) VALUES (?, ?, ?)",
+                    [(doc_hash, text, now) for doc_hash, text in texts.items()]
+                )
+                conn.execute(
+                    "DELETE FROM pdf_text_cache WHERE doc_hash NOT IN "
+                    "(SELECT doc_hash FROM pdf_text_cache ORDER BY used_at DESC LIMIT ?)",
+                    (TEXT_CACHE_MAX_ENTRIES,)
+                )
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.error("Error writing the PDF text cache", exc_info=True)
+
+@instrument("pdf.extract_texts", size_of=lambda result, files, *args, **kwargs: sum(len(b) for _, b in files),
+            succeeded=lambda result: all(text is not None for text in result))
+def extract_texts(files, db_path=None):
+    """
+    Extracts the text of several PDFs, given as a list of (file_name, file_bytes).
+    Cached documents are served from the text cache; the others are parsed
+    concurrently on the process pool. Returns the texts in input order, with
+    None for files that could not be parsed.
+    """
+    hashes = [hashlib.sha256(file_bytes).hexdigest() for _, file_bytes in files]
+    texts = _load_cached(set(hashes), db_path)
+    logger.info(f"Extracting {len(files)} PDF(s): {len(set(hashes) & texts.keys())} cached")
+
+    # Identical uploads are parsed once
+    missing = {}
+    for (file_name, file_bytes), doc_hash in zip(files, hashes):
+        if doc_hash not in texts and doc_hash not in missing:
+            missing[doc_hash] = (file_name, file_bytes)
+
+    if missing:
+        pool = _get_pool()
+        extracted = {}
+        try:
+            futures = {doc_hash: pool.submit(_extract_text, file_bytes) for doc_hash, (_, file_bytes) in missing.items()}
+        except BrokenProcessPool:
+            logger.error("PDF extraction pool is broken", exc_info=True)
+            _reset_pool(pool)
+            futures = {}
+        for doc_hash, future in futures.items():
+            file_name = missing[doc_hash][0]
+            try:
+                text = future.result()
+            except BrokenProcessPool:
+                logger.error(f"PDF extraction worker died while parsing {file_name}", exc_info=True)
+                _reset_pool(pool)
+                continue
+            except Exception as e:
+                logger.error(f"Error extracting PDF {file_name}", exc_info=True)
+                continue
+            if text:
+                extracted[doc_hash] = text
+                logger.info(f"PDF extraction successful for {file_name}. Extracted {len(text)} characters.")
+            else:
+                logger.warning(f"No text found in PDF {file_name}")
+        _store_cached(extracted, db_path)
+        texts.update(extracted)
+
+    return [texts.get(doc_hash) for doc_hash in hashes]
+
+def budget_chars(lengths, max_chars):
+    """
+    Splits max_chars fairly across documents of the given lengths: documents
+    shorter than an equal share keep all of their text, and what they leave
+    unused is shared equally by the longer ones. Returns per-document allowances.
+    """
+    allowances = [0] * len(lengths)
+    remaining = max_chars
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    for rank, i in enumerate(order):
+        share = remaining // (len(lengths) - rank)
+        allowances[i] = min(lengths[i], share)
+        remaining -= allowances[i]
+    return allowances
+
+def combine_texts(named_texts, max_chars):
+    """
+    Joins [(file_name, text)] into one prompt document of at most max_chars,
+    each document under its own header and trimmed to its fair allowance.
+    """
+    if len(named_texts) == 1:
+        return named_texts[0][1][:max_chars]
+
+    headers = [f"### 문서 {i + 1}: {file_name}\n" for i, (file_name, _) in enumerate(named_texts)]
+    body_budget = max(max_chars - sum(len(h) + 2 for h in headers), 0)
+    allowances = budget_chars([len(text) for _, text in named_texts], body_budget)
+    return "\n\n".join(
+        header + text[:allowance]
+        for header, (_, text), allowance in zip(headers, named_texts, allowances)
+    )
@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+import cProfile
+import threading
+from collections import Counter
+from utils.logger import logger
+
+# Opt-in profiling of a single Streamlit rerun. The page function is run under
+# cProfile while a sampling thread records the script thread's stack every
+# SAMPLE_INTERVAL seconds. Sheets / Discord / Gemini calls run on the shared
+# async I/O executor (utils/async_io.py), where the script thread only shows a
+# Future.result() wait, so the sampler also records the busy async-io threads.
+# Every collapsed stack is rooted at its thread name ("script", "async-io_3", ...);
+# the async-io threads are shared, so I/O of other sessions running at the same
+# time shows up under them too. cProfile only sees the script thread.
+# Each capture writes:
+#   <name>.prof       - cProfile dump (python -m pstats, snakeviz, ...)
+#   <name>.collapsed  - collapsed stacks ("a;b;c <samples>") for flamegraph.pl / speedscope
+# Nothing here runs unless the caller decides to profile a rerun.
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.getcwd(), "profiles"))
+SAMPLE_INTERVAL = 0.005
+IO_THREAD_PREFIX = "async-io"
+# Innermost frames of an I/O thread with nothing to do: an executor worker
+# waiting for work, or the event loop waiting in select()
+IDLE_FRAMES = {("thread.py", "_worker"), ("selectors.py", "select")}
+
+class _StackSampler(threading.Thread):
+    """
+    Periodically samples the stack of one thread, plus the busy async I/O
+    threads, into collapsed-stack counts.
+    """
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(name="rerun-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def _io_threads(self):
+        return {t.ident: t.name for t in threading.enumerate() if t.name.startswith(IO_THREAD_PREFIX)}
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            threads = {self.thread_id: "script", **self._io_threads()}
+            for thread_id, name in threads.items():
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                if thread_id != self.thread_id and (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(name)
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+def _write_capture(label, profile, stacks, profile_dir):
+    os.makedirs(profile_dir, exist_ok=True)
+    base = os.path.join(profile_dir, f"{time.strftime('%Y%m%d_%H%M%S')}_{label}_{os.getpid()}")
+    profile.dump_stats(f"{base}.prof")
+    with open(f"{base}.collapsed", "w", encoding="utf-8") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    return base
+
+def profile_call(label, func, *args, profile_dir=None, **kwargs):
+    """
+    Runs func(*args, **kwargs) under cProfile and the stack sampler and saves
+    both captures, even when func exits through st.rerun() / st.stop().
+    """
+    profile = cProfile.Profile()
+    sampler = _StackSampler(threading.get_ident())
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        return profile.runcall(func, *args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - start
+        sampler.stop()
+        try:
+            base = _write_capture(label, profile, sampler.stacks, profile_dir or PROFILE_DIR)
+            logger.info(f"Profiled {label} rerun in {elapsed * 1000:.1f} ms ({sum(sampler.stacks.values())} samples): {base}.prof / .collapsed")
+        except Exception:
+            logger.error(f"Error saving profile for {label}", exc_info=True)
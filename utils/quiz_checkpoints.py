@@ -0,0 +1,172 @@
+import os
+import json
+import time
+from utils.local_store import connect
+from utils.logger import logger
+
+# Quiz session checkpoints. Progress is written to a local store, keyed by
+# employee ID and document hash, at every state transition. A browser refresh,
+# dropped websocket or restarted process can then resume the quiz without
+# a new Gemini call. Checkpoints expire after CHECKPOINT_TTL seconds.
+# The store also remembers committed attempt IDs for as long as a checkpoint
+# could still hold the attempt, so a resumed or retried commit is never written
+# twice, even after its score shard was compacted (see sheet_handler.commit_attempt).
+DB_PATH = os.getenv("QUIZ_CHECKPOINT_PATH", os.path.join(os.getcwd(), "data", "quiz_checkpoints.db"))
+CHECKPOINT_TTL = int(os.getenv("QUIZ_CHECKPOINT_TTL", str(24 * 60 * 60)))
+
+# Session state keys captured in a checkpoint
+CHECKPOINT_FIELDS = [
+    'quiz_data',
+    'current_q_index',
+    'user_answers',
+    'score',
+    'answer_checked',
+    'quiz_submitted',
+    'attempt',
+    'uploaded_file_name',
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quiz_checkpoints (
+    employee_id TEXT NOT NULL,
+    doc_hash TEXT NOT NULL,
+    doc_name TEXT NOT NULL,
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (employee_id, doc_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_quiz_checkpoints_updated ON quiz_checkpoints (updated_at);
+CREATE TABLE IF NOT EXISTS committed_attempts (
+    attempt_id TEXT PRIMARY KEY,
+    committed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_committed_attempts_time ON committed_attempts (committed_at);
+"""
+
+def _connect(db_path=None):
+    return connect(db_path or DB_PATH, SCHEMA)
+
+def _decode_state(raw):
+    state = json.loads(raw)
+    # JSON object keys are strings; question indexes are ints in session state
+    state['user_answers'] = {int(k): v for k, v in state.get('user_answers', {}).items()}
+    return state
+
+def save_checkpoint(employee_id, doc_hash, session_state, db_path=None):
+    """
+    Upserts the quiz progress held in session_state (any mapping with the
+    CHECKPOINT_FIELDS keys) and drops expired checkpoints.
+    Returns True on success. Failures are logged and never break the quiz flow.
+    """
+    if not employee_id or not doc_hash:
+        return False
+    try:
+        state = {field: session_state.get(field) for field in CHECKPOINT_FIELDS}
+        now = time.time()
+        conn = _connect(db_path)
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO quiz_checkpoints (employee_id, doc_hash, doc_name, state, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (employee_id, doc_hash) DO UPDATE SET
+                    doc_name = excluded.doc_name, state = excluded.state, updated_at = excluded.updated_at
+                """,
+                (str(employee_id), doc_hash, str(state.get('uploaded_file_name') or ''), json.dumps(state, ensure_ascii=False), now),
+            )
+            conn.execute("DELETE FROM quiz_checkpoints WHERE updated_at < ?", (now - CHECKPOINT_TTL,))
+        conn.close()
+        return True
+    except Exception:
+        logger.error("Error saving quiz checkpoint", exc_info=True)
+        return False
+
+def load_checkpoint(employee_id, doc_hash=None, db_path=None):
+    """
+    Returns the employee's checkpoint for doc_hash (or their most recent one
+    when doc_hash is None) that has not expired, or None.
+    Keys: ['Employee_ID', 'Doc_Hash', 'Doc_Name', 'State', 'Updated_At']
+    """
+    if not employee_id:
+        return None
+    try:
+        cutoff = time.time() - CHECKPOINT_TTL
+        conn = _connect(db_path)
+        if doc_hash:
+            row = conn.execute(
+                "SELECT * FROM quiz_checkpoints WHERE employee_id = ? AND doc_hash = ? AND updated_at >= ?",
+                (str(employee_id), doc_hash, cutoff),
+            ).fetchone()
+        else:
+            row = conn.execute(
+                "SELECT * FROM quiz_checkpoints WHERE employee_id = ? AND updated_at >= ? ORDER BY updated_at DESC LIMIT 1",
+                (str(employee_id), cutoff),
+            ).fetchone()
+        conn.close()
+        if row is None:
+            return None
+        return {
+            'Employee_ID': row['employee_id'],
+            'Doc_Hash': row['doc_hash'],
+            'Doc_Name': row['doc_name'],
+            'State': _decode_state(row['state']),
+            'Updated_At': row['updated_at'],
+        }
+    except Exception:
+        logger.error("Error loading quiz checkpoint", exc_info=True)
+        return None
+
+def delete_checkpoint(employee_id, doc_hash, db_path=None):
+    """
+    Removes a checkpoint once its quiz is finished or abandoned.
+    """
+    if not employee_id or not doc_hash:
+        return False
+    try:
+        conn = _connect(db_path)
+        with conn:
+            conn.execute(
+                "DELETE FROM quiz_checkpoints WHERE employee_id = ? AND doc_hash = ?",
+                (str(employee_id), doc_hash),
+            )
+        conn.close()
+        return True
+    except Exception:
+        logger.error("Error deleting quiz checkpoint", exc_info=True)
+        return False
+
+def mark_attempt_committed(attempt_id, db_path=None):
+    """
+    Remembers that an attempt was written to the sheets.
+    Returns True on success. Failures are logged and never break the quiz flow.
+    """
+    try:
+        now = time.time()
+        conn = _connect(db_path)
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO committed_attempts (attempt_id, committed_at) VALUES (?, ?)",
+                (attempt_id, now),
+            )
+            conn.execute("DELETE FROM committed_attempts WHERE committed_at < ?", (now - CHECKPOINT_TTL,))
+        conn.close()
+        return True
+    except Exception:
+        logger.error("Error recording committed attempt", exc_info=True)
+        return False
+
+def is_attempt_committed(attempt_id, db_path=None):
+    """
+    Returns True if the attempt was committed within CHECKPOINT_TTL.
+    """
+    try:
+        conn = _connect(db_path)
+        row = conn.execute(
+            "SELECT 1 FROM committed_attempts WHERE attempt_id = ? AND committed_at >= ?",
+            (attempt_id, time.time() - CHECKPOINT_TTL),
+        ).fetchone()
+        conn.close()
+        return row is not None
+    except Exception:
+        logger.error("Error reading committed attempts", exc_info=True)
+        return False
@@ -0,0 +1,239 @@
+import os
+import time
+import uuid
+import hashlib
+import threading
+from collections import deque, OrderedDict
+from utils.logger import logger
+
+# Background quiz-generation queue. PDF extraction and the Gemini call run on a
+# bounded pool of worker threads instead of the Streamlit script thread:
+# - global concurrency is capped at MAX_CONCURRENT_JOBS,
+# - users are served round-robin so one user's burst cannot starve others,
+# - admission control rejects work beyond per-user and global queue limits,
+# - jobs for the same document hash (and key) collapse into one while in flight.
+# A job covers one or more PDFs (an onboarding track) that become one quiz.
+MAX_CONCURRENT_JOBS = int(os.getenv("QUIZ_MAX_CONCURRENT_JOBS", "4"))
+MAX_PENDING_PER_USER = int(os.getenv("QUIZ_MAX_PENDING_PER_USER", "2"))
+MAX_QUEUED_JOBS = int(os.getenv("QUIZ_MAX_QUEUED_JOBS", "100"))
+MAX_FILES_PER_JOB = int(os.getenv("QUIZ_MAX_FILES_PER_JOB", "5"))
+# Finished jobs are kept this long (seconds) so sessions can pick up results
+JOB_RETENTION = 15 * 60
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+class AdmissionError(Exception):
+    """
+    Raised when a job is rejected by admission control.
+    """
+
+_lock = threading.Condition()
+_jobs = OrderedDict()        # job_id -> job dict
+_user_queues = {}            # user_id -> deque of queued job_ids
+_user_order = deque()        # round-robin order of users with queued jobs
+_inflight_by_key = {}        # (doc_hash, api_key hash) -> job_id
+_workers = []
+
+def get_doc_hash(file_bytes):
+    """
+    Returns the content hash identifying an uploaded document.
+    """
+    return hashlib.sha256(file_bytes).hexdigest()
+
+def get_files_hash(files):
+    """
+    Returns the content hash of a set of (file_name, file_bytes) documents.
+    A single document keeps its own hash; a track hashes its sorted document
+    hashes, so upload order does not matter.
+    """
+    doc_hashes = sorted(get_doc_hash(file_bytes) for _, file_bytes in files)
+    if len(doc_hashes) == 1:
+        return doc_hashes[0]
+    return hashlib.sha256("\n".join(doc_hashes).encode('utf-8')).hexdigest()
+
+def get_files_label(files):
+    """
+    Returns the document name recorded for a quiz over these files.
+    """
+    return " + ".join(file_name for file_name, _ in files)
+
+def _generate(api_key, files):
+    """
+    Job body: extracts the text of every PDF (in parallel), budgets it across
+    the documents and asks Gemini for one quiz. Returns (quiz_data, error_message).
+    """
+    from utils.gemini_handler import get_gemini_handler, MAX_PROMPT_CHARS
+    from utils.pdf_extractor import extract_texts, combine_texts
+
+    texts = extract_texts(files)
+    failed = [file_name for (file_name, _), text in zip(files, texts) if not text]
+    if failed:
+        return None, f"PDF 텍스트 추출에 실패했습니다: {', '.join(failed)}"
+
+    text = combine_texts([(file_name, text) for (file_name, _), text in zip(files, texts)], MAX_PROMPT_CHARS)
+    quiz = get_gemini_handler(api_key).generate_quiz(text)
+    if not quiz:
+        return None, "퀴즈 생성에 실패했습니다. 다시 시도해주세요."
+    return quiz, None
+
+def _prune_finished(now):
+    for job_id in list(_jobs):
+        job = _jobs[job_id]
+        if job['state'] in (JOB_DONE, JOB_FAILED) and now - job['finished_at'] > JOB_RETENTION:
+            del _jobs[job_id]
+
+def _next_job():
+    """
+    Pops the next queued job, round-robin across users. Caller holds _lock.
+    """
+    while _user_order:
+        user_id = _user_order.popleft()
+        queue = _user_queues.get(user_id)
+        if not queue:
+            _user_queues.pop(user_id, None)
+            continue
+        job_id = queue.popleft()
+        if queue:
+            _user_order.append(user_id)
+        else:
+            del _user_queues[user_id]
+        return _jobs[job_id]
+    return None
+
+def _worker_loop():
+    while True:
+        with _lock:
+            job = _next_job()
+            while job is None:
+                _lock.wait()
+                job = _next_job()
+            job['state'] = JOB_RUNNING
+            job['started_at'] = time.time()
+
+        logger.info(f"Quiz job {job['job_id']} started (doc: {job['file_name']}, waited {job['started_at'] - job['submitted_at']:.1f}s)")
+        try:
+            result, error = _generate(job['api_key'], job['files'])
+        except Exception as e:
+            logger.error(f"Unexpected error in quiz job {job['job_id']}", exc_info=True)
+            result, error = None, f"오류가 발생했습니다: {e}"
+
+        with _lock:
+            job['result'] = result
+            job['error'] = error
+            job['state'] = JOB_DONE if result else JOB_FAILED
+            job['finished_at'] = time.time()
+            job['files'] = None
+            _inflight_by_key.pop(job['dedup_key'], None)
+            _prune_finished(job['finished_at'])
+        logger.info(f"Quiz job {job['job_id']} {job['state']} in {job['finished_at'] - job['started_at']:.1f}s")
+
+def _ensure_workers():
+    """
+    Starts the worker pool once per process. Caller holds _lock.
+    """
+    while len(_workers) < MAX_CONCURRENT_JOBS:
+        worker = threading.Thread(target=_worker_loop, name=f"quiz-job-{len(_workers)}", daemon=True)
+        worker.start()
+        _workers.append(worker)
+
+def submit_quiz_job(user_id, files, api_key):
+    """
+    Queues quiz generation for uploaded PDFs, given as a list of
+    (file_name, file_bytes), and returns the job ID.
+    If a job for the same documents is already queued or running, its ID is
+    returned instead of starting a duplicate generation.
+    Raises AdmissionError when too many files are given or the user or the
+    global queue is full.
+    """
+    files = list(files)
+    if len(files) > MAX_FILES_PER_JOB:
+        raise AdmissionError(f"한 번에 최대 {MAX_FILES_PER_JOB}개의 문서로 퀴즈를 만들 수 있습니다.")
+    file_name = get_files_label(files)
+    doc_hash = get_files_hash(files)
+    dedup_key = (doc_hash, hashlib.sha256(str(api_key).encode('utf-8')).hexdigest())
+    user_id = str(user_id)
+
+    with _lock:
+        existing = _inflight_by_key.get(dedup_key)
+        if existing is not None:
+            logger.info(f"Quiz job for doc {doc_hash[:12]} already in flight ({existing}). Collapsing.")
+            _jobs[existing]['users'].add(user_id)
+            return existing
+
+        pending = len(_user_queues.get(user_id, ()))
+        if pending >= MAX_PENDING_PER_USER:
+            raise AdmissionError("이미 생성 중인 퀴즈가 있습니다. 잠시 후 다시 시도해주세요.")
+        queued = sum(len(q) for q in _user_queues.values())
+        if queued >= MAX_QUEUED_JOBS:
+            raise AdmissionError("요청이 많아 퀴즈 생성 대기열이 가득 찼습니다. 잠시 후 다시 시도해주세요.")
+
+        job_id = uuid.uuid4().hex
+        _jobs[job_id] = {
+            'job_id': job_id,
+            'doc_hash': doc_hash,
+            'dedup_key': dedup_key,
+            'file_name': file_name,
+            'files': files,
+            'api_key': api_key,
+            'users': {user_id},
+            'state': JOB_QUEUED,
+            'result': None,
+            'error': None,
+            'submitted_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+        }
+        _inflight_by_key[dedup_key] = job_id
+        if user_id not in _user_queues:
+            _user_queues[user_id] = deque()
+            _user_order.append(user_id)
+        _user_queues[user_id].append(job_id)
+
+        _ensure_workers()
+        _lock.notify()
+
+    logger.info(f"Quiz job {job_id} queued for user {user_id} (doc: {file_name}, hash: {doc_hash[:12]})")
+    return job_id
+
+def _queue_position(job_id):
+    """
+    Number of queued jobs that will start before job_id under round-robin order.
+    Caller holds _lock.
+    """
+    queues = {user_id: list(queue) for user_id, queue in _user_queues.items()}
+    order = list(_user_order)
+    position = 0
+    while order:
+        user_id = order.pop(0)
+        queue = queues.get(user_id)
+        if not queue:
+            continue
+        if queue.pop(0) == job_id:
+            return position
+        position += 1
+        if queue:
+            order.append(user_id)
+    return None
+
+def get_job_status(job_id):
+    """
+    Returns the job's state for polling, or None if unknown/expired.
+    Keys: ['job_id', 'state', 'doc_hash', 'file_name', 'queue_position', 'running_jobs', 'result', 'error']
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        return {
+            'job_id': job_id,
+            'state': job['state'],
+            'doc_hash': job['doc_hash'],
+            'file_name': job['file_name'],
+            'queue_position': _queue_position(job_id) if job['state'] == JOB_QUEUED else None,
+            'running_jobs': sum(1 for j in _jobs.values() if j['state'] == JOB_RUNNING),
+            'result': job['result'],
+            'error': job['error'],
+        }
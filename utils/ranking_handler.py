@@ -1,11 +1,16 @@
-import pandas as pd
-import gspread
-from utils.sheet_handler import _get_gspread_client
+from utils.startup import lazy_import
+from utils.metrics import instrument, mark_failed
+from utils.async_io import run_io, run_sync
+from utils.sheet_handler import _get_gspread_client, _read_log_records
 from utils.logger import logger
 
-def get_all_scores(credentials_path, spreadsheet_id):
+# Imported on first use (see utils/startup.py) to keep app cold start fast
+pd = lazy_import("pandas")
+
+@instrument("ranking.get_all_scores", size_of=lambda result, *args, **kwargs: len(result))
+def _get_all_scores(credentials_path, spreadsheet_id, since=None, until=None):
     """
-    Fetches all scores from 'log_scores' worksheet.
+    Fetches scores from the 'log_scores' shards (and compacted summary) covering [since, until].
     Returns a DataFrame with columns: ['Employee_ID', 'Doc_Name', 'Score', 'Timestamp']
     Applies deduplication (Max Score) per Employee per Document.
     """
@@ -13,14 +18,7 @@ def get_all_scores(credentials_path, spreadsheet_id):
         gc = _get_gspread_client(credentials_path)
         sh = gc.open_by_key(spreadsheet_id)
 
-        # Try to open 'log_scores'
-        try:
-            worksheet = sh.worksheet('log_scores')
-        except gspread.exceptions.WorksheetNotFound:
-            logger.warning("Worksheet 'log_scores' not found.")
-            return pd.DataFrame()
-
-        data = worksheet.get_all_records()
+        data = _read_log_records(sh, 'log_scores', since, until)
 
         if not data:
             logger.info("No data found in 'log_scores'.")
@@ -32,6 +30,7 @@ def get_all_scores(credentials_path, spreadsheet_id):
         required_cols = {'Timestamp','Employee_ID', 'Doc_Name', 'Score'}
         if not required_cols.issubset(df.columns):
             logger.error(f"Missing columns in log_scores. Expected {required_cols}, got {df.columns}")
+            mark_failed()
             return pd.DataFrame()
 
         # Convert Score to numeric, coercing errors to NaN then dropping
@@ -47,8 +46,22 @@ def get_all_scores(credentials_path, spreadsheet_id):
 
     except Exception as e:
         logger.error(f"Error fetching scores: {e}", exc_info=True)
+        mark_failed()
         return pd.DataFrame()
 
+async def get_all_scores_async(credentials_path, spreadsheet_id, since=None, until=None):
+    """
+    Async counterpart of get_all_scores().
+    """
+    return await run_io("sheets", _get_all_scores, credentials_path, spreadsheet_id, since, until)
+
+def get_all_scores(credentials_path, spreadsheet_id, since=None, until=None):
+    """
+    Blocking wrapper of get_all_scores_async(); see _get_all_scores().
+    """
+    return run_sync(get_all_scores_async(credentials_path, spreadsheet_id, since, until))
+
+@instrument("ranking.get_unique_doc_names")
 def get_unique_doc_names(df):
     """
     Returns a sorted list of unique document names from the DataFrame.
@@ -57,6 +70,7 @@ def get_unique_doc_names(df):
         return []
     return sorted(df['Doc_Name'].unique().tolist())
 
+@instrument("ranking.calculate_ranking", size_of=lambda result, df: len(df))
 def calculate_ranking(df):
     """
     Given a filtered DataFrame (e.g. for a specific doc), calculate ranks.
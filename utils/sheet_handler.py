@@ -1,15 +1,51 @@
-import gspread
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 import os
+import base64
+import hashlib
+import heapq
+import uuid
+import functools
+import threading
+from contextlib import contextmanager
+from utils.startup import lazy_import
+from utils.metrics import instrument, mark_failed
+from utils.async_io import run_io, run_sync
+from utils.quiz_checkpoints import mark_attempt_committed, is_attempt_committed
 from utils.logger import logger
 
+# Imported on first use (see utils/startup.py) to keep app cold start fast
+gspread = lazy_import("gspread")
+
+# Base URL of a local Sheets emulator (benchmarks/emulator.py) for offline load tests
+SHEETS_API_URL = os.getenv("SHEETS_API_URL")
+GOOGLE_SHEETS_API_URL = "https://sheets.googleapis.com"
+
+def _emulator_session(base_url):
+    """
+    Returns an unauthenticated requests session that sends Sheets API calls to base_url.
+    """
+    import requests
+
+    class EmulatorSession(requests.Session):
+        def request(self, method, url, *args, **kwargs):
+            if url.startswith(GOOGLE_SHEETS_API_URL):
+                url = base_url.rstrip("/") + url[len(GOOGLE_SHEETS_API_URL):]
+            return super().request(method, url, *args, **kwargs)
+
+    return EmulatorSession()
+
 # Helper: Get GSpread Client
+@functools.lru_cache(maxsize=8)
 def _get_gspread_client(credentials_path):
     """
     Authenticates and returns the gspread client.
     Handles both file path and JSON string credentials.
+    The client is cached per credentials, so calls don't re-authenticate.
     """
+    if SHEETS_API_URL:
+        logger.info(f"Using Sheets emulator at {SHEETS_API_URL}")
+        return gspread.Client(None, session=_emulator_session(SHEETS_API_URL))
     if os.path.exists(credentials_path):
         logger.debug(f"Loading credentials from file: {credentials_path}")
         return gspread.service_account(filename=credentials_path)
@@ -19,12 +55,25 @@ def _get_gspread_client(credentials_path):
         creds_dict = json.loads(credentials_path)
         return gspread.service_account_from_dict(creds_dict)
 
+def _add_worksheet(sh, title):
+    """
+    Creates a worksheet. When a concurrent session created it first (the API
+    answers "already exists"), opens that one instead.
+    """
+    try:
+        return sh.add_worksheet(title=title, rows=1000, cols=20)
+    except Exception:
+        logger.info(f"Could not create worksheet '{title}'. Checking whether another session created it.")
+        return sh.worksheet(title)
+
 # Helper: Get or Create Worksheet with Headers
-def _get_or_create_worksheet(sh, title, headers):
+def _open_worksheet_with_values(sh, title, headers):
     """
     Tries to open a worksheet by title.
     If not found, creates it.
-    If empty, appends headers.
+    If empty, appends headers. If the header row predates newly added
+    trailing columns, extends it in place.
+    Returns (worksheet, values) so callers can reuse the single read.
     """
     try:
         worksheet = sh.worksheet(title)
@@ -32,33 +81,201 @@ def _get_or_create_worksheet(sh, title, headers):
     except Exception:
         logger.info(f"Worksheet '{title}' not found. Creating new one.")
         # Create worksheet (rows, cols defaults are fine, or we can specify)
-        worksheet = sh.add_worksheet(title=title, rows=1000, cols=20)
+        worksheet = _add_worksheet(sh, title)
 
     # Check if empty (no headers)
     # get_all_values() returns a list of lists. If empty, it's [].
-    # Or checking first row specifically.
     existing_data = worksheet.get_all_values()
     if not existing_data:
         logger.info(f"Worksheet '{title}' is empty. Adding headers.")
         worksheet.append_row(headers)
+        existing_data = [list(headers)]
+    elif existing_data[0] != headers and headers[:len(existing_data[0])] == existing_data[0]:
+        logger.info(f"Worksheet '{title}' has outdated headers. Extending to {headers}.")
+        worksheet.update([headers], "A1")
+        existing_data[0] = list(headers)
 
+    return worksheet, existing_data
+
+def _get_or_create_worksheet(sh, title, headers):
+    """
+    Tries to open a worksheet by title, creating it (with headers) if needed.
+    """
+    worksheet, _ = _open_worksheet_with_values(sh, title, headers)
     return worksheet
 
-def save_score(credentials_path, spreadsheet_id, employee_id, doc_name, score):
+# --- Monthly Sharding ---
+# Log worksheets are sharded per month (e.g. 'log_scores_2026_10') so that
+# reads only touch the shards their time range needs. Closed shards are later
+# folded into '<base>_summary' by utils/log_compactor.py.
+SHARD_PERIOD_FORMAT = "%Y_%m"
+SUMMARY_SUFFIX = "summary"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def _shard_title(base_title, when=None):
+    """
+    Returns the monthly shard title for base_title, e.g. 'log_scores_2026_10'.
+    """
+    when = when or datetime.now()
+    return f"{base_title}_{when.strftime(SHARD_PERIOD_FORMAT)}"
+
+def _summary_title(base_title):
+    return f"{base_title}_{SUMMARY_SUFFIX}"
+
+def _parse_shard_period(base_title, title):
     """
-    Logs the user's score to 'log_scores' sheet.
-    Headers: ['Timestamp', 'Employee_ID', 'Doc_Name', 'Score']
+    Returns the first day of the month a shard title belongs to,
+    or None if title is not a monthly shard of base_title.
+    """
+    prefix = f"{base_title}_"
+    if not title.startswith(prefix):
+        return None
+    try:
+        return datetime.strptime(title[len(prefix):], SHARD_PERIOD_FORMAT)
+    except ValueError:
+        return None
+
+def _month_start(when):
+    return when.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def _get_read_worksheets(sh, base_title, since=None, until=None):
+    """
+    Returns the worksheets a read over [since, until] has to touch:
+    the legacy unsharded sheet, the compacted summary sheet and every
+    monthly shard overlapping the range (oldest first).
+    """
+    since_month = _month_start(since) if since else None
+    base_sheets = []
+    shards = []
+    for ws in sh.worksheets():
+        if ws.title in (base_title, _summary_title(base_title)):
+            base_sheets.append(ws)
+            continue
+        period = _parse_shard_period(base_title, ws.title)
+        if period is None:
+            continue
+        if since_month and period < since_month:
+            continue
+        if until and period > until:
+            continue
+        shards.append((period, ws))
+
+    shards.sort(key=lambda item: item[0])
+    return base_sheets + [ws for _, ws in shards]
+
+def _read_log_records(sh, base_title, since=None, until=None):
+    """
+    Reads records of a sharded log across every worksheet the range needs.
+    Rows are filtered by their 'Timestamp' column when a range is given.
+    """
+    since_str = since.strftime(TIMESTAMP_FORMAT) if since else None
+    until_str = until.strftime(TIMESTAMP_FORMAT) if until else None
+
+    records = []
+    for worksheet in _get_read_worksheets(sh, base_title, since, until):
+        logger.debug(f"Reading records from worksheet: {worksheet.title}")
+        for row in worksheet.get_all_records():
+            timestamp = str(row.get('Timestamp', ''))
+            if since_str and timestamp < since_str:
+                continue
+            if until_str and timestamp > until_str:
+                continue
+            records.append(row)
+    return records
+
+# --- Log Headers ---
+SCORE_HEADERS = ['Timestamp', 'Employee_ID', 'Doc_Name', 'Score', 'Attempt_ID']
+WRONG_ANSWER_HEADERS = ['Timestamp', 'Employee_ID', 'Doc_Name', 'Question_Info', 'Correct_Answer', 'User_Selected_Answer', 'Question_Key', 'Miss_Count']
+MENTORING_HEADERS = ['Timestamp', 'Employee_ID', 'Question_Text', 'Correct_Answer', 'User_Selected_Answer', 'User_Question_Detail']
+
+# Helper: Stable key for a question
+def _question_key(question_info_dict):
+    """
+    Returns a stable short hash of the question text and its options.
+    Used to deduplicate repeated misses of the same question.
+    """
+    canonical = json.dumps(
+        {
+            "question": str(question_info_dict.get('question', '')).strip(),
+            "options": [str(opt).strip() for opt in question_info_dict.get('options', [])],
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:16]
+
+def _question_key_from_record(row):
+    """
+    Returns the Question_Key of a wrong-answer record, deriving it from
+    Question_Info for rows written before keys were stored.
+    """
+    key = str(row.get('Question_Key', '')).strip()
+    if key:
+        return key
+    try:
+        return _question_key(json.loads(row.get('Question_Info', '{}')))
+    except (json.JSONDecodeError, TypeError, AttributeError):
+        return hashlib.sha1(str(row.get('Question_Info', '')).encode('utf-8')).hexdigest()[:16]
+
+def _miss_count(row):
+    """
+    Returns the Miss_Count of a wrong-answer record (legacy rows count as one miss).
+    """
+    try:
+        return max(int(row.get('Miss_Count') or 1), 1)
+    except (TypeError, ValueError):
+        return 1
+
+# Each quiz question is worth this many points (5 questions, 100 points)
+POINTS_PER_QUESTION = 20
+
+def _correct_answers(row):
+    """
+    Returns how many correct answers a score record stands for: the
+    Correct_Answers total of a compacted summary row, otherwise Score's share.
+    """
+    try:
+        if row.get('Correct_Answers') not in (None, ''):
+            return int(row['Correct_Answers'])
+        return int(row.get('Score', 0)) // POINTS_PER_QUESTION
+    except (TypeError, ValueError):
+        return 0
+
+# Helper: Convert rows into Sheets API RowData for batchUpdate requests
+def _to_row_data(rows):
+    """
+    Converts a list of row value lists into the RowData structure used by
+    'updateCells' / 'appendCells' requests of Spreadsheet.batch_update.
+    """
+    row_data = []
+    for row in rows:
+        cells = []
+        for value in row:
+            if isinstance(value, bool):
+                cells.append({"userEnteredValue": {"boolValue": value}})
+            elif isinstance(value, (int, float)):
+                cells.append({"userEnteredValue": {"numberValue": value}})
+            else:
+                cells.append({"userEnteredValue": {"stringValue": str(value)}})
+        row_data.append({"values": cells})
+    return row_data
+
+@instrument("sheets.save_score")
+def _save_score(credentials_path, spreadsheet_id, employee_id, doc_name, score, attempt_id=""):
+    """
+    Logs the user's score to the current monthly 'log_scores' shard.
+    Headers: SCORE_HEADERS
+    Prefer commit_attempt() for quiz results; this writes a single row.
     """
     logger.info(f"Saving score for {employee_id}")
     try:
         gc = _get_gspread_client(credentials_path)
         sh = gc.open_by_key(spreadsheet_id)
 
-        headers = ['Timestamp', 'Employee_ID', 'Doc_Name', 'Score']
-        worksheet = _get_or_create_worksheet(sh, 'log_scores', headers)
+        worksheet = _get_or_create_worksheet(sh, _shard_title('log_scores'), SCORE_HEADERS)
 
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        row = [timestamp, str(employee_id), str(doc_name), int(score)]
+        timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+        row = [timestamp, str(employee_id), str(doc_name), int(score), str(attempt_id)]
 
         worksheet.append_row(row)
         logger.info("Score saved successfully")
@@ -67,54 +284,123 @@ def save_score(credentials_path, spreadsheet_id, employee_id, doc_name, score):
         logger.error("Error saving score", exc_info=True)
         return False
 
-def save_wrong_answer(credentials_path, spreadsheet_id, employee_id, doc_name, question_info_dict, correct_answer, user_selected_answer):
+# Miss counts are read-modify-write (Sheets has no compare-and-set), so two
+# concurrent misses of one question would both write count + 1. Writers of an
+# employee's wrong answers are serialized per spreadsheet within the process;
+# other employees' rows are independent and keep writing in parallel. The
+# guarantee is per process: instances writing the same employee's rows at the
+# same moment (one person in two sessions on different servers) can still lose
+# an increment. Locks only exist while someone holds or waits for them.
+_employee_locks = {}  # (spreadsheet_id, employee_id) -> [lock, holders and waiters]
+_employee_locks_guard = threading.Lock()
+
+@contextmanager
+def _employee_lock(spreadsheet_id, employee_id):
+    key = (spreadsheet_id, str(employee_id).strip())
+    with _employee_locks_guard:
+        entry = _employee_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _employee_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _employee_locks[key]
+
+@instrument("sheets.save_wrong_answer")
+def _save_wrong_answer(credentials_path, spreadsheet_id, employee_id, doc_name, question_info_dict, correct_answer, user_selected_answer):
     """
-    Logs wrong answers to 'log_wrong_answers' sheet.
-    Headers: ['Timestamp', 'Employee_ID', 'Doc_Name', 'Question_Info', 'Correct_Answer', 'User_Selected_Answer']
+    Logs wrong answers to the current monthly 'log_wrong_answers' shard.
+    Headers: WRONG_ANSWER_HEADERS
     Question_Info is stored as JSON string.
+    Rows are keyed by (Employee_ID, Question_Key): a repeated miss of the same
+    question updates Timestamp (last missed), User_Selected_Answer and Miss_Count
+    instead of appending a new row.
     """
     logger.info(f"Saving wrong answer for {employee_id}")
     try:
-        gc = _get_gspread_client(credentials_path)
-        sh = gc.open_by_key(spreadsheet_id)
+        with _employee_lock(spreadsheet_id, employee_id):
+            return _write_wrong_answer(credentials_path, spreadsheet_id, employee_id, doc_name, question_info_dict, correct_answer, user_selected_answer)
+    except Exception as e:
+        logger.error("Error saving wrong answer", exc_info=True)
+        return False
 
-        headers = ['Timestamp', 'Employee_ID', 'Doc_Name', 'Question_Info', 'Correct_Answer', 'User_Selected_Answer']
-        worksheet = _get_or_create_worksheet(sh, 'log_wrong_answers', headers)
+def _write_wrong_answer(credentials_path, spreadsheet_id, employee_id, doc_name, question_info_dict, correct_answer, user_selected_answer):
+    """
+    The read-modify-write of _save_wrong_answer(); runs under the employee's lock.
+    """
+    gc = _get_gspread_client(credentials_path)
+    sh = gc.open_by_key(spreadsheet_id)
 
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        # Convert question_info_dict to JSON string
-        q_info_json = json.dumps(question_info_dict, ensure_ascii=False)
+    worksheet, values = _open_worksheet_with_values(sh, _shard_title('log_wrong_answers'), WRONG_ANSWER_HEADERS)
 
-        row = [
-            timestamp,
-            str(employee_id),
-            str(doc_name),
-            q_info_json,
-            str(correct_answer),
-            str(user_selected_answer)
-        ]
+    timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+    # Convert question_info_dict to JSON string
+    q_info_json = json.dumps(question_info_dict, ensure_ascii=False)
+    question_key = _question_key(question_info_dict)
+
+    row_number, miss_count = _find_wrong_answer_row(values, employee_id, question_key)
+
+    row = [
+        timestamp,
+        str(employee_id),
+        str(doc_name),
+        q_info_json,
+        str(correct_answer),
+        str(user_selected_answer),
+        question_key,
+        miss_count + 1
+    ]
 
+    if row_number:
+        end_cell = gspread.utils.rowcol_to_a1(row_number, len(WRONG_ANSWER_HEADERS))
+        worksheet.update([row], f"A{row_number}:{end_cell}")
+        logger.info(f"Wrong answer updated (miss count: {miss_count + 1})")
+    else:
         worksheet.append_row(row)
         logger.info("Wrong answer saved successfully")
-        return True
-    except Exception as e:
-        logger.error("Error saving wrong answer", exc_info=True)
-        return False
+    return True
 
-def save_mentoring_log(credentials_path, spreadsheet_id, employee_id, question_text, correct_answer, user_selected_answer, user_question_detail):
+def _find_wrong_answer_row(values, employee_id, question_key):
+    """
+    Looks up the existing row for (employee_id, question_key) in a shard's values.
+    Returns (1-based row number, current miss count), or (None, 0) if not found.
+    """
+    if not values:
+        return None, 0
+
+    header = values[0]
+    try:
+        emp_idx = header.index('Employee_ID')
+        key_idx = header.index('Question_Key')
+    except ValueError:
+        return None, 0
+    count_idx = header.index('Miss_Count') if 'Miss_Count' in header else None
+
+    for i, row in enumerate(values[1:], start=2):
+        if len(row) <= key_idx:
+            continue
+        if str(row[emp_idx]).strip() == str(employee_id).strip() and row[key_idx] == question_key:
+            record = {'Miss_Count': row[count_idx] if count_idx is not None and len(row) > count_idx else 1}
+            return i, _miss_count(record)
+    return None, 0
+
+@instrument("sheets.save_mentoring_log")
+def _save_mentoring_log(credentials_path, spreadsheet_id, employee_id, question_text, correct_answer, user_selected_answer, user_question_detail):
     """
-    Logs SOS requests to 'log_mentoring' sheet.
-    Headers: ['Timestamp', 'Employee_ID', 'Question_Text', 'Correct_Answer', 'User_Selected_Answer', 'User_Question_Detail']
+    Logs SOS requests to the current monthly 'log_mentoring' shard.
+    Headers: MENTORING_HEADERS
     """
     logger.info(f"Saving mentoring log for {employee_id}")
     try:
         gc = _get_gspread_client(credentials_path)
         sh = gc.open_by_key(spreadsheet_id)
 
-        headers = ['Timestamp', 'Employee_ID', 'Question_Text', 'Correct_Answer', 'User_Selected_Answer', 'User_Question_Detail']
-        worksheet = _get_or_create_worksheet(sh, 'log_mentoring', headers)
+        worksheet = _get_or_create_worksheet(sh, _shard_title('log_mentoring'), MENTORING_HEADERS)
 
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
 
         row = [
             timestamp,
@@ -132,53 +418,414 @@ def save_mentoring_log(credentials_path, spreadsheet_id, employee_id, question_t
         logger.error("Error saving mentoring log", exc_info=True)
         return False
 
-def get_wrong_answers(credentials_path, spreadsheet_id, employee_id):
+# --- Wrong Answer Note ---
+# The note is read a page at a time. Employee / document / date filters are
+# applied while the shard records are merged, and Question_Info JSON is parsed
+# only for the entries actually returned. A page cursor is the sort key of the
+# last entry shown, so the following page is "everything ranked below it".
+WRONG_ANSWER_PAGE_SIZE = int(os.getenv("WRONG_ANSWER_PAGE_SIZE", "10"))
+
+def _merge_wrong_answers(records, employee_id, doc_name=None):
+    """
+    Merges the wrong-answer records of one employee by Question_Key.
+    Returns (entries, doc_names): entries keep the raw 'Question_Info' of their
+    newest record, doc_names lists every document the employee missed questions
+    in (before the doc_name filter).
+    """
+    employee_id = str(employee_id).strip()
+    merged = {}
+    doc_names = set()
+    for row in records:
+        # Check for exact match on Employee_ID (converting to string to be safe)
+        if str(row.get('Employee_ID', '')).strip() != employee_id:
+            continue
+        row_doc = row.get('Doc_Name')
+        doc_names.add(str(row_doc))
+        if doc_name is not None and str(row_doc) != doc_name:
+            continue
+
+        question_key = _question_key_from_record(row)
+        timestamp = str(row.get('Timestamp', ''))
+        entry = merged.get(question_key)
+        if entry is not None:
+            entry['Miss_Count'] += _miss_count(row)
+            if timestamp < entry['Timestamp']:
+                continue
+        else:
+            entry = merged[question_key] = {'Miss_Count': _miss_count(row)}
+
+        # The newest record wins for the displayed fields
+        entry.update({
+            'Timestamp': timestamp,
+            'Doc_Name': row_doc,
+            'Question_Key': question_key,
+            'Question_Info': row.get('Question_Info', '{}'),
+            'Correct_Answer': row.get('Correct_Answer'),
+            'User_Selected_Answer': row.get('User_Selected_Answer')
+        })
+    return list(merged.values()), sorted(doc_names)
+
+def _parse_question_info(entry):
+    """
+    Replaces the raw 'Question_Info' of a merged entry with 'Question_Text' and 'Options'.
+    """
+    q_info_str = entry.pop('Question_Info', '{}')
+    try:
+        q_info = json.loads(q_info_str)
+        entry['Question_Text'] = q_info.get('question', 'Unknown Question')
+        entry['Options'] = q_info.get('options', [])
+    except json.JSONDecodeError:
+        entry['Question_Text'] = "Error parsing question info"
+        entry['Options'] = []
+    return entry
+
+def _wrong_answer_sort_key(entry):
+    # Most frequently missed first, then most recently missed; Question_Key breaks ties
+    return (entry['Miss_Count'], entry['Timestamp'], entry['Question_Key'])
+
+def _encode_cursor(entry):
+    raw = json.dumps(list(_wrong_answer_sort_key(entry)), ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def _decode_cursor(cursor):
+    miss_count, timestamp, question_key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    return (int(miss_count), str(timestamp), str(question_key))
+
+@instrument("sheets.get_wrong_answers", size_of=lambda result, *args, **kwargs: len(result))
+def _get_wrong_answers(credentials_path, spreadsheet_id, employee_id, since=None, until=None, doc_name=None):
     """
-    Fetches wrong answer logs for a specific employee_id from 'log_wrong_answers'.
+    Fetches wrong answer logs for a specific employee_id from the 'log_wrong_answers'
+    shards (and compacted summary) covering [since, until], optionally of one document.
+    Entries of the same question (Question_Key) are merged across shards.
     Returns a list of dictionaries with keys:
-    ['Timestamp', 'Doc_Name', 'Question_Text', 'Options', 'Correct_Answer', 'User_Selected_Answer']
+    ['Timestamp', 'Doc_Name', 'Question_Key', 'Question_Text', 'Options', 'Correct_Answer', 'User_Selected_Answer', 'Miss_Count']
+    sorted by Miss_Count then Timestamp (last missed), both descending.
     """
     logger.info(f"Fetching wrong answers for {employee_id}")
     try:
         gc = _get_gspread_client(credentials_path)
         sh = gc.open_by_key(spreadsheet_id)
 
-        try:
-            worksheet = sh.worksheet('log_wrong_answers')
-        except gspread.exceptions.WorksheetNotFound:
-            logger.warning("Worksheet 'log_wrong_answers' not found.")
+        data = _read_log_records(sh, 'log_wrong_answers', since, until)
+        if not data:
+            logger.info("No data found in 'log_wrong_answers'.")
             return []
 
-        data = worksheet.get_all_records()
-
-        results = []
-        for row in data:
-            # Check for exact match on Employee_ID (converting to string to be safe)
-            if str(row.get('Employee_ID', '')).strip() == str(employee_id).strip():
-                # Parse Question_Info JSON
-                q_info_str = row.get('Question_Info', '{}')
-                try:
-                    q_info = json.loads(q_info_str)
-                    question_text = q_info.get('question', 'Unknown Question')
-                    options = q_info.get('options', [])
-                except json.JSONDecodeError:
-                    question_text = "Error parsing question info"
-                    options = []
-
-                results.append({
-                    'Timestamp': row.get('Timestamp'),
-                    'Doc_Name': row.get('Doc_Name'),
-                    'Question_Text': question_text,
-                    'Options': options,
-                    'Correct_Answer': row.get('Correct_Answer'),
-                    'User_Selected_Answer': row.get('User_Selected_Answer')
-                })
-
-        # Sort by Timestamp descending (optional but good for UX)
-        results.sort(key=lambda x: x['Timestamp'], reverse=True)
-
-        return results
+        results, _ = _merge_wrong_answers(data, employee_id, doc_name)
+        results.sort(key=_wrong_answer_sort_key, reverse=True)
+        return [_parse_question_info(entry) for entry in results]
 
     except Exception as e:
         logger.error("Error fetching wrong answers", exc_info=True)
+        mark_failed()
         return []
+
+@instrument("sheets.get_wrong_answers_page", size_of=lambda result, *args, **kwargs: len(result['Items']) if result else None)
+def _get_wrong_answers_page(credentials_path, spreadsheet_id, employee_id, doc_name=None, since=None, until=None, cursor=None, page_size=WRONG_ANSWER_PAGE_SIZE):
+    """
+    Fetches one page of an employee's merged wrong answers, in get_wrong_answers order.
+    cursor is the 'Next_Cursor' of the previous page (None for the first page).
+    Returns a dict with keys:
+    'Items' (entries shaped like get_wrong_answers), 'Total' (entries matching the filters),
+    'Next_Cursor' (None on the last page) and 'Doc_Names' (documents available to filter by),
+    or None on error.
+    """
+    logger.info(f"Fetching wrong answer page for {employee_id} (doc: {doc_name}, cursor: {cursor})")
+    try:
+        after = _decode_cursor(cursor) if cursor else None
+
+        gc = _get_gspread_client(credentials_path)
+        sh = gc.open_by_key(spreadsheet_id)
+        data = _read_log_records(sh, 'log_wrong_answers', since, until)
+
+        entries, doc_names = _merge_wrong_answers(data, employee_id, doc_name)
+        remaining = entries if after is None else [e for e in entries if _wrong_answer_sort_key(e) < after]
+        # One extra entry tells whether another page follows
+        page = heapq.nlargest(page_size + 1, remaining, key=_wrong_answer_sort_key)
+        has_more = len(page) > page_size
+        page = page[:page_size]
+
+        return {
+            'Items': [_parse_question_info(entry) for entry in page],
+            'Total': len(entries),
+            'Next_Cursor': _encode_cursor(page[-1]) if has_more else None,
+            'Doc_Names': doc_names,
+        }
+
+    except Exception as e:
+        logger.error("Error fetching wrong answer page", exc_info=True)
+        return None
+
+# --- Quiz Attempts ---
+# A quiz attempt accumulates its wrong answers in session state and is written
+# with commit_attempt() as one Spreadsheet.batch_update: the score row and every
+# wrong answer land together or not at all. Attempt_ID makes the commit idempotent.
+
+def new_attempt(employee_id, doc_name):
+    """
+    Returns a new attempt dict to be kept in st.session_state.
+    """
+    return {
+        'Attempt_ID': uuid.uuid4().hex,
+        'Employee_ID': str(employee_id),
+        'Doc_Name': str(doc_name),
+        'Answered': [],
+        'Wrong_Answers': [],
+        'Committed': False,
+    }
+
+def add_answer(attempt, question_info_dict, correct_answer, user_selected_answer):
+    """
+    Records an answered question on the attempt (no I/O). Wrong answers are
+    also kept for the batched write; analytics count every answered question
+    once the attempt is committed.
+    """
+    attempt.setdefault('Answered', []).append(question_info_dict)
+    if str(user_selected_answer) != str(correct_answer):
+        add_wrong_answer(attempt, question_info_dict, correct_answer, user_selected_answer)
+
+def add_wrong_answer(attempt, question_info_dict, correct_answer, user_selected_answer):
+    """
+    Records a wrong answer on the attempt (no I/O).
+    """
+    attempt['Wrong_Answers'].append({
+        'Question_Info': question_info_dict,
+        'Correct_Answer': str(correct_answer),
+        'User_Selected_Answer': str(user_selected_answer),
+    })
+
+def _attempt_exists(values, attempt_id):
+    """
+    Checks whether a score row with attempt_id is already in a shard's values.
+    """
+    if not values or 'Attempt_ID' not in values[0]:
+        return False
+    idx = values[0].index('Attempt_ID')
+    return any(len(row) > idx and row[idx] == attempt_id for row in values[1:])
+
+def _header_requests(worksheet, values, headers):
+    """
+    Returns the batch requests needed to write or extend the header row.
+    """
+    if values and values[0] == headers:
+        return []
+    if values and headers[:len(values[0])] != values[0]:
+        # Unknown layout: leave it alone, rows are still appended positionally
+        return []
+    return [{
+        "updateCells": {
+            "start": {"sheetId": worksheet.id, "rowIndex": 0, "columnIndex": 0},
+            "rows": _to_row_data([headers]),
+            "fields": "userEnteredValue",
+        }
+    }]
+
+def _ensure_worksheets(sh, titles):
+    """
+    Returns {title: worksheet} for titles, creating missing ones with a single metadata read.
+    """
+    existing = {ws.title: ws for ws in sh.worksheets()}
+    for title in titles:
+        if title not in existing:
+            logger.info(f"Worksheet '{title}' not found. Creating new one.")
+            existing[title] = _add_worksheet(sh, title)
+    return existing
+
+@instrument("sheets.commit_attempt", size_of=lambda result, credentials_path, spreadsheet_id, attempt, score: len(attempt['Wrong_Answers']) + 1)
+def _commit_attempt(credentials_path, spreadsheet_id, attempt, score):
+    """
+    Writes the attempt's score row and all of its wrong answers in a single
+    batched update. Repeated calls for the same attempt (double clicks, retries
+    after a timeout, a quiz resumed from its checkpoint) never write twice:
+    committed attempt IDs are remembered locally (utils/quiz_checkpoints.py),
+    which still holds after the month's shard is compacted, and the current
+    and previous month's score shards are checked. Returns True on success.
+    """
+    if attempt.get('Committed') or is_attempt_committed(attempt['Attempt_ID']):
+        logger.info(f"Attempt {attempt['Attempt_ID']} already committed. Skipping.")
+        attempt['Committed'] = True
+        return True
+
+    employee_id = attempt['Employee_ID']
+    logger.info(f"Committing attempt {attempt['Attempt_ID']} for {employee_id} ({len(attempt['Wrong_Answers'])} wrong answers)")
+    try:
+        with _employee_lock(spreadsheet_id, employee_id):
+            return _write_attempt(credentials_path, spreadsheet_id, attempt, score)
+    except Exception as e:
+        logger.error("Error committing attempt", exc_info=True)
+        return False
+
+def _write_attempt(credentials_path, spreadsheet_id, attempt, score):
+    """
+    The read-modify-write of _commit_attempt(); runs under the employee's lock.
+    """
+    employee_id = attempt['Employee_ID']
+    gc = _get_gspread_client(credentials_path)
+    sh = gc.open_by_key(spreadsheet_id)
+
+    now = datetime.now()
+    score_title = _shard_title('log_scores', now)
+    wrong_title = _shard_title('log_wrong_answers', now)
+    worksheets = _ensure_worksheets(sh, [score_title, wrong_title])
+
+    # An attempt retried just after midnight on the 1st was written to last month's shard
+    ranges = [score_title, wrong_title]
+    previous_title = _shard_title('log_scores', _month_start(now) - timedelta(days=1))
+    if previous_title in worksheets:
+        ranges.append(previous_title)
+    value_ranges = sh.values_batch_get([f"'{title}'" for title in ranges]).get('valueRanges', [])
+    values = [value_ranges[i].get('values', []) if len(value_ranges) > i else [] for i in range(len(ranges))]
+    score_values, wrong_values = values[0], values[1]
+
+    for title, title_values in zip(ranges, values):
+        if title != wrong_title and _attempt_exists(title_values, attempt['Attempt_ID']):
+            logger.info(f"Attempt {attempt['Attempt_ID']} found in '{title}'. Skipping duplicate write.")
+            attempt['Committed'] = True
+            mark_attempt_committed(attempt['Attempt_ID'])
+            return True
+
+    score_ws = worksheets[score_title]
+    wrong_ws = worksheets[wrong_title]
+    requests = _header_requests(score_ws, score_values, SCORE_HEADERS)
+    requests += _header_requests(wrong_ws, wrong_values, WRONG_ANSWER_HEADERS)
+    if not wrong_values:
+        wrong_values = [list(WRONG_ANSWER_HEADERS)]
+    elif wrong_values[0] != WRONG_ANSWER_HEADERS and WRONG_ANSWER_HEADERS[:len(wrong_values[0])] == wrong_values[0]:
+        wrong_values[0] = list(WRONG_ANSWER_HEADERS)
+
+    timestamp = now.strftime(TIMESTAMP_FORMAT)
+
+    # Aggregate repeats of a question within the attempt first, so each
+    # (employee, question) row is written once with all of its misses
+    misses = {}
+    for item in attempt['Wrong_Answers']:
+        question_key = _question_key(item['Question_Info'])
+        if question_key in misses:
+            misses[question_key][1] += 1
+        else:
+            misses[question_key] = [item, 1]
+
+    # Wrong answers: update existing (employee, question) rows, append new ones
+    new_rows = []
+    for question_key, (item, count) in misses.items():
+        row_number, miss_count = _find_wrong_answer_row(wrong_values, employee_id, question_key)
+        row = [
+            timestamp,
+            employee_id,
+            attempt['Doc_Name'],
+            json.dumps(item['Question_Info'], ensure_ascii=False),
+            item['Correct_Answer'],
+            item['User_Selected_Answer'],
+            question_key,
+            miss_count + count
+        ]
+        if row_number:
+            requests.append({
+                "updateCells": {
+                    "start": {"sheetId": wrong_ws.id, "rowIndex": row_number - 1, "columnIndex": 0},
+                    "rows": _to_row_data([row]),
+                    "fields": "userEnteredValue",
+                }
+            })
+        else:
+            new_rows.append(row)
+
+    if new_rows:
+        requests.append({
+            "appendCells": {
+                "sheetId": wrong_ws.id,
+                "rows": _to_row_data(new_rows),
+                "fields": "userEnteredValue",
+            }
+        })
+
+    score_row = [timestamp, employee_id, attempt['Doc_Name'], int(score), attempt['Attempt_ID']]
+    requests.append({
+        "appendCells": {
+            "sheetId": score_ws.id,
+            "rows": _to_row_data([score_row]),
+            "fields": "userEnteredValue",
+        }
+    })
+
+    sh.batch_update({"requests": requests})
+    attempt['Committed'] = True
+    mark_attempt_committed(attempt['Attempt_ID'])
+    logger.info("Attempt committed successfully")
+    return True
+
+# --- Async API ---
+# Async counterparts run on the shared I/O loop (see utils/async_io.py) under the
+# Sheets concurrency limit; the blocking functions are thin wrappers over them.
+
+async def save_score_async(credentials_path, spreadsheet_id, employee_id, doc_name, score, attempt_id=""):
+    """
+    Async counterpart of save_score().
+    """
+    return await run_io("sheets", _save_score, credentials_path, spreadsheet_id, employee_id, doc_name, score, attempt_id)
+
+def save_score(credentials_path, spreadsheet_id, employee_id, doc_name, score, attempt_id=""):
+    """
+    Logs the user's score to the current monthly 'log_scores' shard. See _save_score().
+    """
+    return run_sync(save_score_async(credentials_path, spreadsheet_id, employee_id, doc_name, score, attempt_id))
+
+async def save_wrong_answer_async(credentials_path, spreadsheet_id, employee_id, doc_name, question_info_dict, correct_answer, user_selected_answer):
+    """
+    Async counterpart of save_wrong_answer().
+    """
+    return await run_io("sheets", _save_wrong_answer, credentials_path, spreadsheet_id, employee_id, doc_name, question_info_dict, correct_answer, user_selected_answer)
+
+def save_wrong_answer(credentials_path, spreadsheet_id, employee_id, doc_name, question_info_dict, correct_answer, user_selected_answer):
+    """
+    Logs (or counts a repeated) wrong answer in the 'log_wrong_answers' shard. See _save_wrong_answer().
+    """
+    return run_sync(save_wrong_answer_async(credentials_path, spreadsheet_id, employee_id, doc_name, question_info_dict, correct_answer, user_selected_answer))
+
+async def save_mentoring_log_async(credentials_path, spreadsheet_id, employee_id, question_text, correct_answer, user_selected_answer, user_question_detail):
+    """
+    Async counterpart of save_mentoring_log().
+    """
+    return await run_io("sheets", _save_mentoring_log, credentials_path, spreadsheet_id, employee_id, question_text, correct_answer, user_selected_answer, user_question_detail)
+
+def save_mentoring_log(credentials_path, spreadsheet_id, employee_id, question_text, correct_answer, user_selected_answer, user_question_detail):
+    """
+    Logs an SOS request to the 'log_mentoring' shard. See _save_mentoring_log().
+    """
+    return run_sync(save_mentoring_log_async(credentials_path, spreadsheet_id, employee_id, question_text, correct_answer, user_selected_answer, user_question_detail))
+
+async def get_wrong_answers_async(credentials_path, spreadsheet_id, employee_id, since=None, until=None, doc_name=None):
+    """
+    Async counterpart of get_wrong_answers().
+    """
+    return await run_io("sheets", _get_wrong_answers, credentials_path, spreadsheet_id, employee_id, since, until, doc_name)
+
+def get_wrong_answers(credentials_path, spreadsheet_id, employee_id, since=None, until=None, doc_name=None):
+    """
+    Returns the employee's merged wrong answers, most missed first. See _get_wrong_answers().
+    """
+    return run_sync(get_wrong_answers_async(credentials_path, spreadsheet_id, employee_id, since, until, doc_name))
+
+async def get_wrong_answers_page_async(credentials_path, spreadsheet_id, employee_id, doc_name=None, since=None, until=None, cursor=None, page_size=WRONG_ANSWER_PAGE_SIZE):
+    """
+    Async counterpart of get_wrong_answers_page().
+    """
+    return await run_io("sheets", _get_wrong_answers_page, credentials_path, spreadsheet_id, employee_id, doc_name, since, until, cursor, page_size)
+
+def get_wrong_answers_page(credentials_path, spreadsheet_id, employee_id, doc_name=None, since=None, until=None, cursor=None, page_size=WRONG_ANSWER_PAGE_SIZE):
+    """
+    Returns one page of the employee's wrong-answer note. See _get_wrong_answers_page().
+    """
+    return run_sync(get_wrong_answers_page_async(credentials_path, spreadsheet_id, employee_id, doc_name, since, until, cursor, page_size))
+
+async def commit_attempt_async(credentials_path, spreadsheet_id, attempt, score):
+    """
+    Async counterpart of commit_attempt().
+    """
+    return await run_io("sheets", _commit_attempt, credentials_path, spreadsheet_id, attempt, score)
+
+def commit_attempt(credentials_path, spreadsheet_id, attempt, score):
+    """
+    Writes the attempt's score and wrong answers in one batched update. See _commit_attempt().
+    """
+    return run_sync(commit_attempt_async(credentials_path, spreadsheet_id, attempt, score))
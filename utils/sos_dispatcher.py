@@ -0,0 +1,129 @@
+import uuid
+import threading
+from datetime import datetime
+from utils.discord_sender import queue_sos_message, get_outbox_message, start_outbox_sender, OUTBOX_SENT, OUTBOX_FAILED, MISSING_WEBHOOK_ERROR
+from utils.sheet_handler import save_mentoring_log_async
+from utils.async_io import submit
+from utils.logger import logger
+
+# Background dispatcher for SOS requests. The Discord message goes into the
+# durable outbox (delivered in digests by the outbox sender) while the mentoring
+# log write is scheduled on the shared async I/O loop, and the dialog returns as
+# soon as both are queued. Status is kept per ticket so the UI can poll it.
+MAX_TICKETS = 1000
+
+STATUS_PENDING = "pending"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+_tickets = {}
+_tickets_lock = threading.Lock()
+
+def _set_status(ticket_id, channel, status, error=None):
+    with _tickets_lock:
+        ticket = _tickets.get(ticket_id)
+        if ticket is None:
+            return
+        ticket[channel] = status
+        if error:
+            ticket['errors'][channel] = error
+
+async def _run_sheet(ticket_id, credentials_path, spreadsheet_id, user_name, question_title, correct_answer, user_answer, user_question):
+    try:
+        success = await save_mentoring_log_async(credentials_path, spreadsheet_id, user_name, question_title, correct_answer, user_answer, user_question)
+    except Exception:
+        logger.error("Unexpected error dispatching mentoring log", exc_info=True)
+        success = False
+    _set_status(ticket_id, 'sheet', STATUS_SENT if success else STATUS_FAILED)
+
+def _resolve_discord(ticket_id, outbox_id):
+    """
+    Copies the outbox's delivery outcome of a pending ticket into the ticket,
+    so delivered tickets count as finished. Returns the ticket's Discord status.
+    """
+    message = get_outbox_message(outbox_id)
+    with _tickets_lock:
+        ticket = _tickets.get(ticket_id)
+        if ticket is None:
+            return None
+        if message is not None:
+            if message['status'] == OUTBOX_SENT:
+                ticket['discord'] = STATUS_SENT
+            elif message['status'] == OUTBOX_FAILED:
+                ticket['discord'] = STATUS_FAILED
+            if message['last_error']:
+                ticket['errors']['discord'] = message['last_error']
+        return ticket['discord']
+
+def _prune_tickets():
+    """
+    Drops the oldest finished tickets once the registry grows past MAX_TICKETS.
+    Discord outcomes are read from the outbox first (outside the lock).
+    """
+    with _tickets_lock:
+        if len(_tickets) <= MAX_TICKETS:
+            return
+        unresolved = [
+            (ticket_id, ticket['outbox_id']) for ticket_id, ticket in _tickets.items()
+            if ticket['discord'] == STATUS_PENDING and ticket['outbox_id'] is not None
+        ]
+    for ticket_id, outbox_id in unresolved:
+        _resolve_discord(ticket_id, outbox_id)
+
+    with _tickets_lock:
+        finished = [
+            ticket_id for ticket_id, ticket in _tickets.items()
+            if STATUS_PENDING not in (ticket['discord'], ticket['sheet'])
+        ]
+        for ticket_id in finished[:len(_tickets) - MAX_TICKETS]:
+            del _tickets[ticket_id]
+
+def dispatch_sos(webhook_url, credentials_path, spreadsheet_id, user_name, question_title, user_answer, correct_answer, user_question):
+    """
+    Queues the Discord SOS post and the mentoring log write to run concurrently
+    in the background. Returns a ticket ID immediately; see get_sos_status().
+    """
+    ticket_id = uuid.uuid4().hex
+    _prune_tickets()
+    with _tickets_lock:
+        _tickets[ticket_id] = {
+            'ticket_id': ticket_id,
+            'question': question_title,
+            'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'discord': STATUS_PENDING,
+            'sheet': STATUS_PENDING,
+            'errors': {},
+            'outbox_id': None,
+        }
+
+    logger.info(f"Dispatching SOS ticket {ticket_id} for user: {user_name}")
+    start_outbox_sender()
+    outbox_id = queue_sos_message(webhook_url, user_name, question_title, user_answer, correct_answer, user_question)
+    if outbox_id is None:
+        _set_status(ticket_id, 'discord', STATUS_FAILED, MISSING_WEBHOOK_ERROR)
+    else:
+        with _tickets_lock:
+            _tickets[ticket_id]['outbox_id'] = outbox_id
+    submit(_run_sheet(ticket_id, credentials_path, spreadsheet_id, user_name, question_title, correct_answer, user_answer, user_question))
+    return ticket_id
+
+def get_sos_status(ticket_id):
+    """
+    Returns a copy of the ticket's delivery status, or None if unknown.
+    Keys: ['ticket_id', 'question', 'created_at', 'discord', 'sheet', 'errors', 'outbox_id']
+    The Discord status is read from the outbox and kept on the ticket.
+    """
+    with _tickets_lock:
+        ticket = _tickets.get(ticket_id)
+        if ticket is None:
+            return None
+        pending_outbox_id = ticket['outbox_id'] if ticket['discord'] == STATUS_PENDING else None
+
+    if pending_outbox_id is not None:
+        _resolve_discord(ticket_id, pending_outbox_id)
+
+    with _tickets_lock:
+        ticket = _tickets.get(ticket_id)
+        if ticket is None:
+            return None
+        return dict(ticket, errors=dict(ticket['errors']))
@@ -0,0 +1,177 @@
+import sys
+import time
+import types
+import threading
+import importlib
+from contextlib import contextmanager
+from utils.logger import logger
+
+# Cold-start helpers: heavy third-party modules (pandas, gspread,
+# google.generativeai, langchain) are imported on first use instead of when
+# app.py imports the utils, and a background warmup preloads them (plus the
+# Gemini / Sheets clients) once the first page has rendered.
+
+_timings = {}
+_timings_lock = threading.Lock()
+_import_lock = threading.RLock()
+
+def record_timing(name, seconds):
+    """
+    Records the cost of one import / initialization step (first measurement wins).
+    """
+    with _timings_lock:
+        _timings.setdefault(name, seconds)
+
+@contextmanager
+def timed(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(name, time.perf_counter() - start)
+
+def get_startup_report():
+    """
+    Returns [(step, seconds)] sorted by cost, most expensive first.
+    """
+    with _timings_lock:
+        return sorted(_timings.items(), key=lambda item: item[1], reverse=True)
+
+def log_startup_report():
+    report = get_startup_report()
+    lines = "\n".join(f"  {seconds * 1000:8.1f} ms  {name}" for name, seconds in report)
+    logger.info(f"Startup timing report (import / init cost per module):\n{lines}")
+
+def _import(name):
+    """
+    Imports a module, recording how long the first (uncached) import took.
+    """
+    with _import_lock:
+        if name in sys.modules:
+            return sys.modules[name]
+        with timed(f"import {name}"):
+            return importlib.import_module(name)
+
+class LazyModule(types.ModuleType):
+    """
+    Module stand-in that imports the real module on first attribute access.
+    Attribute writes and deletes (e.g. unittest.mock.patch) go to the real module.
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_lazy_target'] = None
+
+    def _load(self):
+        module = self.__dict__['_lazy_target']
+        if module is None:
+            module = _import(self.__name__)
+            self.__dict__['_lazy_target'] = module
+        return module
+
+    def __getattr__(self, item):
+        return getattr(self._load(), item)
+
+    def __setattr__(self, item, value):
+        setattr(self._load(), item, value)
+
+    def __delattr__(self, item):
+        delattr(self._load(), item)
+
+    def __dir__(self):
+        return dir(self._load())
+
+class LazyAttribute:
+    """
+    Callable stand-in for `from module import name` that imports on first call.
+    """
+
+    def __init__(self, module_name, attr_name):
+        self._module_name = module_name
+        self._attr_name = attr_name
+        self._target = None
+
+    def _load(self):
+        if self._target is None:
+            self._target = getattr(_import(self._module_name), self._attr_name)
+        return self._target
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __getattr__(self, item):
+        return getattr(self._load(), item)
+
+def lazy_import(name):
+    """
+    Returns a module proxy for name that defers the actual import until first use.
+    """
+    return LazyModule(name)
+
+def lazy_attr(module_name, attr_name):
+    """
+    Returns a proxy for module_name.attr_name that defers the import until first call.
+    """
+    return LazyAttribute(module_name, attr_name)
+
+# --- Background Warmup ---
+WARMUP_MODULES = [
+    "pandas",
+    "gspread",
+    "google.generativeai",
+    "langchain_community.document_loaders.pdf",
+    "pypdf",
+]
+
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+
+def _warmup(google_api_key, credentials_path):
+    logger.info("Background warmup started")
+    for name in WARMUP_MODULES:
+        try:
+            _import(name)
+        except Exception:
+            logger.warning(f"Warmup could not import {name}", exc_info=True)
+
+    # Clients are cached by their modules, so the first real request reuses them
+    if google_api_key:
+        try:
+            from utils.gemini_handler import get_gemini_handler
+            with timed("init Gemini client"):
+                get_gemini_handler(google_api_key)
+        except Exception:
+            logger.warning("Warmup could not initialize the Gemini client", exc_info=True)
+        try:
+            from utils.pdf_extractor import warm_pool
+            with timed("start PDF extraction pool"):
+                warm_pool()
+        except Exception:
+            logger.warning("Warmup could not start the PDF extraction pool", exc_info=True)
+
+    if credentials_path:
+        try:
+            from utils.sheet_handler import _get_gspread_client
+            with timed("init Sheets client"):
+                _get_gspread_client(credentials_path)
+        except Exception:
+            logger.warning("Warmup could not initialize the Sheets client", exc_info=True)
+
+    log_startup_report()
+
+def start_warmup(google_api_key=None, credentials_path=None):
+    """
+    Preloads heavy modules and API clients in a daemon thread, once per process.
+    Call it after the first page has rendered so it never delays first paint.
+    """
+    global _warmup_thread
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(
+                target=_warmup,
+                args=(google_api_key, credentials_path),
+                name="startup-warmup",
+                daemon=True,
+            )
+            _warmup_thread.start()
+    return _warmup_thread